@@ -0,0 +1,168 @@
+"""
+Instagram account registry for multi-account deployments
+Accounts come from ACCOUNTS_FILE (JSON list) or the ACCOUNTS env var (same JSON);
+without either, a single "default" account is built from the regular env vars
+
+Example entry:
+    {"name": "brand2", "username": "brand2", "password_env": "BRAND2_PASSWORD",
+     "content": {"pdf": "https://t.me/brand2bot?start=pdf"},
+     "keyword_reply": "...", "dm_message": "...", "follow_first_reply": "..."}
+"""
+import json
+import os
+import re
+import threading
+from typing import List, Optional
+from config import config
+
+DEFAULT_ACCOUNT = "default"
+
+
+class Account:
+    """One Instagram account with its own keywords, templates and state namespace"""
+
+    def __init__(self, name: str, username: str, password: str,
+                 content_mappings: Optional[dict] = None,
+                 keyword_reply: str = None, dm_message: str = None, follow_first_reply: str = None):
+        if not re.fullmatch(r"[a-z0-9_]{1,64}", name):
+            raise ValueError(f"Noto'g'ri account nomi: {name!r}")
+        self.name = name
+        self.username = username
+        self.password = password
+        # Static settings from the registry; the live values come from `content`
+        self.static_content_mappings = content_mappings
+        self.static_templates = {
+            "keyword_reply": keyword_reply,
+            "dm_message": dm_message,
+            "follow_first_reply": follow_first_reply,
+        }
+        self._content_store = None
+        self._content_lock = threading.Lock()
+
+    # Pickled for supervisor workers ("spawn"): the live store and its lock stay
+    # behind and are rebuilt lazily in the worker
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_content_store"] = None
+        del state["_content_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._content_lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Account":
+        password = data.get("password") or os.getenv(data.get("password_env", ""), "")
+        content = data.get("content")
+        return cls(
+            name=data["name"],
+            username=data["username"],
+            password=password,
+            content_mappings={k.lower(): v for k, v in content.items()} if content else None,
+            keyword_reply=data.get("keyword_reply"),
+            dm_message=data.get("dm_message"),
+            follow_first_reply=data.get("follow_first_reply"),
+        )
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == DEFAULT_ACCOUNT
+
+    # Per-account files keep the original names for the default account
+    @property
+    def session_file(self) -> str:
+        return "session.json" if self.is_default else f"session_{self.name}.json"
+
+    @property
+    def processed_file(self) -> str:
+        return "processed_comments.json" if self.is_default else f"processed_comments_{self.name}.json"
+
+    @property
+    def warm_state_file(self) -> str:
+        return "warm_state.bin" if self.is_default else f"warm_state_{self.name}.bin"
+
+    @property
+    def session_data_env(self) -> str:
+        return "SESSION_DATA" if self.is_default else f"SESSION_DATA_{self.name.upper()}"
+
+    @property
+    def content_store(self):
+        """Hot-reloadable keyword/template store (see content_config.py)"""
+        if self._content_store is None:
+            with self._content_lock:
+                if self._content_store is None:
+                    from content_config import ContentStore
+                    self._content_store = ContentStore(self)
+        return self._content_store
+
+    # Take one snapshot per comment so a reload can't mix old and new settings
+    @property
+    def content(self):
+        return self.content_store.current
+
+    @property
+    def content_mappings(self) -> dict:
+        return self.content.mappings
+
+    @property
+    def keyword_reply(self) -> str:
+        return self.content.keyword_reply
+
+    @property
+    def dm_message(self) -> str:
+        return self.content.dm_message
+
+    @property
+    def follow_first_reply(self) -> str:
+        return self.content.follow_first_reply
+
+    def get_keywords(self) -> list:
+        return self.content.get_keywords()
+
+    def get_content_link(self, keyword: str) -> str:
+        return self.content.get_content_link(keyword)
+
+    def __repr__(self):
+        return f"Account(name={self.name!r}, username={self.username!r})"
+
+
+def default_account() -> Account:
+    """The single account described by INSTAGRAM_USERNAME/INSTAGRAM_PASSWORD"""
+    return Account(DEFAULT_ACCOUNT, config.INSTAGRAM_USERNAME, config.INSTAGRAM_PASSWORD)
+
+
+def load_accounts() -> List[Account]:
+    """Load the account registry (ACCOUNTS_FILE > ACCOUNTS env > default account)"""
+    raw = None
+    accounts_file = os.getenv("ACCOUNTS_FILE", "")
+    if accounts_file and os.path.exists(accounts_file):
+        with open(accounts_file, 'r') as f:
+            raw = json.load(f)
+    elif os.getenv("ACCOUNTS"):
+        raw = json.loads(os.getenv("ACCOUNTS"))
+
+    if not raw:
+        return [default_account()]
+
+    accounts = [Account.from_dict(item) for item in raw]
+    names = [a.name for a in accounts]
+    if len(names) != len(set(names)):
+        raise ValueError("Account nomlari takrorlanmasligi kerak")
+    return accounts
+
+
+# Account served by this process (each supervisor worker sets its own)
+_current_account: Optional[Account] = None
+
+
+def get_current_account() -> Account:
+    global _current_account
+    if _current_account is None:
+        _current_account = default_account()
+    return _current_account
+
+
+def set_current_account(account: Account):
+    global _current_account
+    _current_account = account
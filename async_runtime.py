@@ -0,0 +1,133 @@
+"""
+Single asyncio runtime for both bots
+The Instagram pipeline and the Telegram Application share one event loop;
+blocking instagrapi/Gemini calls are offloaded to a bounded thread pool
+"""
+import asyncio
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from config import config
+from logger import log
+
+# (loop, stop callback) of the currently running runtime, if any
+_active = None
+_instagram_bot = None
+# Stop requested while no runtime was up yet: honoured as soon as run_bots starts
+_stop_requested = False
+_state_lock = threading.Lock()
+
+
+async def _run_instagram(bot, executor, status: dict):
+    try:
+        status["instagram"] = "running"
+        await bot.run_async(executor)
+        status["instagram"] = "stopped"
+    except Exception as e:
+        status["instagram"] = f"error: {e}"
+        log.error("instagram_bot_error", "❌ Instagram bot xatosi: {error}", error=str(e))
+
+
+async def _run_telegram(bot, stop_event: asyncio.Event, status: dict, webhook: bool):
+    try:
+        status["telegram"] = "running"
+        await bot.run_async(stop_event, webhook=webhook)
+        status["telegram"] = "stopped"
+    except Exception as e:
+        status["telegram"] = f"error: {e}"
+        log.error("telegram_bot_error", "❌ Telegram bot xatosi: {error}", error=str(e))
+
+
+async def run_bots(status: Optional[dict] = None, telegram_webhook: bool = False):
+    """
+    Run the Instagram and Telegram bots on the current event loop until
+    SIGINT/SIGTERM (main thread only) or until both bots exit
+
+    Args:
+        status: Optional dict updated with "instagram"/"telegram" states
+        telegram_webhook: Register the Telegram webhook instead of polling
+            (only when a web app serves the webhook route)
+    """
+    global _active, _instagram_bot, _stop_requested
+    from main import InstagramAIBot
+    from telegram_bot import TelegramSubscriptionBot
+
+    status = status if status is not None else {}
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=config.BLOCKING_WORKERS, thread_name_prefix="blocking")
+    loop.set_default_executor(executor)
+    stop_event = asyncio.Event()
+
+    instagram_bot = _instagram_bot = InstagramAIBot()
+    telegram_bot = TelegramSubscriptionBot()
+
+    def stop():
+        if stop_event.is_set():
+            return
+        log.info("bots_stopping", "🛑 Botlar to'xtatilmoqda...")
+        stop_event.set()
+        # Snapshot right away, off the loop: the running check may be blocked on
+        # Gemini pacing for longer than the platform's kill grace period
+        threading.Thread(target=instagram_bot.save_snapshot, name="warm-state").start()
+        instagram_bot.stop()
+
+    with _state_lock:
+        _active = (loop, stop)
+        stop_now, _stop_requested = _stop_requested, False
+    if stop_now:
+        stop()  # Demoted while starting up
+
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on this platform
+
+    try:
+        await asyncio.gather(
+            _run_instagram(instagram_bot, executor, status),
+            _run_telegram(telegram_bot, stop_event, status, telegram_webhook),
+        )
+    finally:
+        with _state_lock:
+            _active = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_instagram_bot():
+    """The InstagramAIBot run by this process (None if not running)"""
+    return _instagram_bot
+
+
+def request_stop() -> bool:
+    """
+    Stop the running bots from any thread; returns False if none are running
+    (a runtime that is still starting stops as soon as it is up)
+    """
+    global _stop_requested
+    with _state_lock:
+        active = _active
+        if active is None:
+            _stop_requested = True
+            return False
+    loop, stop = active
+    loop.call_soon_threadsafe(stop)
+    return True
+
+
+def clear_stop_request():
+    """Forget a stop requested while no runtime was up (call before starting a new one)"""
+    global _stop_requested
+    with _state_lock:
+        _stop_requested = False
+
+
+def main(status: Optional[dict] = None, telegram_webhook: bool = False):
+    """Blocking entry point: run both bots on a fresh event loop"""
+    asyncio.run(run_bots(status, telegram_webhook))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Checkpointed historical backfill over ALL posts
+Run: python backfill.py [--concurrency 3] [--rate 6] [--include-regular] [--reset]
+
+Pages through every post and all of its comments in parallel (concurrency cap),
+feeds missed keyword comments through the normal processing path at a throttled
+rate, and checkpoints progress per media to the DB so a crash can be resumed
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from datetime import timedelta
+from circuit_breaker import CircuitOpenError
+from database import get_db
+from logger import log
+
+
+class Backfill:
+    """Resumable sweep over all media and comments of the current account"""
+
+    MAX_PAGE_ERRORS = 5
+    PROGRESS_INTERVAL = 15
+
+    def __init__(self, bot, concurrency: int = 3, rate_per_min: float = 6, include_regular: bool = False):
+        self.bot = bot
+        self.instagram = bot.instagram
+        self.account = bot.account.name
+        self.concurrency = concurrency
+        self.process_interval = 60.0 / rate_per_min
+        self.include_regular = include_regular
+        self.checkpoint_file = f"backfill_{self.account}.json"
+
+        self.db = get_db()
+        self.checkpoints = self._load_checkpoints()
+        self._checkpoint_lock = threading.Lock()
+        self._process_lock = threading.Lock()
+        self._next_process_at = 0.0
+        self._stop = threading.Event()
+
+        self.media_total = 0
+        self.media_done = 0
+        self.comments_total = 0
+        self.comments_scanned = 0
+        self.comments_handled = 0
+        self.started_at = 0.0
+
+    # ==================== Checkpoints ====================
+
+    def _load_checkpoints(self) -> dict:
+        if self.db.enabled:
+            return self.db.get_backfill_checkpoints(self.account)
+        if os.path.exists(self.checkpoint_file):
+            try:
+                with open(self.checkpoint_file, 'r') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def _save_checkpoint(self, checkpoint: dict):
+        with self._checkpoint_lock:
+            self.checkpoints[checkpoint['media_id']] = checkpoint
+            if self.db.enabled:
+                self.db.save_backfill_checkpoint(checkpoint, self.account)
+                return
+            try:
+                with open(self.checkpoint_file, 'w') as f:
+                    json.dump(self.checkpoints, f)
+            except Exception as e:
+                log.warning("backfill_checkpoint_failed", "⚠️ Backfill checkpoint saqlanmadi: {error}", error=str(e))
+
+    def reset(self):
+        """Start the next sweep from scratch"""
+        self.checkpoints = {}
+        if self.db.enabled:
+            self.db.reset_backfill_checkpoints(self.account)
+        elif os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    # ==================== Sweep ====================
+
+    def stop(self):
+        """Stop after the current page (progress stays checkpointed)"""
+        self._stop.set()
+
+    def _already_processed(self, comment) -> bool:
+        """The live bot may have handled the comment since its page was read"""
+        if comment.pk in self.instagram.processed_comments:
+            return True
+        if self.db.enabled and self.db.find_processed_comments([comment.pk]):
+            self.instagram.processed_comments.add(comment.pk)
+            return True
+        return False
+
+    def _handle(self, media, comment) -> bool:
+        """
+        Run one found comment through the normal path, globally throttled
+
+        While the API is blocked the same comment is retried after the circuit's
+        cooldown; any other error is logged and the sweep moves on
+        """
+        if not self.include_regular and not self.bot._find_keyword(comment.text):
+            return False
+
+        with self._process_lock:
+            while True:
+                delay = self._next_process_at - time.time()
+                if delay > 0 and self._stop.wait(delay):
+                    return False
+                if self._already_processed(comment):
+                    return False
+                try:
+                    self.bot._process_comment(media, comment)
+                    return True
+                except CircuitOpenError as e:
+                    log.warning("backfill_paused", "⏸️ {error}", error=str(e), comment_id=comment.pk)
+                    if self._stop.wait(e.retry_in):
+                        return False
+                except Exception as e:
+                    log.error("backfill_comment_failed", "❌ [{comment_id}] ishlanmadi: {error}",
+                              comment_id=comment.pk, error=str(e))
+                    return False
+                finally:
+                    self._next_process_at = time.time() + self.process_interval
+
+    def _scan_media(self, media):
+        """Page through all comments of one media from its checkpoint"""
+        checkpoint = dict(self.checkpoints.get(media.id) or {
+            'media_id': media.id, 'min_id': "", 'max_id': "",
+            'comments_scanned': 0, 'comments_handled': 0, 'done': False,
+        })
+        errors = 0
+
+        while not self._stop.is_set():
+            try:
+                comments, scanned, min_id, max_id = self.instagram.get_comments_page(
+                    media, checkpoint['min_id'], checkpoint['max_id']
+                )
+            except CircuitOpenError as e:
+                self._stop.wait(e.retry_in)
+                continue
+            except Exception as e:
+                errors += 1
+                if errors >= self.MAX_PAGE_ERRORS:
+                    log.error("backfill_media_skipped",
+                              "❌ [{media_id}] o'tkazib yuborildi (keyingi ishga tushirishda davom etadi): {error}",
+                              media_id=media.id, error=str(e))
+                    return
+                self._stop.wait(5 * errors)
+                continue
+
+            for comment in comments:
+                if self._stop.is_set():
+                    return  # Page not checkpointed: it is re-read on resume
+                if self._handle(media, comment):
+                    checkpoint['comments_handled'] += 1
+                    self.comments_handled += 1
+            if self._stop.is_set():
+                return  # Stopped while handling the page: it is re-read on resume
+
+            cursor_moved = (min_id, max_id) != (checkpoint['min_id'], checkpoint['max_id'])
+            checkpoint['comments_scanned'] += scanned
+            checkpoint['min_id'], checkpoint['max_id'] = min_id, max_id
+            self.comments_scanned += scanned
+            checkpoint['done'] = not scanned or not (min_id or max_id) or not cursor_moved
+            self._save_checkpoint(checkpoint)
+            if checkpoint['done']:
+                self.media_done += 1
+                return
+
+    def _print_progress(self):
+        elapsed = time.time() - self.started_at
+        done_ratio = self.comments_scanned / self.comments_total if self.comments_total else 0
+        if done_ratio > 0:
+            eta = str(timedelta(seconds=int(elapsed / done_ratio - elapsed)))
+        else:
+            eta = "?"
+        log.info("backfill_progress",
+                 "📈 Backfill: media {media_done}/{media_total}, kommentariya {scanned}/{total} ({ratio:.0%}), "
+                 "ishlangan {handled}, ETA {eta}",
+                 media_done=self.media_done, media_total=self.media_total, scanned=self.comments_scanned,
+                 total=self.comments_total, ratio=done_ratio, handled=self.comments_handled, eta=eta)
+
+    def run(self):
+        """Sweep all media; returns when done or stopped"""
+        log.info("backfill_loading", "📚 Barcha postlar olinmoqda...")
+        medias = list(self.instagram.iter_all_posts())
+        pending = [m for m in medias if not (self.checkpoints.get(m.id) or {}).get('done')]
+
+        self.media_total = len(medias)
+        self.media_done = self.media_total - len(pending)
+        self.comments_total = sum(m.comment_count for m in pending)
+        self.comments_scanned = sum((self.checkpoints.get(m.id) or {}).get('comments_scanned', 0) for m in pending)
+        self.comments_total = max(self.comments_total, self.comments_scanned)
+        self.started_at = time.time()
+        log.info("backfill_pending", "🔁 {pending} ta post qoldi ({done} tasi avval tugagan)",
+                 pending=len(pending), done=self.media_done)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as pool:
+            futures = [pool.submit(self._scan_media, media) for media in pending]
+            while True:
+                finished, running = wait(futures, timeout=self.PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                self._print_progress()
+                for future in finished:
+                    if future.exception():
+                        log.error("backfill_error", "❌ Backfill xatosi: {error}", error=str(future.exception()))
+                if not running:
+                    break
+                futures = list(running)
+
+        self._print_progress()
+        if self._stop.is_set():
+            log.info("backfill_paused", "⏸️ Backfill to'xtatildi (davom ettirish mumkin)")
+        else:
+            log.info("backfill_done", "✅ Backfill tugadi!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barcha postlar bo'yicha o'tkazib yuborilgan kommentariyalarni ishlash")
+    parser.add_argument("--concurrency", type=int, default=3, help="Bir vaqtda skan qilinadigan postlar soni")
+    parser.add_argument("--rate", type=float, default=6, help="Daqiqasiga ishlanadigan kommentariyalar")
+    parser.add_argument("--include-regular", action="store_true", help="Kalit so'zsiz kommentariyalarga ham AI javob")
+    parser.add_argument("--reset", action="store_true", help="Checkpointlarni o'chirib, boshidan boshlash")
+    args = parser.parse_args()
+
+    from main import InstagramAIBot
+
+    bot = InstagramAIBot()
+    if not bot._prepare():
+        return
+
+    backfill = Backfill(bot, args.concurrency, args.rate, args.include_regular)
+    if args.reset:
+        backfill.reset()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: backfill.stop())
+    backfill.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Throughput benchmark of the broadcast engine against a local fake Bot API
+Run: python bench_broadcast.py [subscribers] [rate] [api_latency_ms]
+
+The fake API answers 429 (retry_after) above FAKE_API_LIMIT msg/s and 403 for
+a share of "blocked" users; subscribers and checkpoints live in memory
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from bench_telegram import FakeBotAPI
+from broadcast import BroadcastEngine
+
+FAKE_API_LIMIT = 30  # msg/s, like Telegram's global bot limit
+BLOCKED_SHARE = 0.05
+
+
+class FloodControlledAPI(FakeBotAPI):
+    """sendMessage with a sliding-window rate limit and blocked users"""
+
+    sent_times = deque()
+    status_codes = {}
+
+    def _reply(self, code: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.endswith("/sendMessage"):
+            return super().do_POST()
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode()
+        params = json.loads(body) if body.startswith("{") else dict(parse_qsl(body))
+        chat_id = int(params["chat_id"])
+        time.sleep(self.latency)
+
+        with self.lock:
+            now = time.monotonic()
+            while self.sent_times and now - self.sent_times[0] > 1:
+                self.sent_times.popleft()
+            limited = len(self.sent_times) >= FAKE_API_LIMIT
+            if not limited:
+                self.sent_times.append(now)
+            code = 429 if limited else 403 if chat_id % 100 < BLOCKED_SHARE * 100 else 200
+            self.status_codes[code] = self.status_codes.get(code, 0) + 1
+
+        if code == 429:
+            self._reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                              "parameters": {"retry_after": 1}})
+        elif code == 403:
+            self._reply(403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"})
+        else:
+            self._reply(200, {"ok": True, "result": {
+                "message_id": 1, "date": int(time.time()), "text": params.get("text", ""),
+                "chat": {"id": chat_id, "type": "private"}}})
+
+
+class MemoryStore:
+    """In-memory stand-in for the Database subscriber/broadcast methods"""
+
+    def __init__(self, subscribers: int):
+        self.subscribers = list(range(1, subscribers + 1))
+        self.blocked = set()
+        self.broadcast = {"id": 1, "text": "Yangi kontent! 🎁", "status": "pending",
+                          "last_user_id": 0, "sent": 0, "failed": 0, "blocked": 0}
+
+    def get_broadcast(self, broadcast_id):
+        return dict(self.broadcast)
+
+    def get_telegram_subscribers(self, after_user_id, limit):
+        page = [u for u in self.subscribers if u > after_user_id and u not in self.blocked]
+        return page[:limit]
+
+    def mark_telegram_subscribers_blocked(self, user_ids):
+        self.blocked.update(user_ids)
+        return True
+
+    def save_broadcast_progress(self, broadcast_id, last_user_id, sent, failed, blocked, status):
+        self.broadcast.update(last_user_id=last_user_id, sent=sent, failed=failed, blocked=blocked, status=status)
+        return True
+
+
+async def run(base_url: str, subscribers: int, rate: float) -> dict:
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+
+    store = MemoryStore(subscribers)
+    request = HTTPXRequest(connection_pool_size=64, pool_timeout=30)
+    async with Bot("123:FAKE", base_url=base_url, request=request) as bot:
+        engine = BroadcastEngine(bot, store=store, rate=rate, concurrency=20, page_size=200)
+        started = time.perf_counter()
+        result = await engine.run(1, progress_every=5)
+        elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "result": result, "pauses": engine.retry_after_pauses, "pruned": len(store.blocked)}
+
+
+def main():
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 750
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 25
+    FloodControlledAPI.latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    ThreadingHTTPServer.request_queue_size = 256
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FloodControlledAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+
+    print(f"🧪 {subscribers} ta obunachi, bucket {rate} msg/s, API limiti {FAKE_API_LIMIT} msg/s\n")
+    stats = asyncio.run(run(base_url, subscribers, rate))
+    result = stats["result"]
+    print(f"\n📊 {stats['elapsed']:.1f}s  →  {result['sent'] / stats['elapsed']:.1f} msg/s yetkazildi")
+    print(f"   ✅ sent {result['sent']}  🚫 blocked {result['blocked']} (o'chirildi: {stats['pruned']})  "
+          f"❌ failed {result['failed']}")
+    print(f"   ⏸️  RetryAfter pauzalari: {stats['pauses']}  HTTP kodlar: {FloodControlledAPI.status_codes}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Offline end-to-end benchmark of the comment pipeline (InstagramAIBot)
+Run: python bench_e2e.py [--duration 60] [--rate 120] [--keyword-share 0.6] ...
+
+The real bot, InstagramHandler, circuit breaker, load policy, spam filter and
+cooldown index run unchanged; only the network edge is replaced: an in-process
+FakeClient answers the private API calls the handler makes (synthetic posts,
+comments arriving as a Poisson process, follower ratio, latency distributions,
+injected errors) and FakeGeminiAI stands in for the model. No DB is used.
+
+Reports processed comments/min, comment-to-reply latency percentiles, API calls
+per processed comment, per-stage tracing histograms and memory.
+"""
+import argparse
+import contextlib
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import SimpleNamespace
+
+os.environ.pop("DATABASE_URL", None)  # Offline: file fallbacks only
+for _keyword in ("pdf", "kitob", "dars"):
+    os.environ.setdefault(f"CONTENT_{_keyword.upper()}", f"https://example.com/{_keyword}")
+
+from config import config
+from accounts import get_current_account
+from main import InstagramAIBot
+from instagram_handler import InstagramHandler
+from tracing import tracer
+from logger import log
+
+OWN_USER_ID = 1000
+MEDIA_PK_BASE = 3300000000000000000
+COMMENT_PK_BASE = 18000000000000000
+USER_PK_BASE = 50000000000
+COMMENTS_PAGE = 20
+
+FILLER_WORDS = ("zo'r", "rahmat", "qachon", "narxi", "qanday", "ajoyib", "savol", "kitob", "dars", "yana",
+                "video", "menga", "juda", "yoqdi", "kerak", "bormi", "qayerda", "ko'proq", "boshlang", "ustoz")
+
+
+# Named like instagrapi's exceptions so circuit_breaker.classify_error treats them the same way
+class ClientConnectionError(Exception):
+    pass
+
+
+class PleaseWaitFewMinutes(Exception):
+    pass
+
+
+def _lognormal(median: float, sigma: float = 0.5) -> float:
+    return random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class FakeClient:
+    """In-process stand-in for instagrapi.Client (only what InstagramHandler calls)"""
+
+    # Median latency (seconds) per call
+    LATENCY = {"feed": 0.15, "comments": 0.12, "friendship": 0.10, "media_comment": 0.25, "direct_send": 0.30}
+
+    def __init__(self, posts: int, rate_per_min: float, keywords: list, keyword_share: float,
+                 follower_ratio: float, users: int, error_rate: float, throttle_rate: float,
+                 latency_scale: float):
+        self.user_id = str(OWN_USER_ID)
+        self.posts = [MEDIA_PK_BASE + i for i in range(posts)]
+        # Newer posts attract more comments (1/rank weights)
+        self.post_weights = [1 / (i + 1) for i in range(posts)]
+        self.rate = rate_per_min / 60
+        self.keywords = keywords
+        self.keyword_share = keyword_share
+        self.follower_ratio = follower_ratio
+        self.users = users
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.latency_scale = latency_scale
+
+        self.comments = {pk: [] for pk in self.posts}  # media pk -> raw comments, oldest first
+        self.arrivals = {}  # comment pk -> arrival time (float)
+        self.replied_at = {}  # comment pk -> first reply time
+        self.calls = Counter()
+        self.injected = Counter()
+        self._next_pk = COMMENT_PK_BASE
+        self._next_arrival = None
+        self._lock = threading.Lock()
+
+    # ---------- synthetic traffic ----------
+
+    def start(self):
+        self._next_arrival = time.time() + random.expovariate(self.rate)
+
+    def _text(self) -> str:
+        if self.keywords and random.random() < self.keyword_share:
+            return random.choice(("", "iltimos ", "menga ham ")) + random.choice(self.keywords)
+        return " ".join(random.choices(FILLER_WORDS, k=random.randint(3, 8))) + "?"
+
+    def _advance(self, now: float):
+        """Materialize every comment that has "arrived" by now"""
+        while self._next_arrival is not None and self._next_arrival <= now:
+            at = self._next_arrival
+            media_pk = random.choices(self.posts, weights=self.post_weights)[0]
+            user_pk = USER_PK_BASE + random.randrange(self.users)
+            self._next_pk += 1
+            self.comments[media_pk].append({
+                "pk": str(self._next_pk),
+                "text": self._text(),
+                "created_at_utc": int(at),
+                "user_id": user_pk,
+                "user": {"pk": user_pk, "username": f"user_{user_pk - USER_PK_BASE}"},
+            })
+            self.arrivals[str(self._next_pk)] = at
+            self._next_arrival = at + random.expovariate(self.rate)
+
+    def _call(self, name: str):
+        """Count, delay and maybe fail one API call"""
+        self.calls[name] += 1
+        time.sleep(_lognormal(self.LATENCY[name] * self.latency_scale))
+        roll = random.random()
+        if roll < self.throttle_rate:
+            self.injected["throttle"] += 1
+            raise PleaseWaitFewMinutes("Please wait a few minutes before you try again.")
+        if roll < self.throttle_rate + self.error_rate:
+            self.injected["error"] += 1
+            raise ClientConnectionError("Connection reset by peer")
+
+    # ---------- client API ----------
+
+    def private_request(self, endpoint: str, params: dict = None, **kwargs) -> dict:
+        params = params or {}
+        parts = endpoint.strip("/").split("/")
+        if parts[0] == "feed":
+            self._call("feed")
+            count = int(params.get("count", 33))
+            start = int(params.get("max_id") or 0)
+            with self._lock:
+                self._advance(time.time())
+                items = [{"pk": pk, "id": f"{pk}_{OWN_USER_ID}", "comment_count": len(self.comments[pk])}
+                         for pk in self.posts[start:start + count]]
+            more = start + count < len(self.posts)
+            return {"items": items, "more_available": more, "next_max_id": str(start + count) if more else None}
+
+        if parts[0] == "media" and parts[-1] == "comments":
+            self._call("comments")
+            media_pk = int(parts[1].split("_")[0])
+            offset = int(params.get("min_id") or 0)
+            with self._lock:
+                self._advance(time.time())
+                newest_first = self.comments[media_pk][::-1]
+            page = newest_first[offset:offset + COMMENTS_PAGE]
+            more = offset + COMMENTS_PAGE < len(newest_first)
+            return {"comments": page, "next_min_id": str(offset + COMMENTS_PAGE) if more else None}
+
+        raise ValueError(f"FakeClient: endpoint yo'q: {endpoint}")
+
+    def media_comment(self, media_id: str, text: str, replied_to_comment_id: str = None):
+        self._call("media_comment")
+        with self._lock:
+            self.replied_at.setdefault(str(replied_to_comment_id), time.time())
+        return SimpleNamespace(pk=random.randrange(1 << 40), text=text)
+
+    def user_friendship_v1(self, user_id):
+        self._call("friendship")
+        # Stable per user, so repeat triggers see the same answer
+        followed_by = random.Random(int(user_id)).random() < self.follower_ratio
+        return SimpleNamespace(followed_by=followed_by)
+
+    def direct_send(self, text: str, user_ids: list = None, thread_ids: list = None):
+        self._call("direct_send")
+        return SimpleNamespace(id=str(random.randrange(1 << 40)), text=text)
+
+    def backlog(self) -> int:
+        """Arrived comments that were never answered"""
+        with self._lock:
+            self._advance(time.time())
+            return len(self.arrivals) - len(self.replied_at)
+
+
+class FakeGeminiAI:
+    """Stand-in for GeminiAI: fixed reply after a lognormal latency, optional pacing"""
+
+    def __init__(self, latency: float, min_interval: float):
+        self.latency = latency
+        self.min_request_interval = min_interval
+        self.last_request_time = 0
+        self.calls = 0
+
+    def seconds_until_ready(self) -> float:
+        return max(0.0, self.min_request_interval - (time.time() - self.last_request_time))
+
+    def has_history(self, conversation_id: str) -> bool:
+        return False
+
+    def generate_response(self, user_message: str, context: str = "", max_retries: int = 5,
+                          conversation_id: str = "") -> str:
+        wait = self.seconds_until_ready()
+        if wait:
+            time.sleep(wait)
+        self.calls += 1
+        time.sleep(_lognormal(self.latency))
+        self.last_request_time = time.time()
+        return "Rahmat! Savolingiz bo'yicha direktga yozing 🙂"
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def build_bot(client, ai, dm_delay: float, workdir: str) -> InstagramAIBot:
+    """Real InstagramAIBot wired to a fake client and model"""
+    bot = InstagramAIBot()
+    bot.DM_DELAY = dm_delay
+
+    handler = InstagramHandler(bot.account)
+    handler.PROCESSED_FILE = os.path.join(workdir, "processed_comments.json")
+    handler.logged_in = True
+    handler.client = client
+    bot.instagram = handler
+    bot.ai = ai
+    bot.running = True
+    return bot
+
+
+def run_pipeline(bot: InstagramAIBot, duration: float, interval: float = 0, verbose: bool = False) -> dict:
+    """Run check cycles back to back (or `interval` apart) and collect the results"""
+    client = bot.instagram.client
+    tracer.enabled = True
+    tracemalloc.start()
+    client.start()
+    started = time.time()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with output:
+        while time.time() - started < duration:
+            bot._check_comments()
+            if interval:
+                time.sleep(interval)
+        log.flush()  # Queued bot log lines go to the redirected stream too
+    elapsed = time.time() - started
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Memory held by the pipeline, excluding the fake's own comment store
+    fake_files = {__file__, sys.modules[type(client).__module__].__file__, tracemalloc.__file__}
+    bot_bytes = sum(stat.size for stat in snapshot.filter_traces(
+        [tracemalloc.Filter(False, path) for path in fake_files]).statistics("filename"))
+
+    latencies = [client.replied_at[pk] - at for pk, at in client.arrivals.items() if pk in client.replied_at]
+    return {
+        "elapsed": elapsed,
+        "arrived": len(client.arrivals),
+        "processed": bot.stats["comments_processed"],
+        "replied": len(latencies),
+        "backlog": client.backlog(),
+        "stats": bot.stats,
+        "tier": bot.load_policy.tier,
+        "latencies": latencies,
+        "api_calls": sum(client.calls.values()),
+        "calls": client.calls,
+        "injected": client.injected,
+        "ai_calls": bot.ai.calls,
+        "bot_bytes": bot_bytes,
+        "peak_bytes": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def print_report(result: dict):
+    minutes = result["elapsed"] / 60
+    latencies = result["latencies"]
+    processed = result["processed"] or 1
+    print(f"📊 {result['processed']} ta ishlandi / {result['arrived']} ta keldi "
+          f"→ {result['processed'] / minutes:.1f} komment/min (backlog {result['backlog']}, tier {result['tier']})")
+    print(f"   ⏱️  komment→javob: p50 {_percentile(latencies, 0.50):.2f}s  p95 {_percentile(latencies, 0.95):.2f}s  "
+          f"p99 {_percentile(latencies, 0.99):.2f}s  ({len(latencies)} ta javob)")
+    print(f"   📡 API chaqiruvlari: {result['api_calls']} → {result['api_calls'] / processed:.2f} / komment  "
+          f"{dict(result['calls'])}")
+    print(f"   🧠 AI: {result['ai_calls']}  💉 kiritilgan xatoliklar: {dict(result['injected'])}")
+    stats = result["stats"]
+    print(f"   🔑 {stats['keywords_triggered']} kalit so'z  🔁 {stats['repeat_triggers']} takroriy  "
+          f"🧹 {stats['spam_skipped']} spam  ⏭️ {stats['shed_comments']} tashlandi  ❌ {stats['errors']} xato")
+    print(f"   💾 bot xotirasi {result['bot_bytes'] / 1024:.0f} KiB, tracemalloc peak "
+          f"{result['peak_bytes'] / 1024:.0f} KiB, max RSS {result['max_rss_kb'] / 1024:.0f} MiB")
+
+    print("\n🔬 Bosqichlar (ms):")
+    for name, summary in tracer.stats().items():
+        print(f"   {name:38} n={summary['count']:<5} p50={summary['p50_ms']:<8} p95={summary['p95_ms']:<8} "
+              f"max={summary['max_ms']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soxta Instagram/Gemini bilan oflayn end-to-end benchmark")
+    parser.add_argument("--duration", type=float, default=60, help="Sekund")
+    parser.add_argument("--rate", type=float, default=120, help="Daqiqasiga yangi kommentariyalar")
+    parser.add_argument("--posts", type=int, default=10)
+    parser.add_argument("--users", type=int, default=500, help="Izoh yozuvchilar soni")
+    parser.add_argument("--keyword-share", type=float, default=0.6)
+    parser.add_argument("--follower-ratio", type=float, default=0.7)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tranzient xatoliklar ulushi")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="'Please wait' xatoliklari ulushi")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="API kechikishlarini ko'paytirish")
+    parser.add_argument("--ai-latency", type=float, default=0.8, help="Gemini median kechikishi (s)")
+    parser.add_argument("--ai-interval", type=float, default=0.0, help="Gemini so'rovlari orasidagi minimum (prod: 60)")
+    parser.add_argument("--throttle-interval", type=float, default=0.05, help="THROTTLE_MIN_INTERVAL (prod: 1)")
+    parser.add_argument("--circuit-cooldown", type=int, default=5, help="CIRCUIT_BASE_COOLDOWN (prod: 300)")
+    parser.add_argument("--dm-delay", type=float, default=0.0, help="DM oldidan pauza (prod: 2)")
+    parser.add_argument("--interval", type=float, default=0.0, help="Tekshiruvlar orasidagi pauza (prod: 60)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Bot loglarini ko'rsatish")
+    args = parser.parse_args()
+
+    print(f"🧪 {args.duration:.0f}s, {args.rate:.0f} komment/min, kalit so'z {args.keyword_share:.0%}, "
+          f"obunachi {args.follower_ratio:.0%}, xatolik {args.error_rate:.0%}/{args.throttle_rate:.0%}\n")
+
+    # Compressed time: faster pacing/cooldowns than production unless asked otherwise
+    config.THROTTLE_MIN_INTERVAL = args.throttle_interval
+    config.CIRCUIT_BASE_COOLDOWN = args.circuit_cooldown
+    random.seed(args.seed)
+
+    client = FakeClient(
+        posts=args.posts, rate_per_min=args.rate, keywords=get_current_account().get_keywords(),
+        keyword_share=args.keyword_share, follower_ratio=args.follower_ratio, users=args.users,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, latency_scale=args.latency_scale,
+    )
+    ai = FakeGeminiAI(args.ai_latency, args.ai_interval)
+    bot = build_bot(client, ai, args.dm_delay, tempfile.mkdtemp(prefix="bench_e2e_"))
+    print_report(run_pipeline(bot, args.duration, args.interval, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
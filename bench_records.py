@@ -0,0 +1,77 @@
+"""
+Memory/allocation benchmark: instagrapi Comment models vs CommentRecord
+Run: python bench_records.py [comments]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from records import CommentRecord
+
+MEDIA_ID = "3300000000000000000_1234567890"
+
+
+def make_raw_comments(count: int) -> list:
+    """Build raw `media/{id}/comments/` items shaped like the private API"""
+    return [
+        {
+            "pk": str(18000000000000000 + i),
+            "text": f"pdf iltimos yuboring 🙏 #{i}",
+            "type": 0,
+            "created_at": 1700000000 + i,
+            "created_at_utc": 1700000000 + i,
+            "content_type": "comment",
+            "status": "Active",
+            "bit_flags": 0,
+            "did_report_as_spam": False,
+            "share_enabled": False,
+            "comment_like_count": i % 7,
+            "has_liked_comment": False,
+            "user_id": 50000000000 + i,
+            "user": {
+                "pk": 50000000000 + i,
+                "pk_id": str(50000000000 + i),
+                "username": f"user_{i}",
+                "full_name": f"User {i}",
+                "is_private": False,
+                "is_verified": False,
+                "profile_pic_url": f"https://instagram.example/{i}.jpg",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def measure(label: str, build):
+    """Measure build time, retained memory and peak allocations"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    items = build()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed * 1000:9.1f} ms  "
+          f"retained {current / 1024:9.1f} KiB  peak {peak / 1024:9.1f} KiB  "
+          f"({current / len(items):.0f} B/comment)")
+    return items
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    raw = make_raw_comments(count)
+    print(f"📊 {count} ta kommentariya")
+
+    measure("CommentRecord", lambda: [CommentRecord.from_raw(c, MEDIA_ID) for c in raw])
+
+    try:
+        from instagrapi.extractors import extract_comment
+    except ImportError:
+        print("⚠️ instagrapi o'rnatilmagan - pydantic Comment o'lchanmadi")
+        return
+    measure("instagrapi Comment", lambda: [extract_comment(dict(c)) for c in raw])
+
+
+if __name__ == "__main__":
+    main()
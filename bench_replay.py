@@ -0,0 +1,200 @@
+"""
+Replay a recorded traffic log (traffic_recorder.py) through the comment pipeline
+Run: python bench_replay.py traffic.jsonl.gz [--speed 10] [--latency-scale 1]
+
+The log becomes the workload: comments arrive at their recorded times (divided
+by --speed), follow checks answer as recorded, and every API/Gemini call takes
+a latency drawn from the recorded durations of that call and fails with the
+recorded error mix. The bot's own timers (check interval, throttle, circuit
+cooldown, DM delay, Gemini pacing) are divided by --speed as well, so 10x
+replays the same day in a tenth of the time against production-shaped load.
+Reports the same figures as bench_e2e.py
+"""
+import argparse
+import random
+import tempfile
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+from bench_e2e import FakeClient, FakeGeminiAI, build_bot, run_pipeline, print_report
+from config import config
+from main import InstagramAIBot
+from traffic_recorder import OWNER_PK, read_events
+
+# Production timers that are compressed by --speed
+CHECK_INTERVAL = 60
+GEMINI_INTERVAL = 60
+
+
+class RecordedTraffic:
+    """Workload extracted from a recording"""
+
+    def __init__(self, path: str, account: str = None):
+        self.media = []  # Media pks in feed order
+        self.comments = {}  # comment pk -> (created_at, media pk, raw comment)
+        self.followed_by = {}  # user pk -> bool
+        self.latency_ms = defaultdict(list)  # call -> recorded durations
+        self.errors = defaultdict(list)  # call -> error name or None, per recorded call
+        self.ai_texts = []
+        self.started = self.ended = None
+        self.events = 0
+
+        for event in read_events(path):
+            if account and event.get("acct") != account:
+                continue
+            self._add(event)
+
+    def _add(self, event: dict):
+        self.events += 1
+        t = event["t"]
+        self.started = t if self.started is None else min(self.started, t)
+        self.ended = t if self.ended is None else max(self.ended, t)
+        call = event["call"]
+        self.latency_ms[call].append(event["ms"])
+        self.errors[call].append(event.get("error"))
+        res = event.get("res") or {}
+
+        if call.startswith("feed/"):
+            for item in res.get("items", []):
+                if int(item["pk"]) not in self.media:
+                    self.media.append(int(item["pk"]))
+        elif call.startswith("media/") and call.endswith("comments"):
+            media_pk = int(str(event["req"].get("media_id", "0")).split("_")[0])
+            for item in res.get("comments", []):
+                if (item.get("user") or {}).get("pk") == OWNER_PK:
+                    continue  # Our own replies are not workload
+                created_at = item.get("created_at_utc") or item.get("created_at") or 0
+                self.comments.setdefault(str(item["pk"]), (created_at, media_pk, item))
+        elif call == "user_friendship_v1" and "followed_by" in res:
+            self.followed_by[event["req"].get("user_pk")] = res["followed_by"]
+        elif call == "generate_response" and res.get("text"):
+            self.ai_texts.append(res["text"])
+
+    def arrivals(self, include_existing: bool = False) -> list:
+        """(seconds after the recording start, media pk, raw comment), oldest first"""
+        result = []
+        for created_at, media_pk, item in self.comments.values():
+            offset = created_at - int(self.started)
+            if offset < 0 and not include_existing:
+                continue  # Already there when recording started
+            # created_at has 1s resolution: spread within the second instead of bursting
+            result.append((max(0.0, offset + random.random()), media_pk, item))
+        result.sort(key=lambda a: a[0])
+        return result
+
+    @property
+    def follower_ratio(self) -> float:
+        values = list(self.followed_by.values())
+        return sum(values) / len(values) if values else 0.5
+
+
+class ReplayClient(FakeClient):
+    """FakeClient whose posts, comments, follow answers, latencies and errors come from a recording"""
+
+    def __init__(self, traffic: RecordedTraffic, speed: float, latency_scale: float, include_existing: bool):
+        super().__init__(posts=0, rate_per_min=0, keywords=[], keyword_share=0, follower_ratio=traffic.follower_ratio,
+                         users=1, error_rate=0, throttle_rate=0, latency_scale=latency_scale)
+        self.user_id = str(OWNER_PK)
+        self.traffic = traffic
+        self.speed = speed
+        self.posts = traffic.media or sorted({media_pk for _, media_pk, _ in traffic.arrivals(True)}, reverse=True)
+        self.comments = {pk: [] for pk in self.posts}
+        self._pending = traffic.arrivals(include_existing)
+        self._position = 0
+        self._started = None
+        self._error_types = {}
+
+    def start(self):
+        self._started = time.time()
+
+    def _advance(self, now: float):
+        while self._position < len(self._pending):
+            offset, media_pk, item = self._pending[self._position]
+            at = self._started + offset / self.speed
+            if at > now:
+                return
+            self._position += 1
+            # Re-stamped to replay time so comment ages (load tiers) stay meaningful
+            comment = dict(item, created_at_utc=int(at))
+            self.comments.setdefault(media_pk, []).append(comment)
+            self.arrivals[str(item["pk"])] = at
+
+    def _recorded_call(self, call: str):
+        durations = self.traffic.latency_ms.get(call)
+        if durations:
+            time.sleep(random.choice(durations) / 1000 * self.latency_scale)
+        outcomes = self.traffic.errors.get(call)
+        error = random.choice(outcomes) if outcomes else None
+        if error:
+            self.injected[error] += 1
+            # Same class name as recorded, so the circuit breaker classifies it the same way
+            error_type = self._error_types.setdefault(error, type(error, (Exception,), {}))
+            raise error_type(f"recorded {error}")
+
+    def _call(self, name: str):
+        self.calls[name] += 1
+        call = {"feed": "feed/user", "comments": "media/comments", "friendship": "user_friendship_v1"}.get(name, name)
+        self._recorded_call(call)
+
+    def user_friendship_v1(self, user_id):
+        self._call("friendship")
+        followed_by = self.traffic.followed_by.get(int(user_id))
+        if followed_by is None:
+            followed_by = random.Random(int(user_id)).random() < self.follower_ratio
+        return SimpleNamespace(followed_by=followed_by)
+
+
+class ReplayGeminiAI(FakeGeminiAI):
+    """Recorded Gemini latencies and (scrubbed) replies"""
+
+    def __init__(self, traffic: RecordedTraffic, min_interval: float, latency_scale: float):
+        super().__init__(latency=0, min_interval=min_interval)
+        self.durations = traffic.latency_ms.get("generate_response") or [800.0]
+        self.texts = traffic.ai_texts or ["Rahmat!"]
+        self.latency_scale = latency_scale
+
+    def generate_response(self, user_message: str, context: str = "", max_retries: int = 5,
+                          conversation_id: str = "") -> str:
+        wait = self.seconds_until_ready()
+        if wait:
+            time.sleep(wait)
+        self.calls += 1
+        time.sleep(random.choice(self.durations) / 1000 * self.latency_scale)
+        self.last_request_time = time.time()
+        return random.choice(self.texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yozib olingan trafikni pipeline orqali qayta o'ynatish")
+    parser.add_argument("log", help="TRAFFIC_RECORD_FILE (.jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=1, help="1, 10, 100 ...")
+    parser.add_argument("--account", help="Faqat shu akkaunt yozuvlari")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Yozilgan kechikishlarni ko'paytirish")
+    parser.add_argument("--include-existing", action="store_true", help="Yozuv boshlanishidan oldingi kommentlar ham")
+    parser.add_argument("--drain", type=float, default=0, help="Log tugagach qo'shimcha sekund")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    traffic = RecordedTraffic(args.log, args.account)
+    if not traffic.events:
+        print("❌ Logda yozuvlar yo'q")
+        return
+    span = traffic.ended - traffic.started
+    duration = span / args.speed + args.drain
+    print(f"🎞️ {traffic.events} ta yozuv, {len(traffic.comments)} ta komment, {len(traffic.media)} ta post, "
+          f"{span / 60:.1f} daqiqa → {args.speed:g}x tezlikda {duration:.0f}s\n")
+
+    # Production timers compressed by the replay speed
+    config.THROTTLE_MIN_INTERVAL /= args.speed
+    config.CIRCUIT_BASE_COOLDOWN = max(1, int(config.CIRCUIT_BASE_COOLDOWN / args.speed))
+    client = ReplayClient(traffic, args.speed, args.latency_scale, args.include_existing)
+    ai = ReplayGeminiAI(traffic, GEMINI_INTERVAL / args.speed, args.latency_scale)
+    bot = build_bot(client, ai, InstagramAIBot.DM_DELAY / args.speed, tempfile.mkdtemp(prefix="bench_replay_"))
+    print_report(run_pipeline(bot, duration, CHECK_INTERVAL / args.speed, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Throughput/memory benchmark for the near-duplicate spam filter
+Run: python bench_spam_filter.py [comments] [bot_share]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from records import CommentRecord
+from spam_filter import SpamFilter, NearDuplicateIndex
+
+BOT_TEMPLATES = [
+    "Zo'r post! Sahifamizga kiring, pul ishlash sirlari bor 💰💰",
+    "Follow me for free followers and likes!!! check my bio now",
+    "Eng arzon narxlar bizda, direktga yozing aka ✅✅✅",
+    "Wow amazing content, DM us for collaboration on our page",
+]
+WORDS = ("salom qanday narxi qachon yetkazib berasiz rahmat juda yaxshi post "
+         "menga ham kerak qayerdan olsa boladi savol bor edi kurs haqida").split()
+EMOJI = "🔥😍👍🙏💯✅"
+
+
+def make_comments(count: int, bot_share: float, seed: int = 7) -> list:
+    """Synthetic stream: bot-ring variants mixed with unique human comments"""
+    rng = random.Random(seed)
+    comments = []
+    for i in range(count):
+        if rng.random() < bot_share:
+            text = rng.choice(BOT_TEMPLATES)
+            text = f"{text} {rng.choice(EMOJI)}{rng.randint(1, 999)}"
+        else:
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        comments.append(CommentRecord(str(i), text, str(1000 + i), f"user_{i}", "1_1"))
+    return comments
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    bot_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.6
+    comments = make_comments(count, bot_share)
+
+    spam_filter = SpamFilter(
+        threshold=5,
+        min_chars=12,
+        index=NearDuplicateIndex(window=3600, max_distance=3, max_entries=100_000),
+    )
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    flagged = 0
+    batch = 50  # Roughly one media_comments page
+    for i in range(0, count, batch):
+        _, spam = spam_filter.split(comments[i:i + batch], timestamp=1_700_000_000 + i / 500)
+        flagged += len(spam)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    bots = sum(1 for c in comments if any(c.text.startswith(t) for t in BOT_TEMPLATES))
+    print(f"📊 {count} ta kommentariya ({bots} ta bot)")
+    print(f"   ⏱️  {elapsed:.2f}s  →  {count / elapsed * 60:,.0f} comment/min")
+    print(f"   🧹 spam deb belgilandi: {flagged}  (indeks: {len(spam_filter.index)} ta)")
+    print(f"   💾 xotira: {current / 1024 / 1024:.1f} MiB (peak {peak / 1024 / 1024:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
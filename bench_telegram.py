@@ -0,0 +1,151 @@
+"""
+Load test of the Telegram subscription bot against a local fake Bot API
+Run: python bench_telegram.py [updates] [users] [api_latency_ms]
+
+Compares sequential update handling without a subscription cache against the
+configured concurrent mode with SubscriptionCache
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:FAKE")
+os.environ.setdefault("TELEGRAM_CHANNEL", "@fakechannel")
+os.environ.setdefault("TELEGRAM_CONTENT_LINK", "https://example.com/content")
+
+from telegram import Update
+from telegram.ext import TypeHandler
+from subscription_cache import SubscriptionCache
+from telegram_bot import TelegramSubscriptionBot
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fakebot"}
+
+
+class FakeBotAPI(BaseHTTPRequestHandler):
+    """Minimal Bot API: answers the methods the bot uses after a fixed latency"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    disable_nagle_algorithm = True
+    latency = 0.05
+    subscribed_share = 0.7
+    calls = Counter()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        method = self.path.rsplit("/", 1)[-1]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else ""
+        params = json.loads(body) if body.startswith("{") else dict(parse_qsl(body))
+        with self.lock:
+            self.calls[method] += 1
+        time.sleep(self.latency)
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getChatMember":
+            user_id = int(params.get("user_id", 0))
+            status = "member" if (user_id * 2654435761 % 100) < self.subscribed_share * 100 else "left"
+            result = {"status": status, "user": {"id": user_id, "is_bot": False, "first_name": "u"}}
+        elif method in ("sendMessage", "editMessageText"):
+            chat_id = int(params.get("chat_id") or 1)
+            result = {"message_id": 1, "date": int(time.time()), "text": params.get("text", ""),
+                      "chat": {"id": chat_id, "type": "private"}}
+        else:
+            result = True
+
+        payload = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def make_updates(count: int, users: int, bot, seed: int = 3) -> list:
+    """Campaign burst: /start from many users, some pressing "✅ Obuna bo'ldim" repeatedly"""
+    rng = random.Random(seed)
+    updates = []
+    for i in range(count):
+        user_id = 1000 + rng.randrange(users)
+        user = {"id": user_id, "is_bot": False, "first_name": "u"}
+        chat = {"id": user_id, "type": "private"}
+        if rng.random() < 0.7:
+            data = {"update_id": i, "message": {
+                "message_id": i, "date": 0, "chat": chat, "from": user, "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            }}
+        else:
+            data = {"update_id": i, "callback_query": {
+                "id": str(i), "from": user, "chat_instance": "1", "data": "check_subscription",
+                "message": {"message_id": i, "date": 0, "chat": chat, "from": BOT_USER, "text": "x"},
+            }}
+        updates.append(Update.de_json(data, bot))
+    return updates
+
+
+async def run_case(name: str, base_url: str, updates_count: int, users: int,
+                   concurrent: int, cache: SubscriptionCache) -> dict:
+    FakeBotAPI.calls.clear()
+    bot = TelegramSubscriptionBot(subscription_cache=cache)
+    app = bot.build_application(base_url=base_url, concurrent_updates=concurrent)
+
+    done = asyncio.Event()
+    handled = 0
+
+    async def count(update, context):
+        nonlocal handled
+        handled += 1
+        if handled >= updates_count:
+            done.set()
+
+    app.add_handler(TypeHandler(Update, count), group=1)
+
+    async with app:
+        await app.start()
+        updates = make_updates(updates_count, users, app.bot)
+        started = time.perf_counter()
+        for update in updates:
+            await app.update_queue.put(update)
+        await done.wait()
+        elapsed = time.perf_counter() - started
+        await app.stop()
+
+    calls = dict(FakeBotAPI.calls)
+    print(f"📊 {name}")
+    print(f"   ⏱️  {elapsed:.2f}s  →  {updates_count / elapsed:,.0f} update/s")
+    print(f"   📡 getChatMember: {calls.get('getChatMember', 0)}  "
+          f"(jami API: {sum(calls.values()) - calls.get('getMe', 0)})")
+    print(f"   🗂️  kesh: {cache.stats()}")
+    return {"elapsed": elapsed, "calls": calls}
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    FakeBotAPI.latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    ThreadingHTTPServer.request_queue_size = 256
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBotAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+
+    print(f"🧪 {updates} ta update, {users} ta foydalanuvchi, API kechikishi {FakeBotAPI.latency * 1000:.0f}ms\n")
+    asyncio.run(run_case("Ketma-ket, keshsiz", base_url, updates, users, 1,
+                         SubscriptionCache(ttl=0, negative_ttl=0)))
+    asyncio.run(run_case("Parallel + kesh", base_url, updates, users, None, SubscriptionCache()))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
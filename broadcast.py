@@ -0,0 +1,243 @@
+"""
+Telegram subscriber store and rate-paced broadcast engine
+Users who /start the bot are buffered and upserted into telegram_subscribers.
+A broadcast walks the subscribers in user_id order page by page, sends
+concurrently behind a global token bucket (Telegram allows ~30 msg/s; each
+chat gets a single message per broadcast, well inside the per-chat limit),
+pauses on RetryAfter, prunes users who blocked the bot and checkpoints the
+cursor after every page so an interrupted run resumes where it stopped
+
+Run: python broadcast.py send "Matn"  |  python broadcast.py resume <id>  |  python broadcast.py status <id>
+"""
+import asyncio
+import sys
+import threading
+import time
+from typing import Optional
+from config import config
+from database import get_db
+from logger import log
+
+
+class SubscriberRecorder:
+    """Buffers /start users in memory; a background thread upserts them in batches"""
+
+    def __init__(self, flush_interval: float = None):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_interval = flush_interval or config.SUBSCRIBER_FLUSH_INTERVAL
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, user_id: int, keyword: Optional[str] = None):
+        """Remember a user (non-blocking, safe to call from the event loop)"""
+        with self._lock:
+            if keyword or user_id not in self._pending:
+                self._pending[user_id] = keyword
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="subscriber-flush")
+                self._thread.start()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        db = get_db()
+        if db.enabled and not db.save_telegram_subscribers(list(pending.items())):
+            with self._lock:
+                for user_id, keyword in pending.items():
+                    self._pending.setdefault(user_id, keyword)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self._flush_interval)
+            self.flush()
+
+
+subscriber_recorder = SubscriberRecorder()
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/s, bursts up to `capacity`; can be paused"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens (flood control applies to the whole bot)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    self._updated = time.monotonic()
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after_seconds(error) -> float:
+    value = error.retry_after
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+
+class BroadcastEngine:
+    """Sends one broadcast to all reachable subscribers"""
+
+    def __init__(self, bot, store=None, rate: float = None, concurrency: int = None, page_size: int = None):
+        """
+        Args:
+            bot: telegram.Bot (initialized by the caller)
+            store: Database-like object (get_telegram_subscribers, save_broadcast_progress, ...)
+            rate: Global messages per second (BROADCAST_RATE)
+            concurrency: Sends in flight (BROADCAST_CONCURRENCY)
+            page_size: Subscribers per page / checkpoint (BROADCAST_PAGE_SIZE)
+        """
+        self.bot = bot
+        self.store = store or get_db()
+        self.bucket = TokenBucket(rate or config.BROADCAST_RATE)
+        self.concurrency = concurrency or config.BROADCAST_CONCURRENCY
+        self.page_size = page_size or config.BROADCAST_PAGE_SIZE
+        self.counts = {"sent": 0, "failed": 0, "blocked": 0}
+        self.retry_after_pauses = 0
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        """Finish in-flight sends, checkpoint and return"""
+        self._stop.set()
+
+    async def _send(self, user_id: int, text: str, semaphore: asyncio.Semaphore) -> str:
+        """Send to one user; returns "sent", "blocked" or "failed" """
+        from telegram.error import RetryAfter, Forbidden, BadRequest, TelegramError, TimedOut, NetworkError
+
+        async with semaphore:
+            errors = 0
+            while True:
+                await self.bucket.acquire()
+                try:
+                    await self.bot.send_message(chat_id=user_id, text=text)
+                    return "sent"
+                except RetryAfter as e:
+                    # Flood control: pause everyone, then retry this message
+                    self.retry_after_pauses += 1
+                    self.bucket.pause(_retry_after_seconds(e))
+                    continue
+                except Forbidden:
+                    return "blocked"  # Bot blocked / user deactivated
+                except BadRequest as e:
+                    return "blocked" if "chat not found" in str(e).lower() else "failed"
+                except (TimedOut, NetworkError):
+                    errors += 1
+                except TelegramError:
+                    return "failed"
+                if errors > config.BROADCAST_MAX_RETRIES:
+                    return "failed"
+                await asyncio.sleep(2 ** errors)
+
+    def _checkpoint(self, broadcast_id: int, cursor: int, status: str):
+        self.store.save_broadcast_progress(broadcast_id, cursor, status=status, **self.counts)
+
+    async def run(self, broadcast_id: int, progress_every: float = 10) -> dict:
+        """Send (or resume) a broadcast; returns the final progress row"""
+        broadcast = await asyncio.to_thread(self.store.get_broadcast, broadcast_id)
+        if not broadcast:
+            raise ValueError(f"Broadcast topilmadi: {broadcast_id}")
+        if broadcast["status"] == "done":
+            return broadcast
+
+        text = broadcast["text"]
+        cursor = broadcast["last_user_id"]
+        for key in self.counts:
+            self.counts[key] = broadcast[key]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic()
+        last_report = started
+        sent_at_start = self.counts["sent"]
+        status = "running"
+
+        while not self._stop.is_set():
+            page = await asyncio.to_thread(self.store.get_telegram_subscribers, cursor, self.page_size)
+            if not page:
+                status = "done"
+                break
+
+            results = await asyncio.gather(*(self._send(user_id, text, semaphore) for user_id in page))
+            blocked = [user_id for user_id, result in zip(page, results) if result == "blocked"]
+            for result in results:
+                self.counts[result] += 1
+            if blocked:
+                await asyncio.to_thread(self.store.mark_telegram_subscribers_blocked, blocked)
+
+            # Checkpoint only after the whole page is done (a crash resends at most one page)
+            cursor = page[-1]
+            await asyncio.to_thread(self._checkpoint, broadcast_id, cursor, status)
+
+            now = time.monotonic()
+            if now - last_report >= progress_every:
+                rate = (self.counts["sent"] - sent_at_start) / (now - started)
+                log.info("broadcast_progress", "📣 Broadcast #{broadcast_id}: {counts} ({rate:.1f} msg/s)",
+                         broadcast_id=broadcast_id, counts=dict(self.counts), rate=rate)
+                last_report = now
+
+        if status != "done":
+            status = "paused"
+        await asyncio.to_thread(self._checkpoint, broadcast_id, cursor, status)
+        log.info("broadcast_finished", "{icon} Broadcast #{broadcast_id} {status}: {counts}",
+                 icon="✅" if status == "done" else "⏸️", broadcast_id=broadcast_id, status=status,
+                 counts=dict(self.counts))
+        return await asyncio.to_thread(self.store.get_broadcast, broadcast_id)
+
+
+async def _run_cli(broadcast_id: int):
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+
+    request = HTTPXRequest(connection_pool_size=config.BROADCAST_CONCURRENCY + 4, pool_timeout=30)
+    async with Bot(config.TELEGRAM_BOT_TOKEN, request=request) as bot:
+        engine = BroadcastEngine(bot)
+        loop = asyncio.get_running_loop()
+        try:
+            import signal
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, engine.stop)
+        except (NotImplementedError, RuntimeError):
+            pass
+        await engine.run(broadcast_id)
+
+
+def main():
+    db = get_db()
+    if len(sys.argv) < 3 or sys.argv[1] not in ("send", "resume", "status"):
+        print(__doc__)
+        sys.exit(2)
+    if not db.enabled or not config.TELEGRAM_BOT_TOKEN:
+        print("❌ DATABASE_URL va TELEGRAM_BOT_TOKEN kerak")
+        sys.exit(1)
+
+    command, arg = sys.argv[1], sys.argv[2]
+    if command == "status":
+        print(db.get_broadcast(int(arg)), db.count_telegram_subscribers())
+        return
+
+    broadcast_id = db.create_broadcast(arg) if command == "send" else int(arg)
+    if broadcast_id is None:
+        sys.exit(1)
+    print(f"📣 Broadcast #{broadcast_id} boshlandi ({db.count_telegram_subscribers()})")
+    asyncio.run(_run_cli(broadcast_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Global Instagram API circuit breaker and adaptive (AIMD) throttle
+Every InstagramHandler client call goes through `api_guard.call(family, ...)`:
+- throttle errors (feedback_required, please wait, 429) open the circuit of
+  that endpoint family with exponential backoff, then a single half-open probe
+  decides whether to close it again
+- each family is paced by an AIMD throttle: the allowed call rate grows
+  additively on success and is halved on every throttle error
+"""
+import threading
+import time
+from typing import Dict
+from config import config
+from logger import log
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Instagram while a family's circuit is open"""
+
+    def __init__(self, family: str, retry_in: float):
+        self.family = family
+        self.retry_in = retry_in
+        super().__init__(f"'{family}' API to'xtatilgan, {retry_in:.0f}s dan keyin qayta")
+
+
+# Error classes (instagrapi exception names, HTTP status and Instagram's error_type)
+THROTTLE = "throttle"
+AUTH = "auth"
+TRANSIENT = "transient"
+OTHER = "other"
+
+_THROTTLE_NAMES = {"FeedbackRequired", "PleaseWaitFewMinutes", "RateLimitError", "ClientThrottledError",
+                   "SentryBlock"}
+_THROTTLE_ERROR_TYPES = {"feedback_required", "rate_limit_error", "please_wait"}
+THROTTLE_STATUS = 429
+_AUTH_NAMES = {"LoginRequired", "ChallengeRequired", "ReloginAttemptExceeded", "BadPassword",
+               "TwoFactorRequired"}
+_TRANSIENT_NAMES = {"ClientConnectionError", "ClientRequestTimeout", "ConnectionError", "Timeout",
+                    "ReadTimeout", "ClientJSONDecodeError"}
+
+
+def classify_error(error: Exception) -> str:
+    """Classify an instagrapi/requests exception for the breaker"""
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & _THROTTLE_NAMES:
+        return THROTTLE
+    if names & _AUTH_NAMES:
+        return AUTH
+    # Structured fields only: ids and comment texts in messages must not open a circuit
+    status = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "code", None)
+    if status == THROTTLE_STATUS or getattr(error, "error_type", None) in _THROTTLE_ERROR_TYPES:
+        return THROTTLE
+    if names & _TRANSIENT_NAMES:
+        return TRANSIENT
+    return OTHER
+
+
+class EndpointCircuit:
+    """Circuit breaker + AIMD throttle for one endpoint family"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, family: str):
+        self.family = family
+        self.state = self.CLOSED
+        self.opened_until = 0.0
+        self.open_count = 0  # Consecutive openings (drives the backoff)
+        self.probe_in_flight = False
+        self.max_rate = 1.0 / config.THROTTLE_MIN_INTERVAL
+        self.min_rate = 1.0 / config.THROTTLE_MAX_INTERVAL
+        self.rate = self.max_rate  # Allowed calls per second
+        self.next_call_at = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def before_call(self, now: float) -> float:
+        """Admit a call; returns how long to wait first (raises if circuit open)"""
+        if self.state == self.OPEN:
+            if now < self.opened_until:
+                self.rejected += 1
+                raise CircuitOpenError(self.family, self.opened_until - now)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.family, 1.0)
+            self.probe_in_flight = True
+
+        wait = max(0.0, self.next_call_at - now)
+        self.next_call_at = max(now, self.next_call_at) + 1.0 / self.rate
+        self.calls += 1
+        return wait
+
+    def on_success(self):
+        if self.state == self.HALF_OPEN:
+            log.info("circuit_closed", "✅ '{family}' API tiklandi (circuit yopildi)", family=self.family)
+        self.state = self.CLOSED
+        self.open_count = 0
+        self.probe_in_flight = False
+        # Additive increase
+        self.rate = min(self.max_rate, self.rate + config.THROTTLE_RATE_STEP)
+
+    def on_error(self, error: Exception, kind: str, now: float):
+        self.probe_in_flight = False
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+        if kind != THROTTLE:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED  # Probe reached Instagram; not a block
+            return
+
+        # Multiplicative decrease + open the circuit with exponential backoff
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.open_count += 1
+        cooldown = min(config.CIRCUIT_BASE_COOLDOWN * 2 ** (self.open_count - 1), config.CIRCUIT_MAX_COOLDOWN)
+        self.state = self.OPEN
+        self.opened_until = now + cooldown
+        log.warning("circuit_opened", "🚫 '{family}' API bloklandi ({error}), {cooldown:.0f}s to'xtatildi",
+                    family=self.family, error=type(error).__name__, cooldown=cooldown)
+
+    def status(self, now: float) -> dict:
+        return {
+            "state": self.state,
+            "retry_in": round(max(0.0, self.opened_until - now), 1) if self.state == self.OPEN else 0,
+            "rate_per_min": round(self.rate * 60, 2),
+            "open_count": self.open_count,
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+class ApiGuard:
+    """Shared breaker/throttle registry for all Instagram client calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, EndpointCircuit] = {}
+
+    def _circuit(self, family: str) -> EndpointCircuit:
+        circuit = self._circuits.get(family)
+        if circuit is None:
+            circuit = self._circuits[family] = EndpointCircuit(family)
+        return circuit
+
+    def call(self, family: str, func, *args, **kwargs):
+        """
+        Call `func` under the breaker/throttle of `family`
+
+        Raises:
+            CircuitOpenError: if the family is blocked (no API call is made)
+        """
+        with self._lock:
+            circuit = self._circuit(family)
+            wait = circuit.before_call(time.time())
+        if wait > 0:
+            time.sleep(wait)
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            kind = classify_error(e)
+            with self._lock:
+                circuit.on_error(e, kind, time.time())
+            raise
+        with self._lock:
+            circuit.on_success()
+        return result
+
+    def is_open(self, family: str) -> bool:
+        with self._lock:
+            circuit = self._circuits.get(family)
+            return bool(circuit and circuit.state == EndpointCircuit.OPEN and time.time() < circuit.opened_until)
+
+    def status(self) -> dict:
+        """Per-family breaker and throttle state"""
+        now = time.time()
+        with self._lock:
+            return {family: circuit.status(now) for family, circuit in self._circuits.items()}
+
+
+# Shared instance (cheap: no network at import time)
+api_guard = ApiGuard()
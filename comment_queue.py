@@ -0,0 +1,117 @@
+"""
+Distributed comment worker for the Postgres job queue
+Run any number of copies: python comment_queue.py
+Jobs are claimed with FOR UPDATE SKIP LOCKED, so no comment is processed twice;
+the ingesting bot (QUEUE_MODE=true) only discovers comments and queues them
+"""
+import os
+import signal
+import socket
+import threading
+from config import config
+from database import get_db
+from records import CommentRecord, MediaRecord
+from logger import log
+
+
+class CommentQueueWorker:
+    """Claims comment jobs from Postgres and runs them through InstagramAIBot"""
+
+    def __init__(self, bot=None):
+        from main import InstagramAIBot
+
+        self.bot = bot or InstagramAIBot()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = False
+        self._stop = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self):
+        """Stop after the current job"""
+        self.running = False
+        self._stop.set()
+
+    @staticmethod
+    def _job_records(job: dict):
+        """Rebuild the media/comment records a job was queued from"""
+        media = MediaRecord(pk=job['media_pk'], id=job['media_id'])
+        comment = CommentRecord(
+            pk=job['comment_id'],
+            text=job['text'] or "",
+            user_pk=job['user_pk'],
+            username=job['username'] or "",
+            media_id=job['media_id'],
+        )
+        return media, comment
+
+    def run_once(self) -> int:
+        """Claim and process one batch; returns the number of claimed jobs"""
+        db = get_db()
+        
+        # Shed load based on this account's queue backlog
+        stats = db.get_comment_job_stats(self.bot.account.name)
+        if stats:
+            depth = stats.get('pending', 0) + stats.get('running', 0)
+            self.bot.load_policy.update(depth, stats.get('oldest_age', 0.0))
+        
+        jobs = db.claim_comment_jobs(
+            self.worker_id,
+            limit=config.QUEUE_BATCH_SIZE,
+            visibility_timeout=config.QUEUE_VISIBILITY_TIMEOUT,
+            max_attempts=config.QUEUE_MAX_ATTEMPTS,
+            account=self.bot.account.name,
+        )
+
+        for job in jobs:
+            if not self.running:
+                break  # Unstarted jobs become visible again after the timeout
+            media, comment = self._job_records(job)
+            try:
+                if not self.bot._process_comment(media, comment):
+                    raise RuntimeError("javob yoki DM yuborilmadi")  # Retried up to QUEUE_MAX_ATTEMPTS
+                db.complete_comment_job(job['id'])
+                self.processed += 1
+            except Exception as e:
+                log.error("queue_job_failed", "❌ Job #{job_id} xatosi (urinish {attempts}): {error}",
+                          job_id=job['id'], attempts=job['attempts'], error=str(e))
+                db.fail_comment_job(
+                    job['id'], str(e),
+                    max_attempts=config.QUEUE_MAX_ATTEMPTS,
+                    retry_delay=config.QUEUE_RETRY_DELAY,
+                )
+                self.failed += 1
+        return len(jobs)
+
+    def run(self):
+        """Poll the queue until stopped"""
+        if not config.QUEUE_MODE:
+            # Procfile starts a worker process on every deploy: stay idle unless the queue is in use
+            log.info("queue_disabled", "⏭️ QUEUE_MODE o'chiq - worker ishlamaydi")
+            return
+        if not get_db().enabled:
+            log.error("queue_no_db", "❌ Navbat uchun DATABASE_URL kerak!")
+            return
+        if not self.bot._prepare():
+            return
+
+        self.running = True
+        log.info("queue_worker_started", "👷 Worker ishga tushdi: {worker_id}", worker_id=self.worker_id)
+        while self.running:
+            claimed = self.run_once()
+            if claimed == 0:
+                self._stop.wait(config.QUEUE_POLL_INTERVAL)
+
+        log.info("queue_worker_stopped", "👋 Worker to'xtadi: {processed} ta bajarildi, {failed} ta xato",
+                 processed=self.processed, failed=self.failed)
+
+
+def main():
+    worker = CommentQueueWorker()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: worker.stop())
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
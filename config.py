@@ -17,6 +17,77 @@ class Config:
     
     # Bot settings
     CHECK_INTERVAL: int = int(os.getenv("CHECK_INTERVAL", "30"))
+    BLOCKING_WORKERS: int = int(os.getenv("BLOCKING_WORKERS", "4"))  # Executor size for blocking API calls
+    
+    # Session settings
+    SESSION_RESUME: bool = os.getenv("SESSION_RESUME", "true").lower() == "true"
+    SESSION_REFRESH_INTERVAL: int = int(os.getenv("SESSION_REFRESH_INTERVAL", "21600"))
+    
+    # processed_comments retention: older rows are pruned and older comments ignored;
+    # only the warm window is loaded at startup, older ids are looked up on demand
+    PROCESSED_RETENTION_DAYS: int = int(os.getenv("PROCESSED_RETENTION_DAYS", "90"))
+    PROCESSED_WARM_DAYS: int = int(os.getenv("PROCESSED_WARM_DAYS", "7"))
+    PROCESSED_PRUNE_INTERVAL: int = int(os.getenv("PROCESSED_PRUNE_INTERVAL", "3600"))
+    PROCESSED_PRUNE_BATCH: int = int(os.getenv("PROCESSED_PRUNE_BATCH", "5000"))
+    
+    # Warm restart: state snapshot on shutdown, restored on the next boot (see warm_state.py)
+    WARM_RESTART: bool = os.getenv("WARM_RESTART", "true").lower() == "true"
+    WARM_STATE_MAX_AGE: int = int(os.getenv("WARM_STATE_MAX_AGE", "1800"))  # Older snapshots are ignored
+    
+    # Distributed comment queue (see comment_queue.py)
+    QUEUE_MODE: bool = os.getenv("QUEUE_MODE", "false").lower() == "true"
+    QUEUE_BATCH_SIZE: int = int(os.getenv("QUEUE_BATCH_SIZE", "5"))
+    QUEUE_VISIBILITY_TIMEOUT: int = int(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "300"))
+    QUEUE_MAX_ATTEMPTS: int = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+    QUEUE_RETRY_DELAY: int = int(os.getenv("QUEUE_RETRY_DELAY", "60"))
+    QUEUE_POLL_INTERVAL: int = int(os.getenv("QUEUE_POLL_INTERVAL", "5"))
+    
+    # Multi-account supervisor (see supervisor.py)
+    AI_GLOBAL_MIN_INTERVAL: float = float(os.getenv("AI_GLOBAL_MIN_INTERVAL", "4"))
+    SUPERVISOR_STATUS_INTERVAL: int = int(os.getenv("SUPERVISOR_STATUS_INTERVAL", "60"))
+    
+    # Instagram API circuit breaker / AIMD throttle (see circuit_breaker.py)
+    CIRCUIT_BASE_COOLDOWN: int = int(os.getenv("CIRCUIT_BASE_COOLDOWN", "300"))
+    CIRCUIT_MAX_COOLDOWN: int = int(os.getenv("CIRCUIT_MAX_COOLDOWN", "21600"))
+    THROTTLE_MIN_INTERVAL: float = float(os.getenv("THROTTLE_MIN_INTERVAL", "1"))
+    THROTTLE_MAX_INTERVAL: float = float(os.getenv("THROTTLE_MAX_INTERVAL", "120"))
+    THROTTLE_RATE_STEP: float = float(os.getenv("THROTTLE_RATE_STEP", "0.02"))  # calls/s added per success
+    
+    # Leader election (multi-worker / hot standby deployments)
+    LEADER_LEASE_SECONDS: int = int(os.getenv("LEADER_LEASE_SECONDS", "15"))
+    LEADER_HEARTBEAT_INTERVAL: int = int(os.getenv("LEADER_HEARTBEAT_INTERVAL", "5"))
+    
+    # Tracing / profiling (see tracing.py); debug endpoints need DEBUG_TOKEN
+    TRACING: bool = os.getenv("TRACING", "true").lower() == "true"
+    TRACE_SLOW_MS: float = float(os.getenv("TRACE_SLOW_MS", "10000"))
+    TRACE_KEEP: int = int(os.getenv("TRACE_KEEP", "50"))
+    PROFILER: bool = os.getenv("PROFILER", "false").lower() == "true"  # Start sampling on boot
+    PROFILER_INTERVAL_MS: float = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+    DEBUG_TOKEN: str = os.getenv("DEBUG_TOKEN", "")
+    
+    # Structured logging (see logger.py)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "info")  # debug | info | warning | error
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json | text
+    LOG_RATE_LIMIT: int = int(os.getenv("LOG_RATE_LIMIT", "30"))  # Lines per event per window (0 = off)
+    LOG_RATE_WINDOW: float = float(os.getenv("LOG_RATE_WINDOW", "10"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    
+    # Per-conversation AI memory (see conversation_memory.py)
+    AI_MEMORY: bool = os.getenv("AI_MEMORY", "true").lower() == "true"
+    AI_MEMORY_TURNS: int = int(os.getenv("AI_MEMORY_TURNS", "6"))  # Recent exchanges kept verbatim
+    AI_MEMORY_TOKEN_BUDGET: int = int(os.getenv("AI_MEMORY_TOKEN_BUDGET", "600"))  # For the verbatim turns
+    AI_MEMORY_SUMMARY_TOKENS: int = int(os.getenv("AI_MEMORY_SUMMARY_TOKENS", "150"))
+    AI_MEMORY_MAX_CONVERSATIONS: int = int(os.getenv("AI_MEMORY_MAX_CONVERSATIONS", "5000"))
+    AI_MEMORY_IDLE_TTL: int = int(os.getenv("AI_MEMORY_IDLE_TTL", "86400"))
+    
+    # Hourly statistics rollups (see stats_rollup.py)
+    STATS_FLUSH_INTERVAL: int = int(os.getenv("STATS_FLUSH_INTERVAL", "60"))
+    STATS_MEMORY_HOURS: int = int(os.getenv("STATS_MEMORY_HOURS", "48"))  # Served without a DB
+    STATS_MAX_RANGE_DAYS: int = int(os.getenv("STATS_MAX_RANGE_DAYS", "92"))
+    
+    # Traffic recording for offline replay (see traffic_recorder.py); empty = off
+    TRAFFIC_RECORD_FILE: str = os.getenv("TRAFFIC_RECORD_FILE", "")  # e.g. traffic.jsonl.gz
+    TRAFFIC_RECORD_MAX_MB: int = int(os.getenv("TRAFFIC_RECORD_MAX_MB", "200"))
     
     # System prompt for AI
     SYSTEM_PROMPT: str = os.getenv(
@@ -32,23 +103,84 @@ class Config:
     DM_MESSAGE: str = os.getenv("DM_MESSAGE", "Salom! Ma'lumot uchun quyidagi linkni bosing:")
     DEFAULT_CONTENT_LINK: str = os.getenv("DEFAULT_CONTENT_LINK", "https://t.me/malumotniberuvchibot")
     
+    # Repeat keyword triggers by the same user (see trigger_cooldown.py)
+    TRIGGER_COOLDOWN: int = int(os.getenv("TRIGGER_COOLDOWN", "86400"))
+    TRIGGER_FOLLOW_RECHECK: int = int(os.getenv("TRIGGER_FOLLOW_RECHECK", "600"))
+    TRIGGER_COOLDOWN_MODE: str = os.getenv("TRIGGER_COOLDOWN_MODE", "ack")  # "ack" or "skip"
+    TRIGGER_COOLDOWN_MAX_ENTRIES: int = int(os.getenv("TRIGGER_COOLDOWN_MAX_ENTRIES", "50000"))
+    REPEAT_KEYWORD_REPLY: str = os.getenv("REPEAT_KEYWORD_REPLY", "Ma'lumot allaqachon direktingizga yuborilgan ✅")
+    
+    # Near-duplicate spam detection (see spam_filter.py)
+    SPAM_FILTER: bool = os.getenv("SPAM_FILTER", "true").lower() == "true"
+    SPAM_CLUSTER_THRESHOLD: int = int(os.getenv("SPAM_CLUSTER_THRESHOLD", "5"))
+    SPAM_WINDOW: int = int(os.getenv("SPAM_WINDOW", "3600"))
+    SPAM_MAX_DISTANCE: int = int(os.getenv("SPAM_MAX_DISTANCE", "3"))  # Hamming bits
+    SPAM_MAX_ENTRIES: int = int(os.getenv("SPAM_MAX_ENTRIES", "100000"))
+    SPAM_MIN_CHARS: int = int(os.getenv("SPAM_MIN_CHARS", "12"))
+    
+    # Backlog load shedding tiers (see load_shedding.py)
+    LOAD_TIER_DEPTHS: str = os.getenv("LOAD_TIER_DEPTHS", "20,100,500")  # short_ai,template,keyword_only
+    LOAD_TIER_AGES: str = os.getenv("LOAD_TIER_AGES", "900,3600,10800")  # seconds, same tiers
+    LOAD_TIER_BATCHES: str = os.getenv("LOAD_TIER_BATCHES", "1,3,10,25")  # comments per check, tiers 0..3
+    LOAD_TIER_MIN_DWELL: int = int(os.getenv("LOAD_TIER_MIN_DWELL", "300"))
+    TEMPLATE_REPLY: str = os.getenv("TEMPLATE_REPLY", "Rahmat! Savolingiz qabul qilindi, tez orada javob beramiz 🙏")
+    
     # Telegram settings
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     TELEGRAM_CHANNEL: str = os.getenv("TELEGRAM_CHANNEL", "")
     TELEGRAM_BOT_USERNAME: str = os.getenv("TELEGRAM_BOT_USERNAME", "")
     TELEGRAM_CONTENT_LINK: str = os.getenv("TELEGRAM_CONTENT_LINK", "")
+    TELEGRAM_CONCURRENT_UPDATES: int = int(os.getenv("TELEGRAM_CONCURRENT_UPDATES", "64"))
+    TELEGRAM_POOL_SIZE: int = int(os.getenv("TELEGRAM_POOL_SIZE", "128"))
+    TELEGRAM_POOL_TIMEOUT: float = float(os.getenv("TELEGRAM_POOL_TIMEOUT", "5"))
+    
+    # Webhook mode (see telegram_webhook.py): "auto" uses the webhook when a
+    # public URL is known and the bot runs inside web_server.py, else polling
+    TELEGRAM_MODE: str = os.getenv("TELEGRAM_MODE", "auto")  # auto / polling
+    TELEGRAM_WEBHOOK_URL: str = os.getenv("TELEGRAM_WEBHOOK_URL", "")  # Default: RENDER_EXTERNAL_URL
+    TELEGRAM_WEBHOOK_SECRET: str = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")  # Default: derived from token
+    
+    # Signed per-keyword /start deep links (see deep_links.py)
+    TELEGRAM_DEEP_LINKS: bool = os.getenv("TELEGRAM_DEEP_LINKS", "true").lower() == "true"
+    TELEGRAM_LINK_SECRET: str = os.getenv("TELEGRAM_LINK_SECRET", "")  # Default: derived from token
+    
+    # Subscriber store and broadcasts (see broadcast.py)
+    SUBSCRIBER_FLUSH_INTERVAL: int = int(os.getenv("SUBSCRIBER_FLUSH_INTERVAL", "5"))
+    BROADCAST_RATE: float = float(os.getenv("BROADCAST_RATE", "25"))  # msg/s, Telegram allows ~30
+    BROADCAST_CONCURRENCY: int = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+    BROADCAST_PAGE_SIZE: int = int(os.getenv("BROADCAST_PAGE_SIZE", "500"))
+    BROADCAST_MAX_RETRIES: int = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+    
+    # Subscription status cache (see subscription_cache.py)
+    TELEGRAM_SUB_CACHE_TTL: int = int(os.getenv("TELEGRAM_SUB_CACHE_TTL", "900"))
+    TELEGRAM_SUB_NEGATIVE_TTL: int = int(os.getenv("TELEGRAM_SUB_NEGATIVE_TTL", "60"))
+    TELEGRAM_SUB_RECHECK_INTERVAL: float = float(os.getenv("TELEGRAM_SUB_RECHECK_INTERVAL", "3"))
+    TELEGRAM_SUB_CACHE_MAX: int = int(os.getenv("TELEGRAM_SUB_CACHE_MAX", "100000"))
     
     # Keyword-Content mappings
     CONTENT_MAPPINGS: dict = {}
     
+    # Hot-reloadable content config (see content_config.py)
+    CONTENT_CONFIG_FILE: str = os.getenv("CONTENT_CONFIG_FILE", "content.json")
+    CONTENT_RELOAD_INTERVAL: int = int(os.getenv("CONTENT_RELOAD_INTERVAL", "10"))
+    
+    # Settings of the content config itself, not keywords
+    _CONTENT_SETTINGS = ("CONTENT_CONFIG_FILE", "CONTENT_RELOAD_INTERVAL")
+    
     @classmethod
-    def load_content_mappings(cls):
-        """Load keyword-content mappings from CONTENT_* env vars"""
-        cls.CONTENT_MAPPINGS = {}
+    def read_content_mappings(cls) -> dict:
+        """Read keyword-content mappings from CONTENT_* env vars"""
+        mappings = {}
         for key, value in os.environ.items():
-            if key.startswith("CONTENT_"):
+            if key.startswith("CONTENT_") and key not in cls._CONTENT_SETTINGS:
                 keyword = key.replace("CONTENT_", "").lower()
-                cls.CONTENT_MAPPINGS[keyword] = value
+                mappings[keyword] = value
+        return mappings
+    
+    @classmethod
+    def load_content_mappings(cls):
+        """Load keyword-content mappings from CONTENT_* env vars"""
+        cls.CONTENT_MAPPINGS = cls.read_content_mappings()
         
         if cls.CONTENT_MAPPINGS:
             print(f"📦 Kalit so'z-kontent mappinglar yuklandi: {list(cls.CONTENT_MAPPINGS.keys())}")
@@ -65,13 +197,19 @@ class Config:
         return list(cls.CONTENT_MAPPINGS.keys())
     
     @classmethod
-    def validate(cls) -> bool:
-        """Validate required configuration"""
+    def validate(cls, require_instagram: bool = True) -> bool:
+        """
+        Validate required configuration
+        
+        Args:
+            require_instagram: Check INSTAGRAM_USERNAME/PASSWORD (off when
+                credentials come from the account registry)
+        """
         errors = []
         
-        if not cls.INSTAGRAM_USERNAME:
+        if require_instagram and not cls.INSTAGRAM_USERNAME:
             errors.append("INSTAGRAM_USERNAME kiritilmagan")
-        if not cls.INSTAGRAM_PASSWORD:
+        if require_instagram and not cls.INSTAGRAM_PASSWORD:
             errors.append("INSTAGRAM_PASSWORD kiritilmagan")
         if not cls.GEMINI_API_KEY:
             errors.append("GEMINI_API_KEY kiritilmagan")
@@ -0,0 +1,242 @@
+"""
+Hot-reloadable keyword/content configuration
+Keyword→link mappings, reply templates and symbol aliases are layered as
+env (CONTENT_*, KEYWORD_REPLY, ...) < account registry < dynamic source,
+where the dynamic source is the content_config DB table or CONTENT_CONFIG_FILE.
+A watcher thread polls the source and atomically swaps in a recompiled snapshot
+
+Document format (DB row or file):
+    {"content": {"pdf": "https://t.me/bot?start=pdf"},
+     "keyword_reply": "...", "dm_message": "...", "follow_first_reply": "...",
+     "symbols": {"+": "plus"},
+     "telegram_content": {"pdf": "https://example.com/guide.pdf"},  # deep-link assets
+     "accounts": {"brand2": {...same keys...}}}   # file only; DB uses one row per account
+
+Push a file to the DB: python content_config.py push content.json
+"""
+import json
+import os
+import re
+import sys
+import threading
+from typing import Optional
+from config import config
+from database import get_db
+from deep_links import deep_link
+from logger import log
+
+# Symbol to keyword aliases (for special characters)
+DEFAULT_SYMBOL_ALIASES = {
+    '+': 'plus',
+    '➕': 'plus',
+}
+
+TEMPLATE_KEYS = ("keyword_reply", "dm_message", "follow_first_reply")
+
+
+class ContentSnapshot:
+    """Immutable compiled view of the content config; swapped as a whole"""
+
+    def __init__(self, mappings: dict, templates: dict, symbols: dict, version=None,
+                 telegram_content: dict = None):
+        self.mappings = mappings
+        self.telegram_content = telegram_content or {}
+        self.keyword_reply = templates["keyword_reply"]
+        self.dm_message = templates["dm_message"]
+        self.follow_first_reply = templates["follow_first_reply"]
+        self.version = version
+
+        # Symbol aliases only count when their keyword is configured
+        self._symbols = tuple((s, k) for s, k in symbols.items() if k in mappings)
+        self._keywords = tuple((k, k.strip()) for k in mappings if k.strip())
+        # One-pass pre-check: most comments contain no keyword at all
+        needles = [s for s, _ in self._symbols] + [n for _, n in self._keywords]
+        self._any = re.compile("|".join(map(re.escape, needles))) if needles else None
+        self._cased_symbols = any(s.lower() != s for s, _ in self._symbols)
+
+    def find_keyword(self, text: str) -> str:
+        """Find which keyword is in the text, return keyword or empty string"""
+        if self._any is None:
+            return ""
+        text_lower = text.lower()
+        if not self._any.search(text_lower) and not (self._cased_symbols and self._any.search(text)):
+            return ""
+
+        # First check for symbol aliases
+        for symbol, keyword in self._symbols:
+            if symbol in text:
+                return keyword
+
+        # Then check regular keywords
+        for keyword, needle in self._keywords:
+            if needle in text_lower:
+                return keyword
+        return ""
+
+    def get_keywords(self) -> list:
+        return list(self.mappings.keys())
+
+    def get_content_link(self, keyword: str) -> str:
+        return self.mappings.get(keyword.lower().strip(), config.DEFAULT_CONTENT_LINK)
+
+    def get_dm_link(self, keyword: str) -> str:
+        """Link for the DM: signed bot deep link when the keyword has a Telegram asset"""
+        if keyword.lower().strip() in self.telegram_content:
+            link = deep_link(keyword)
+            if link:
+                return link
+        return self.get_content_link(keyword)
+
+    def get_telegram_content(self, keyword: Optional[str]) -> str:
+        """Telegram asset of a keyword (O(1)), falling back to TELEGRAM_CONTENT_LINK"""
+        if keyword:
+            asset = self.telegram_content.get(keyword)
+            if asset:
+                return asset
+        return config.TELEGRAM_CONTENT_LINK
+
+
+def _validate_document(doc) -> dict:
+    """Check the shape of a config document; raises ValueError"""
+    if not isinstance(doc, dict):
+        raise ValueError("konfiguratsiya JSON obyekt bo'lishi kerak")
+    for key in ("content", "symbols", "telegram_content"):
+        value = doc.get(key, {})
+        if not isinstance(value, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) and k.strip() and v.strip() for k, v in value.items()
+        ):
+            raise ValueError(f"'{key}' satr→satr lug'at bo'lishi kerak")
+    for key in TEMPLATE_KEYS:
+        if key in doc and not (isinstance(doc[key], str) and doc[key].strip()):
+            raise ValueError(f"'{key}' bo'sh bo'lmagan satr bo'lishi kerak")
+    return doc
+
+
+class ContentStore:
+    """Current content snapshot of one account plus its reload watcher"""
+
+    def __init__(self, account, config_file: str = None):
+        self.account = account
+        self.config_file = config_file if config_file is not None else config.CONTENT_CONFIG_FILE
+        self._version = None
+        self._failed_version = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reload_lock = threading.Lock()
+        self.current = self._build([], None)
+        self.reload()
+
+    def _use_file(self) -> bool:
+        return bool(self.config_file) and os.path.exists(self.config_file)
+
+    def _source_version(self):
+        """Cheap change marker of the dynamic source (file mtime / DB updated_at)"""
+        if self._use_file():
+            return os.path.getmtime(self.config_file)
+        db = get_db()
+        if db.enabled:
+            return db.get_content_config_version(self.account.name)
+        return None
+
+    def _read_documents(self) -> list:
+        if self._use_file():
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                doc = _validate_document(json.load(f))
+            docs = [doc]
+            override = (doc.get("accounts") or {}).get(self.account.name)
+            if override:
+                docs.append(_validate_document(override))
+            return docs
+        return [_validate_document(doc) for doc in get_db().get_content_config(self.account.name)]
+
+    def _build(self, documents: list, version) -> ContentSnapshot:
+        account = self.account
+        mappings = dict(account.static_content_mappings
+                        if account.static_content_mappings is not None
+                        else config.read_content_mappings())
+        templates = {
+            "keyword_reply": account.static_templates.get("keyword_reply") or config.KEYWORD_REPLY,
+            "dm_message": account.static_templates.get("dm_message") or config.DM_MESSAGE,
+            "follow_first_reply": account.static_templates.get("follow_first_reply") or config.FOLLOW_FIRST_REPLY,
+        }
+        symbols = dict(DEFAULT_SYMBOL_ALIASES)
+        telegram_content = {}
+
+        for doc in documents:
+            mappings.update({k.lower().strip(): v.strip() for k, v in (doc.get("content") or {}).items()})
+            telegram_content.update({k.lower().strip(): v.strip()
+                                     for k, v in (doc.get("telegram_content") or {}).items()})
+            symbols.update({s: k.lower().strip() for s, k in (doc.get("symbols") or {}).items()})
+            for key in TEMPLATE_KEYS:
+                if doc.get(key):
+                    templates[key] = doc[key]
+        return ContentSnapshot(mappings, templates, symbols, version, telegram_content)
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the snapshot if the source changed; returns True if swapped"""
+        with self._reload_lock:
+            try:
+                version = self._source_version()
+                if version in (self._version, self._failed_version) and not force:
+                    return False
+                snapshot = self._build(self._read_documents(), version)
+            except Exception as e:
+                # Keep serving the previous snapshot on a broken edit (warn once per version)
+                self._failed_version = version
+                log.warning("content_reload_failed", "⚠️ Kontent konfiguratsiyasi yuklanmadi (eskisi ishlatiladi): {error}",
+                            error=str(e), account=self.account.name)
+                return False
+
+            changed = self._version is not None or version is not None
+            self._version = version
+            self.current = snapshot  # Single reference swap: readers see old or new, never a mix
+            if changed:
+                log.info("content_reloaded", "🔄 [{account}] Kontent yangilandi: {keywords}",
+                         account=self.account.name, keywords=", ".join(snapshot.get_keywords()))
+            return True
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            self.reload()
+
+    def start_watcher(self, interval: float = None):
+        """Poll the source in a daemon thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch,
+            args=(interval or config.CONTENT_RELOAD_INTERVAL,),
+            daemon=True,
+            name=f"content-watcher-{self.account.name}",
+        )
+        self._thread.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+
+def push(path: str) -> bool:
+    """Upload a config file to the DB: top level to '*', `accounts` entries per account"""
+    with open(path, 'r', encoding='utf-8') as f:
+        doc = _validate_document(json.load(f))
+    accounts = doc.pop("accounts", None) or {}
+    for override in accounts.values():
+        _validate_document(override)
+
+    db = get_db()
+    if not db.enabled:
+        print("❌ DATABASE_URL kerak")
+        return False
+    ok = db.save_content_config(doc, "*")
+    for name, override in accounts.items():
+        ok = db.save_content_config(override, name) and ok
+    print("✅ Kontent konfiguratsiyasi saqlandi!" if ok else "❌ Saqlashda xatolik")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "push":
+        print("Foydalanish: python content_config.py push content.json")
+        sys.exit(2)
+    sys.exit(0 if push(sys.argv[2]) else 1)
@@ -0,0 +1,158 @@
+"""
+Bounded per-conversation memory for AI replies
+Each conversation (a commenter, a DM thread) keeps a ring buffer of its last
+AI_MEMORY_TURNS exchanges plus a rolling summary. When the turns exceed the
+AI_MEMORY_TOKEN_BUDGET the oldest ones are folded into the summary, which is
+itself capped at AI_MEMORY_SUMMARY_TOKENS, so the history added to a prompt
+never grows with the conversation. Conversations are kept in LRU order: idle
+ones (AI_MEMORY_IDLE_TTL) and the least recently used beyond
+AI_MEMORY_MAX_CONVERSATIONS are evicted.
+
+Summarization is extractive (first sentence of each folded message) instead
+of an extra Gemini call, which would halve the reply rate under the request
+pacing; pass `summarize` to plug in something smarter.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+from config import config
+
+MAX_MESSAGE_CHARS = 600  # One stored message (a long paste must not eat the budget)
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) - only used for budgeting"""
+    return len(text) // 4 + 1
+
+
+def first_sentence(text: str, limit: int = 120) -> str:
+    sentence = _SENTENCE.split(text.strip(), 1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1] + "…"
+
+
+def extractive_summary(summary: str, turns: list) -> str:
+    """Default summarizer: append the gist of each folded (user, reply) turn"""
+    parts = [summary] if summary else []
+    parts += [f"Foydalanuvchi: {first_sentence(user)} / Javob: {first_sentence(reply)}" for user, reply in turns]
+    return "\n".join(parts)
+
+
+class Conversation:
+    """Recent turns + rolling summary of one conversation"""
+
+    __slots__ = ("turns", "summary", "tokens", "last_used")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)  # (user text, reply text)
+        self.summary = ""
+        self.tokens = 0  # Estimated tokens of self.turns
+        self.last_used = time.time()
+
+
+class ConversationMemory:
+    """LRU of bounded conversations, keyed by conversation id (e.g. the user pk)"""
+
+    def __init__(self, max_turns: int = None, token_budget: int = None, summary_tokens: int = None,
+                 max_conversations: int = None, idle_ttl: float = None,
+                 summarize: Callable[[str, list], str] = None):
+        self.max_turns = max_turns or config.AI_MEMORY_TURNS
+        self.token_budget = token_budget or config.AI_MEMORY_TOKEN_BUDGET
+        self.summary_tokens = summary_tokens or config.AI_MEMORY_SUMMARY_TOKENS
+        self.max_conversations = max_conversations or config.AI_MEMORY_MAX_CONVERSATIONS
+        self.idle_ttl = idle_ttl or config.AI_MEMORY_IDLE_TTL
+        self.summarize = summarize or extractive_summary
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.summarized = 0
+
+    def _get(self, conversation_id: str, now: float) -> Optional[Conversation]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return None
+        if now - conversation.last_used > self.idle_ttl:
+            del self._conversations[conversation_id]
+            self.evicted += 1
+            return None
+        return conversation
+
+    def history(self, conversation_id: str) -> str:
+        """Summary and recent turns to put in the prompt ("" for a new conversation)"""
+        if not conversation_id:
+            return ""
+        with self._lock:
+            conversation = self._get(str(conversation_id), time.time())
+            if conversation is None:
+                return ""
+            summary, turns = conversation.summary, list(conversation.turns)
+        lines = [f"Avvalgi suhbat qisqacha:\n{summary}"] if summary else []
+        for user, reply in turns:
+            lines.append(f"Foydalanuvchi: {user}\nSiz: {reply}")
+        return "\n".join(lines)
+
+    def has_history(self, conversation_id: str) -> bool:
+        """True if history(conversation_id) would add anything to the prompt"""
+        if not conversation_id:
+            return False
+        with self._lock:
+            conversation = self._get(str(conversation_id), time.time())
+            return conversation is not None and bool(conversation.turns or conversation.summary)
+
+    def add_turn(self, conversation_id: str, user_text: str, reply_text: str):
+        """Remember one exchange; fold the oldest turns into the summary once over budget"""
+        if not conversation_id:
+            return
+        conversation_id = str(conversation_id)
+        user_text = user_text.strip()[:MAX_MESSAGE_CHARS]
+        reply_text = reply_text.strip()[:MAX_MESSAGE_CHARS]
+        now = time.time()
+        with self._lock:
+            conversation = self._get(conversation_id, now)
+            if conversation is None:
+                conversation = self._conversations[conversation_id] = Conversation(self.max_turns)
+            self._conversations.move_to_end(conversation_id)
+            conversation.last_used = now
+
+            folded = []
+            if len(conversation.turns) == conversation.turns.maxlen:
+                folded.append(conversation.turns.popleft())  # Ring buffer full: oldest turn leaves
+            conversation.turns.append((user_text, reply_text))
+            conversation.tokens = sum(estimate_tokens(u) + estimate_tokens(r) for u, r in conversation.turns)
+            while conversation.tokens > self.token_budget and len(conversation.turns) > 1:
+                user, reply = conversation.turns.popleft()
+                conversation.tokens -= estimate_tokens(user) + estimate_tokens(reply)
+                folded.append((user, reply))
+            if folded:
+                self._fold(conversation, folded)
+            self._evict(now)
+
+    def _fold(self, conversation: Conversation, turns: list):
+        summary = self.summarize(conversation.summary, turns)
+        # Rolling: keep the newest part when the summary itself is over its budget
+        max_chars = self.summary_tokens * 4
+        if len(summary) > max_chars:
+            summary = summary[-max_chars:].split("\n", 1)[-1]
+        conversation.summary = summary
+        self.summarized += len(turns)
+
+    def _evict(self, now: float):
+        """Drop idle conversations from the LRU end, then any beyond the size cap"""
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if now - conversation.last_used <= self.idle_ttl and len(self._conversations) <= self.max_conversations:
+                return
+            del self._conversations[conversation_id]
+            self.evicted += 1
+
+    def forget(self, conversation_id: str):
+        with self._lock:
+            self._conversations.pop(str(conversation_id), None)
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def status(self) -> dict:
+        return {"conversations": len(self._conversations), "evicted": self.evicted, "summarized_turns": self.summarized}
@@ -1,19 +1,22 @@
 """
 Database module for Neon PostgreSQL
-Stores: Instagram session, processed comments, statistics
+Stores: Instagram session, processed comments, comment job queue, content config,
+Telegram subscribers and broadcasts, statistics
 """
 import os
 import json
+import threading
 from datetime import datetime
 from typing import Optional
+from logger import log
 
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_values
     HAS_PSYCOPG2 = True
 except ImportError:
     HAS_PSYCOPG2 = False
-    print("⚠️ psycopg2 not installed - database features disabled")
+    log.warning("psycopg2_missing", "⚠️ psycopg2 not installed - database features disabled")
 
 
 class Database:
@@ -25,7 +28,7 @@ class Database:
         self.enabled = False
         
         if not self.database_url:
-            print("⚠️ DATABASE_URL kiritilmagan - lokal rejimda ishlaydi")
+            log.warning("db_disabled", "⚠️ DATABASE_URL kiritilmagan - lokal rejimda ishlaydi")
             return
         
         if not HAS_PSYCOPG2:
@@ -41,9 +44,9 @@ class Database:
         try:
             self.conn = psycopg2.connect(self.database_url)
             self.conn.autocommit = True
-            print("✅ Neon DB ga ulandi!")
+            log.info("db_connected", "✅ Neon DB ga ulandi!")
         except Exception as e:
-            print(f"❌ Database ulanish xatosi: {e}")
+            log.error("db_error", "❌ Database ulanish xatosi: {error}", op="_connect", error=str(e))
             self.conn = None
     
     def _create_tables(self):
@@ -59,6 +62,12 @@ class Database:
                     )
                 """)
                 
+                # Namespace per-account state (added for multi-account deployments)
+                cur.execute("""
+                    ALTER TABLE instagram_session
+                    ADD COLUMN IF NOT EXISTS account VARCHAR(64) NOT NULL DEFAULT 'default'
+                """)
+                
                 # Processed comments table
                 cur.execute("""
                     CREATE TABLE IF NOT EXISTS processed_comments (
@@ -68,6 +77,171 @@ class Database:
                     )
                 """)
                 
+                cur.execute("""
+                    ALTER TABLE processed_comments
+                    ADD COLUMN IF NOT EXISTS account VARCHAR(64) NOT NULL DEFAULT 'default'
+                """)
+                
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS processed_comments_account_idx
+                    ON processed_comments (account)
+                """)
+                
+                # Warm-window load per account and retention pruning by age
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS processed_comments_account_time_idx
+                    ON processed_comments (account, processed_at)
+                """)
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS processed_comments_time_idx
+                    ON processed_comments (processed_at)
+                """)
+                
+                # Comment job queue (claimed with FOR UPDATE SKIP LOCKED)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS comment_jobs (
+                        id BIGSERIAL PRIMARY KEY,
+                        comment_id VARCHAR(50) UNIQUE NOT NULL,
+                        media_id VARCHAR(100) NOT NULL,
+                        media_pk VARCHAR(50) NOT NULL,
+                        user_pk VARCHAR(50) NOT NULL,
+                        username VARCHAR(255) DEFAULT '',
+                        text TEXT DEFAULT '',
+                        status VARCHAR(16) NOT NULL DEFAULT 'pending',
+                        attempts INT NOT NULL DEFAULT 0,
+                        available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        locked_by VARCHAR(255),
+                        last_error TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                cur.execute("""
+                    ALTER TABLE comment_jobs
+                    ADD COLUMN IF NOT EXISTS account VARCHAR(64) NOT NULL DEFAULT 'default'
+                """)
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS comment_jobs_claim_idx
+                    ON comment_jobs (account, available_at, id)
+                    WHERE status IN ('pending', 'running')
+                """)
+                
+                # Keyword trigger cooldown index (per account, user and keyword)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS keyword_triggers (
+                        account VARCHAR(64) NOT NULL DEFAULT 'default',
+                        user_pk VARCHAR(50) NOT NULL,
+                        keyword VARCHAR(100) NOT NULL,
+                        outcome VARCHAR(20) NOT NULL,
+                        triggered_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (account, user_pk, keyword)
+                    )
+                """)
+                
+                # Delivery steps already done for a comment (a retry only redoes the rest)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS comment_steps (
+                        account VARCHAR(64) NOT NULL DEFAULT 'default',
+                        comment_id VARCHAR(50) NOT NULL,
+                        steps TEXT NOT NULL DEFAULT '',
+                        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (account, comment_id)
+                    )
+                """)
+                
+                # Backfill progress per media (resumable after a crash)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                        account VARCHAR(64) NOT NULL DEFAULT 'default',
+                        media_id VARCHAR(100) NOT NULL,
+                        min_id TEXT DEFAULT '',
+                        max_id TEXT DEFAULT '',
+                        comments_scanned INT NOT NULL DEFAULT 0,
+                        comments_handled INT NOT NULL DEFAULT 0,
+                        done BOOLEAN NOT NULL DEFAULT FALSE,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (account, media_id)
+                    )
+                """)
+                
+                # Hot-reloadable keyword/template config ('*' applies to all accounts)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS content_config (
+                        scope VARCHAR(64) PRIMARY KEY,
+                        data JSONB NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # Deep-link conversion funnel per keyword per day
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS keyword_conversions (
+                        stat_date DATE NOT NULL DEFAULT CURRENT_DATE,
+                        keyword VARCHAR(100) NOT NULL,
+                        event VARCHAR(20) NOT NULL,
+                        count INT NOT NULL DEFAULT 0,
+                        PRIMARY KEY (stat_date, keyword, event)
+                    )
+                """)
+                
+                # Telegram users who /start-ed the bot (broadcast audience)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS telegram_subscribers (
+                        user_id BIGINT PRIMARY KEY,
+                        keyword VARCHAR(100),
+                        first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        blocked_at TIMESTAMP
+                    )
+                """)
+                
+                # Broadcast runs with a resumable user_id cursor
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS broadcasts (
+                        id SERIAL PRIMARY KEY,
+                        text TEXT NOT NULL,
+                        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                        last_user_id BIGINT NOT NULL DEFAULT 0,
+                        sent INT NOT NULL DEFAULT 0,
+                        failed INT NOT NULL DEFAULT 0,
+                        blocked INT NOT NULL DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # Warm-restart snapshot per account (see warm_state.py)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS warm_state (
+                        account VARCHAR(64) PRIMARY KEY,
+                        data BYTEA NOT NULL,
+                        saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # Hourly rollups per account and dimension (total / keyword / post)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS stats_hourly (
+                        hour TIMESTAMP NOT NULL,
+                        account VARCHAR(64) NOT NULL DEFAULT 'default',
+                        dimension VARCHAR(10) NOT NULL,
+                        key VARCHAR(100) NOT NULL DEFAULT '',
+                        comments_seen INT NOT NULL DEFAULT 0,
+                        keyword_hits INT NOT NULL DEFAULT 0,
+                        follow_checks INT NOT NULL DEFAULT 0,
+                        follow_passed INT NOT NULL DEFAULT 0,
+                        dms_sent INT NOT NULL DEFAULT 0,
+                        ai_calls INT NOT NULL DEFAULT 0,
+                        errors INT NOT NULL DEFAULT 0,
+                        PRIMARY KEY (hour, account, dimension, key)
+                    )
+                """)
+                
+                # Range queries: one dimension over a time range
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS stats_hourly_dimension_idx
+                    ON stats_hourly (dimension, hour)
+                """)
+                
                 # Statistics table
                 cur.execute("""
                     CREATE TABLE IF NOT EXISTS statistics (
@@ -80,13 +254,13 @@ class Database:
                     )
                 """)
                 
-            print("✅ Database jadvallar tayyor!")
+            log.info("db_tables_ready", "✅ Database jadvallar tayyor!")
         except Exception as e:
-            print(f"❌ Jadval yaratishda xatolik: {e}")
+            log.error("db_error", "❌ Jadval yaratishda xatolik: {error}", op="_create_tables", error=str(e))
     
     # ==================== Session Methods ====================
     
-    def save_session(self, session_data: dict) -> bool:
+    def save_session(self, session_data: dict, account: str = "default") -> bool:
         """Save Instagram session to database"""
         if not self.enabled:
             return False
@@ -95,31 +269,34 @@ class Database:
             session_json = json.dumps(session_data)
             with self.conn.cursor() as cur:
                 # Delete old sessions and insert new one
-                cur.execute("DELETE FROM instagram_session")
+                cur.execute("DELETE FROM instagram_session WHERE account = %s", (account,))
                 cur.execute(
-                    "INSERT INTO instagram_session (session_data) VALUES (%s)",
-                    (session_json,)
+                    "INSERT INTO instagram_session (session_data, account) VALUES (%s, %s)",
+                    (session_json, account)
                 )
-            print("💾 Session databazaga saqlandi")
+            log.info("db_session_saved", "💾 Session databazaga saqlandi", account=account)
             return True
         except Exception as e:
-            print(f"❌ Session saqlashda xatolik: {e}")
+            log.error("db_error", "❌ Session saqlashda xatolik: {error}", op="save_session", error=str(e))
             return False
     
-    def load_session(self) -> Optional[dict]:
+    def load_session(self, account: str = "default") -> Optional[dict]:
         """Load Instagram session from database"""
         if not self.enabled:
             return None
         
         try:
             with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("SELECT session_data FROM instagram_session ORDER BY updated_at DESC LIMIT 1")
+                cur.execute(
+                    "SELECT session_data FROM instagram_session WHERE account = %s ORDER BY updated_at DESC LIMIT 1",
+                    (account,)
+                )
                 row = cur.fetchone()
                 if row:
-                    print("📥 Session databazadan yuklandi")
+                    log.info("db_session_loaded", "📥 Session databazadan yuklandi", account=account)
                     return json.loads(row['session_data'])
         except Exception as e:
-            print(f"❌ Session yuklashda xatolik: {e}")
+            log.error("db_error", "❌ Session yuklashda xatolik: {error}", op="load_session", error=str(e))
         return None
     
     # ==================== Processed Comments Methods ====================
@@ -137,10 +314,10 @@ class Database:
                 )
                 return cur.fetchone() is not None
         except Exception as e:
-            print(f"❌ Comment tekshirishda xatolik: {e}")
+            log.error("db_error", "❌ Comment tekshirishda xatolik: {error}", op="is_comment_processed", error=str(e))
             return False
     
-    def mark_comment_processed(self, comment_id: str) -> bool:
+    def mark_comment_processed(self, comment_id: str, account: str = "default") -> bool:
         """Mark a comment as processed"""
         if not self.enabled:
             return False
@@ -148,27 +325,635 @@ class Database:
         try:
             with self.conn.cursor() as cur:
                 cur.execute(
-                    "INSERT INTO processed_comments (comment_id) VALUES (%s) ON CONFLICT DO NOTHING",
-                    (str(comment_id),)
+                    "INSERT INTO processed_comments (comment_id, account) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                    (str(comment_id), account)
+                )
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Comment saqlashda xatolik: {error}", op="mark_comment_processed", error=str(e))
+            return False
+    
+    def mark_comments_processed(self, comment_ids: list, account: str = "default") -> bool:
+        """Mark many comments as processed in one statement"""
+        if not self.enabled or not comment_ids:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    "INSERT INTO processed_comments (comment_id, account) VALUES %s ON CONFLICT DO NOTHING",
+                    [(str(comment_id), account) for comment_id in comment_ids],
+                    page_size=1000
                 )
             return True
         except Exception as e:
-            print(f"❌ Comment saqlashda xatolik: {e}")
+            log.error("db_error", "❌ Commentlarni saqlashda xatolik: {error}",
+                      op="mark_comments_processed", error=str(e))
             return False
     
-    def get_processed_comments(self) -> set:
-        """Get all processed comment IDs"""
+    def get_processed_comments(self, account: str = "default", since_days: int = None) -> set:
+        """Get processed comment IDs of an account (only the last `since_days` days if given)"""
         if not self.enabled:
             return set()
         
         try:
             with self.conn.cursor() as cur:
-                cur.execute("SELECT comment_id FROM processed_comments")
+                if since_days is None:
+                    cur.execute("SELECT comment_id FROM processed_comments WHERE account = %s", (account,))
+                else:
+                    cur.execute(
+                        """
+                        SELECT comment_id FROM processed_comments
+                        WHERE account = %s AND processed_at > NOW() - make_interval(days => %s)
+                        """,
+                        (account, since_days)
+                    )
                 return {row[0] for row in cur.fetchall()}
         except Exception as e:
-            print(f"❌ Commentlarni olishda xatolik: {e}")
+            log.error("db_error", "❌ Commentlarni olishda xatolik: {error}", op="get_processed_comments", error=str(e))
             return set()
     
+    def find_processed_comments(self, comment_ids: list) -> set:
+        """Which of `comment_ids` were processed (on-demand lookup outside the warm window)"""
+        if not self.enabled or not comment_ids:
+            return set()
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    "SELECT comment_id FROM processed_comments WHERE comment_id = ANY(%s)",
+                    ([str(comment_id) for comment_id in comment_ids],)
+                )
+                return {row[0] for row in cur.fetchall()}
+        except Exception as e:
+            log.error("db_error", "❌ Commentlarni tekshirishda xatolik: {error}", op="find_processed_comments",
+                      error=str(e))
+            # Unknown: treat as processed rather than risk a duplicate reply
+            return {str(comment_id) for comment_id in comment_ids}
+    
+    def prune_processed_comments(self, retention_days: int, batch_size: int = 5000) -> int:
+        """
+        Delete processed ids older than `retention_days` in small batches
+        (short transactions, index range scans); returns the number deleted
+        """
+        if not self.enabled:
+            return 0
+        
+        deleted = 0
+        try:
+            with self.conn.cursor() as cur:
+                while True:
+                    cur.execute(
+                        """
+                        DELETE FROM processed_comments WHERE id IN (
+                            SELECT id FROM processed_comments
+                            WHERE processed_at < NOW() - make_interval(days => %s)
+                            LIMIT %s
+                        )
+                        """,
+                        (retention_days, batch_size)
+                    )
+                    deleted += cur.rowcount
+                    if cur.rowcount < batch_size:
+                        break
+                cur.execute(
+                    "DELETE FROM comment_steps WHERE updated_at < NOW() - make_interval(days => %s)",
+                    (retention_days,)
+                )
+            return deleted
+        except Exception as e:
+            log.error("db_error", "❌ Eski commentlarni o'chirishda xatolik: {error}", op="prune_processed_comments",
+                      error=str(e))
+            return deleted
+    
+    def get_comment_steps(self, comment_id: str, account: str = "default") -> set:
+        """Delivery steps already done for a comment (e.g. {"reply"})"""
+        if not self.enabled:
+            return set()
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    "SELECT steps FROM comment_steps WHERE account = %s AND comment_id = %s",
+                    (account, str(comment_id))
+                )
+                row = cur.fetchone()
+                return set(filter(None, row[0].split(","))) if row else set()
+        except Exception as e:
+            log.error("db_error", "❌ Comment bosqichlarini olishda xatolik: {error}", op="get_comment_steps",
+                      error=str(e))
+            return set()
+    
+    def add_comment_step(self, comment_id: str, step: str, account: str = "default") -> bool:
+        """Record one finished delivery step of a comment"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO comment_steps (account, comment_id, steps) VALUES (%s, %s, %s)
+                    ON CONFLICT (account, comment_id) DO UPDATE
+                    SET steps = comment_steps.steps || ',' || EXCLUDED.steps, updated_at = CURRENT_TIMESTAMP
+                """, (account, str(comment_id), step))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Comment bosqichini saqlashda xatolik: {error}", op="add_comment_step",
+                      error=str(e))
+            return False
+    
+    # ==================== Comment Job Queue Methods ====================
+    
+    def enqueue_comment_jobs(self, media, comments: list, account: str = "default") -> int:
+        """
+        Insert discovered comments as pending jobs (duplicates are ignored)
+        
+        Args:
+            media: MediaRecord the comments belong to
+            comments: List of CommentRecord objects
+            
+        Returns:
+            Number of newly queued jobs
+        """
+        if not self.enabled or not comments:
+            return 0
+        
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO comment_jobs (comment_id, media_id, media_pk, user_pk, username, text, account)
+                    VALUES %s
+                    ON CONFLICT (comment_id) DO NOTHING
+                """, [
+                    (c.pk, media.id, media.pk, c.user_pk, c.username, c.text, account)
+                    for c in comments
+                ], page_size=len(comments))
+                return cur.rowcount
+        except Exception as e:
+            log.error("db_error", "❌ Joblarni navbatga qo'shishda xatolik: {error}",
+                      op="enqueue_comment_jobs", error=str(e))
+            return 0
+    
+    def claim_comment_jobs(self, worker_id: str, limit: int, visibility_timeout: int, max_attempts: int,
+                           account: str = "default") -> list:
+        """
+        Claim up to `limit` due jobs for this worker
+        
+        Claimed jobs stay invisible for `visibility_timeout` seconds; if the
+        worker dies before completing them they become claimable again.
+        """
+        if not self.enabled:
+            return []
+        
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                # Give up on jobs whose last attempt timed out
+                cur.execute("""
+                    UPDATE comment_jobs SET status = 'failed', locked_by = NULL
+                    WHERE status = 'running' AND available_at <= NOW() AND attempts >= %s
+                """, (max_attempts,))
+                cur.execute("""
+                    UPDATE comment_jobs SET
+                        status = 'running',
+                        locked_by = %s,
+                        attempts = attempts + 1,
+                        available_at = NOW() + make_interval(secs => %s)
+                    WHERE id IN (
+                        SELECT id FROM comment_jobs
+                        WHERE status IN ('pending', 'running') AND available_at <= NOW()
+                            AND account = %s
+                        ORDER BY available_at, id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING id, comment_id, media_id, media_pk, user_pk, username, text, attempts
+                """, (worker_id, visibility_timeout, account, limit))
+                return [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            log.error("db_error", "❌ Joblarni olishda xatolik: {error}", op="claim_comment_jobs", error=str(e))
+            return []
+    
+    def complete_comment_job(self, job_id: int) -> bool:
+        """Mark a job done and its comment processed (atomically)"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    WITH done AS (
+                        UPDATE comment_jobs SET status = 'done', locked_by = NULL, last_error = NULL
+                        WHERE id = %s
+                        RETURNING comment_id, account
+                    )
+                    INSERT INTO processed_comments (comment_id, account)
+                    SELECT comment_id, account FROM done
+                    ON CONFLICT DO NOTHING
+                """, (job_id,))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Jobni yakunlashda xatolik: {error}", op="complete_comment_job", error=str(e))
+            return False
+    
+    def fail_comment_job(self, job_id: int, error: str, max_attempts: int, retry_delay: int) -> bool:
+        """Schedule a retry after `retry_delay` seconds, or fail after `max_attempts`"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE comment_jobs SET
+                        status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                        available_at = NOW() + make_interval(secs => %s * attempts),
+                        locked_by = NULL,
+                        last_error = %s
+                    WHERE id = %s
+                """, (max_attempts, retry_delay, error[:1000], job_id))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Job xatosini saqlashda xatolik: {error}", op="fail_comment_job", error=str(e))
+            return False
+    
+    def get_comment_job_stats(self, account: str = "default") -> dict:
+        """Job counts per status and age of the oldest due job (seconds) of one account"""
+        if not self.enabled:
+            return {}
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT status, COUNT(*) FROM comment_jobs WHERE account = %s GROUP BY status",
+                            (account,))
+                stats = {status: count for status, count in cur.fetchall()}
+                cur.execute("""
+                    SELECT COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(created_at)), 0)
+                    FROM comment_jobs WHERE account = %s AND status IN ('pending', 'running')
+                """, (account,))
+                stats['oldest_age'] = float(cur.fetchone()[0])
+                return stats
+        except Exception as e:
+            log.error("db_error", "❌ Job statistikasini olishda xatolik: {error}",
+                      op="get_comment_job_stats", error=str(e))
+            return {}
+    
+    # ==================== Keyword Trigger Methods ====================
+    
+    def get_keyword_trigger(self, user_pk: str, keyword: str, account: str = "default") -> Optional[tuple]:
+        """Get (outcome, age in seconds) of the last trigger, or None"""
+        if not self.enabled:
+            return None
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT outcome, EXTRACT(EPOCH FROM NOW() - triggered_at)
+                    FROM keyword_triggers
+                    WHERE account = %s AND user_pk = %s AND keyword = %s
+                """, (account, str(user_pk), keyword))
+                row = cur.fetchone()
+                if row:
+                    return row[0], float(row[1])
+        except Exception as e:
+            log.error("db_error", "❌ Trigger tekshirishda xatolik: {error}", op="get_keyword_trigger", error=str(e))
+        return None
+    
+    def save_keyword_trigger(self, user_pk: str, keyword: str, outcome: str, account: str = "default") -> bool:
+        """Record the latest trigger of a keyword by a user"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO keyword_triggers (account, user_pk, keyword, outcome, triggered_at)
+                    VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (account, user_pk, keyword)
+                    DO UPDATE SET outcome = EXCLUDED.outcome, triggered_at = EXCLUDED.triggered_at
+                """, (account, str(user_pk), keyword, outcome))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Trigger saqlashda xatolik: {error}", op="save_keyword_trigger", error=str(e))
+            return False
+    
+    # ==================== Backfill Checkpoint Methods ====================
+    
+    def get_backfill_checkpoints(self, account: str = "default") -> dict:
+        """Get backfill checkpoints of an account: media_id -> checkpoint dict"""
+        if not self.enabled:
+            return {}
+        
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT media_id, min_id, max_id, comments_scanned, comments_handled, done
+                    FROM backfill_checkpoints WHERE account = %s
+                """, (account,))
+                return {row['media_id']: dict(row) for row in cur.fetchall()}
+        except Exception as e:
+            log.error("db_error", "❌ Backfill checkpointlarini olishda xatolik: {error}",
+                      op="get_backfill_checkpoints", error=str(e))
+            return {}
+    
+    def save_backfill_checkpoint(self, checkpoint: dict, account: str = "default") -> bool:
+        """Upsert the backfill checkpoint of one media"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO backfill_checkpoints
+                        (account, media_id, min_id, max_id, comments_scanned, comments_handled, done, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (account, media_id) DO UPDATE SET
+                        min_id = EXCLUDED.min_id,
+                        max_id = EXCLUDED.max_id,
+                        comments_scanned = EXCLUDED.comments_scanned,
+                        comments_handled = EXCLUDED.comments_handled,
+                        done = EXCLUDED.done,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (
+                    account, checkpoint['media_id'], checkpoint['min_id'], checkpoint['max_id'],
+                    checkpoint['comments_scanned'], checkpoint['comments_handled'], checkpoint['done']
+                ))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Backfill checkpointini saqlashda xatolik: {error}",
+                      op="save_backfill_checkpoint", error=str(e))
+            return False
+    
+    def reset_backfill_checkpoints(self, account: str = "default") -> bool:
+        """Forget backfill progress so the next run starts over"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM backfill_checkpoints WHERE account = %s", (account,))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Backfill checkpointlarini o'chirishda xatolik: {error}",
+                      op="reset_backfill_checkpoints", error=str(e))
+            return False
+    
+    # ==================== Content Config Methods ====================
+    
+    def get_content_config_version(self, account: str = "default") -> Optional[float]:
+        """Latest update time of the config rows that apply to an account (cheap poll)"""
+        if not self.enabled:
+            return None
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT EXTRACT(EPOCH FROM MAX(updated_at)) FROM content_config
+                    WHERE scope IN ('*', %s)
+                """, (account,))
+                row = cur.fetchone()
+                return float(row[0]) if row and row[0] is not None else None
+        except Exception as e:
+            log.error("db_error", "❌ Kontent konfiguratsiyasini tekshirishda xatolik: {error}",
+                      op="get_content_config_version", error=str(e))
+            return None
+    
+    def get_content_config(self, account: str = "default") -> list:
+        """Config documents for an account: the '*' row first, then the account row"""
+        if not self.enabled:
+            return []
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT data FROM content_config
+                    WHERE scope IN ('*', %s)
+                    ORDER BY scope = '*' DESC
+                """, (account,))
+                return [row[0] for row in cur.fetchall()]
+        except Exception as e:
+            log.error("db_error", "❌ Kontent konfiguratsiyasini olishda xatolik: {error}",
+                      op="get_content_config", error=str(e))
+            return []
+    
+    def save_content_config(self, data: dict, scope: str = "*") -> bool:
+        """Replace the config document of a scope ('*' or an account name)"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO content_config (scope, data, updated_at)
+                    VALUES (%s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (scope) DO UPDATE SET data = EXCLUDED.data, updated_at = CURRENT_TIMESTAMP
+                """, (scope, json.dumps(data)))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Kontent konfiguratsiyasini saqlashda xatolik: {error}",
+                      op="save_content_config", error=str(e))
+            return False
+    
+    # ==================== Keyword Conversion Methods ====================
+    
+    def add_keyword_conversions(self, counts: dict) -> bool:
+        """Add {(keyword, event): count} to today's conversion counters"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO keyword_conversions (keyword, event, count) VALUES %s
+                    ON CONFLICT (stat_date, keyword, event)
+                    DO UPDATE SET count = keyword_conversions.count + EXCLUDED.count
+                """, [(keyword, event, count) for (keyword, event), count in counts.items()])
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Konversiya statistikasini saqlashda xatolik: {error}",
+                      op="add_keyword_conversions", error=str(e))
+            return False
+    
+    def get_keyword_conversions(self, days: int = 7) -> dict:
+        """{keyword: {event: count}} summed over the last `days` days"""
+        if not self.enabled:
+            return {}
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT keyword, event, SUM(count) FROM keyword_conversions
+                    WHERE stat_date > CURRENT_DATE - %s
+                    GROUP BY keyword, event
+                """, (days,))
+                result = {}
+                for keyword, event, count in cur.fetchall():
+                    result.setdefault(keyword, {})[event] = int(count)
+                return result
+        except Exception as e:
+            log.error("db_error", "❌ Konversiya statistikasini olishda xatolik: {error}",
+                      op="get_keyword_conversions", error=str(e))
+            return {}
+    
+    # ==================== Telegram Subscriber Methods ====================
+    
+    def save_telegram_subscribers(self, subscribers: list) -> bool:
+        """Upsert [(user_id, keyword)]; a returning user is no longer blocked"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO telegram_subscribers (user_id, keyword) VALUES %s
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        keyword = COALESCE(EXCLUDED.keyword, telegram_subscribers.keyword),
+                        last_seen = CURRENT_TIMESTAMP,
+                        blocked_at = NULL
+                """, subscribers)
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Obunachilarni saqlashda xatolik: {error}",
+                      op="save_telegram_subscribers", error=str(e))
+            return False
+    
+    def get_telegram_subscribers(self, after_user_id: int, limit: int) -> list:
+        """Next page of reachable subscriber ids (keyset pagination by user_id)"""
+        if not self.enabled:
+            return []
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT user_id FROM telegram_subscribers
+                    WHERE user_id > %s AND blocked_at IS NULL
+                    ORDER BY user_id
+                    LIMIT %s
+                """, (after_user_id, limit))
+                return [row[0] for row in cur.fetchall()]
+        except Exception as e:
+            log.error("db_error", "❌ Obunachilarni olishda xatolik: {error}",
+                      op="get_telegram_subscribers", error=str(e))
+            return []
+    
+    def mark_telegram_subscribers_blocked(self, user_ids: list) -> bool:
+        """Prune users who blocked the bot or deleted their account"""
+        if not self.enabled or not user_ids:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE telegram_subscribers SET blocked_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ANY(%s)
+                """, (list(user_ids),))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Bloklangan obunachilarni belgilashda xatolik: {error}",
+                      op="mark_telegram_subscribers_blocked", error=str(e))
+            return False
+    
+    def count_telegram_subscribers(self) -> dict:
+        """Reachable and blocked subscriber counts"""
+        if not self.enabled:
+            return {}
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT COUNT(*) FILTER (WHERE blocked_at IS NULL), COUNT(*) FILTER (WHERE blocked_at IS NOT NULL)
+                    FROM telegram_subscribers
+                """)
+                active, blocked = cur.fetchone()
+                return {"active": active, "blocked": blocked}
+        except Exception as e:
+            log.error("db_error", "❌ Obunachilar sonini olishda xatolik: {error}",
+                      op="count_telegram_subscribers", error=str(e))
+            return {}
+    
+    # ==================== Broadcast Methods ====================
+    
+    def create_broadcast(self, text: str) -> Optional[int]:
+        """Create a broadcast run; returns its id"""
+        if not self.enabled:
+            return None
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("INSERT INTO broadcasts (text) VALUES (%s) RETURNING id", (text,))
+                return cur.fetchone()[0]
+        except Exception as e:
+            log.error("db_error", "❌ Broadcast yaratishda xatolik: {error}", op="create_broadcast", error=str(e))
+            return None
+    
+    def get_broadcast(self, broadcast_id: int) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT id, text, status, last_user_id, sent, failed, blocked, created_at, updated_at
+                    FROM broadcasts WHERE id = %s
+                """, (broadcast_id,))
+                row = cur.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            log.error("db_error", "❌ Broadcastni olishda xatolik: {error}", op="get_broadcast", error=str(e))
+            return None
+    
+    def save_broadcast_progress(self, broadcast_id: int, last_user_id: int, sent: int, failed: int,
+                                blocked: int, status: str) -> bool:
+        """Checkpoint a broadcast after a fully processed page"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE broadcasts SET last_user_id = %s, sent = %s, failed = %s, blocked = %s,
+                        status = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, (last_user_id, sent, failed, blocked, status, broadcast_id))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Broadcast holatini saqlashda xatolik: {error}",
+                      op="save_broadcast_progress", error=str(e))
+            return False
+    
+    # ==================== Warm State Methods ====================
+    
+    def save_warm_state(self, data: bytes, account: str = "default") -> bool:
+        """Store the warm-restart snapshot of an account (replaces the previous one)"""
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO warm_state (account, data, saved_at)
+                    VALUES (%s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (account)
+                    DO UPDATE SET data = EXCLUDED.data, saved_at = CURRENT_TIMESTAMP
+                """, (account, psycopg2.Binary(data)))
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Warm state saqlashda xatolik: {error}", op="save_warm_state", error=str(e))
+            return False
+    
+    def take_warm_state(self, account: str = "default") -> Optional[bytes]:
+        """Fetch and delete the warm-restart snapshot (it is only valid once)"""
+        if not self.enabled:
+            return None
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM warm_state WHERE account = %s RETURNING data", (account,))
+                row = cur.fetchone()
+                return bytes(row[0]) if row else None
+        except Exception as e:
+            log.error("db_error", "❌ Warm state olishda xatolik: {error}", op="take_warm_state", error=str(e))
+            return None
+    
     # ==================== Statistics Methods ====================
     
     def increment_stat(self, stat_name: str, amount: int = 1) -> bool:
@@ -189,7 +974,7 @@ class Database:
                 """, (amount, amount))
             return True
         except Exception as e:
-            print(f"❌ Statistika saqlashda xatolik: {e}")
+            log.error("db_error", "❌ Statistika saqlashda xatolik: {error}", op="increment_stat", error=str(e))
             return False
     
     def get_today_stats(self) -> dict:
@@ -207,14 +992,76 @@ class Database:
                 if row:
                     return dict(row)
         except Exception as e:
-            print(f"❌ Statistika olishda xatolik: {e}")
+            log.error("db_error", "❌ Statistika olishda xatolik: {error}", op="get_today_stats", error=str(e))
         return {'comments_processed': 0, 'dms_sent': 0, 'keywords_triggered': 0}
     
+    # Same column order as stats_rollup.METRICS
+    HOURLY_METRICS = ("comments_seen", "keyword_hits", "follow_checks", "follow_passed", "dms_sent", "ai_calls",
+                      "errors")
+    
+    def add_hourly_stats(self, counts: dict) -> bool:
+        """Add {(hour epoch, account, dimension, key): [count per metric]} to the hourly rollups"""
+        if not self.enabled:
+            return False
+        
+        columns = ", ".join(self.HOURLY_METRICS)
+        updates = ", ".join(f"{m} = stats_hourly.{m} + EXCLUDED.{m}" for m in self.HOURLY_METRICS)
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, f"""
+                    INSERT INTO stats_hourly (hour, account, dimension, key, {columns}) VALUES %s
+                    ON CONFLICT (hour, account, dimension, key) DO UPDATE SET {updates}
+                """, [(datetime.utcfromtimestamp(hour), account, dimension, key, *row)
+                      for (hour, account, dimension, key), row in counts.items()])
+            return True
+        except Exception as e:
+            log.error("db_error", "❌ Soatlik statistikani saqlashda xatolik: {error}", op="add_hourly_stats",
+                      error=str(e))
+            return False
+    
+    def get_hourly_stats(self, start: float, end: float, dimension: str, key: str = None,
+                         account: str = None) -> list:
+        """[(hour epoch, account, key, [count per metric])] of the hours overlapping [start, end)"""
+        if not self.enabled:
+            return []
+        
+        query = f"""
+            SELECT EXTRACT(EPOCH FROM hour)::BIGINT, account, key, {", ".join(self.HOURLY_METRICS)}
+            FROM stats_hourly
+            WHERE dimension = %s AND hour > %s - INTERVAL '1 hour' AND hour < %s
+        """
+        params = [dimension, datetime.utcfromtimestamp(start), datetime.utcfromtimestamp(end)]
+        if key is not None:
+            query += " AND key = %s"
+            params.append(key)
+        if account:
+            query += " AND account = %s"
+            params.append(account)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(query, params)
+                return [(row[0], row[1], row[2], list(row[3:])) for row in cur.fetchall()]
+        except Exception as e:
+            log.error("db_error", "❌ Soatlik statistikani olishda xatolik: {error}", op="get_hourly_stats",
+                      error=str(e))
+            return []
+    
     def close(self):
         """Close database connection"""
         if self.conn:
             self.conn.close()
 
 
-# Singleton instance
-db = Database()
+# Lazy singleton instance (connects on first use, not at import time)
+_db: Optional[Database] = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> Database:
+    """Get the shared Database, connecting on first use"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = Database()
+    return _db
@@ -0,0 +1,125 @@
+"""
+Signed Telegram deep links per keyword
+The Instagram DM carries https://t.me/<bot>?start=<payload>, where payload is
+the base64url keyword plus a truncated HMAC, so /start resolves straight to the
+keyword's asset (telegram_content in the content config) and can't be forged.
+Per-keyword conversion counters are kept in memory and flushed to the DB
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from config import config
+from database import get_db
+
+SIGNATURE_CHARS = 10
+MAX_PAYLOAD = 64  # Telegram limit for the start parameter
+
+# Conversion funnel events
+OPENED = "opened"        # /start with a valid keyword payload
+DELIVERED = "delivered"  # Asset sent right away (already subscribed)
+ASKED = "asked"          # Asked to subscribe first
+CONVERTED = "converted"  # Asset sent after subscribing from the prompt
+EVENTS = (OPENED, DELIVERED, ASKED, CONVERTED)
+
+
+def _secret() -> bytes:
+    if config.TELEGRAM_LINK_SECRET:
+        return config.TELEGRAM_LINK_SECRET.encode()
+    return hmac.new(config.TELEGRAM_BOT_TOKEN.encode(), b"deep-link", hashlib.sha256).digest()
+
+
+def _sign(data: bytes) -> str:
+    digest = hmac.new(_secret(), data, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode()[:SIGNATURE_CHARS]
+
+
+def encode_payload(keyword: str) -> Optional[str]:
+    """Compact signed start payload for a keyword (None if it doesn't fit)"""
+    data = keyword.lower().strip().encode()
+    encoded = base64.urlsafe_b64encode(data).decode().rstrip("=")
+    payload = encoded + _sign(data)
+    return payload if len(payload) <= MAX_PAYLOAD else None
+
+
+def decode_payload(payload: str) -> Optional[str]:
+    """Keyword of a start payload, or None if it is malformed or not ours"""
+    if not payload or len(payload) <= SIGNATURE_CHARS or len(payload) > MAX_PAYLOAD:
+        return None
+    encoded, signature = payload[:-SIGNATURE_CHARS], payload[-SIGNATURE_CHARS:]
+    try:
+        data = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if not hmac.compare_digest(signature, _sign(data)):
+        return None
+    return data.decode("utf-8", errors="ignore") or None
+
+
+def deep_links_enabled() -> bool:
+    return bool(config.TELEGRAM_DEEP_LINKS and config.TELEGRAM_BOT_USERNAME and
+                (config.TELEGRAM_LINK_SECRET or config.TELEGRAM_BOT_TOKEN))
+
+
+def deep_link(keyword: str) -> str:
+    """t.me deep link for a keyword, or empty string when deep links are off"""
+    if not deep_links_enabled():
+        return ""
+    payload = encode_payload(keyword)
+    if not payload:
+        return ""
+    return f"https://t.me/{config.TELEGRAM_BOT_USERNAME.lstrip('@')}?start={payload}"
+
+
+class ConversionCounters:
+    """(keyword, event) counters; deltas are flushed to the DB in the background"""
+
+    def __init__(self, flush_interval: float = 60):
+        self.totals = Counter()
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flush_interval = flush_interval
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, keyword: str, event: str):
+        with self._lock:
+            self.totals[(keyword, event)] += 1
+            self._pending[(keyword, event)] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="conversion-flush")
+                self._thread.start()
+
+    def flush(self):
+        """Write pending deltas; they are kept for the next try if the DB fails"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+        db = get_db()
+        if db.enabled and not db.add_keyword_conversions(pending):
+            with self._lock:
+                self._pending.update(pending)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self._flush_interval)
+            self.flush()
+
+    def status(self) -> dict:
+        """{keyword: {event: count, ..., conversion_rate}} since process start"""
+        with self._lock:
+            totals = dict(self.totals)
+        result = {}
+        for (keyword, event), count in totals.items():
+            result.setdefault(keyword, {e: 0 for e in EVENTS})[event] = count
+        for stats in result.values():
+            opened = stats[OPENED]
+            stats["conversion_rate"] = round((stats[DELIVERED] + stats[CONVERTED]) / opened, 3) if opened else 0.0
+        return result
+
+
+conversion_counters = ConversionCounters()
@@ -1,19 +1,67 @@
 import time
-import google.generativeai as genai
+import threading
+from typing import Optional
 from config import config
+from tracing import tracer, traced
+from traffic_recorder import recorded
+from conversation_memory import ConversationMemory
+from logger import log
 
 
 class GeminiAI:
     """Gemini AI integration for generating responses with retry logic"""
     
+    # Cross-process pacing shared by all account workers (see supervisor.py)
+    _shared_lock = None
+    _shared_last_request = None
+    _shared_min_interval = 0.0
+    
+    @classmethod
+    def set_shared_rate_limit(cls, lock, last_request, min_interval: float):
+        """
+        Pace requests across processes
+        
+        Args:
+            lock: multiprocessing.Lock shared by all workers
+            last_request: multiprocessing.Value('d') holding the last request time
+            min_interval: Minimum seconds between any two requests
+        """
+        cls._shared_lock = lock
+        cls._shared_last_request = last_request
+        cls._shared_min_interval = min_interval
+    
+    def _wait_shared_rate_limit(self):
+        if self._shared_lock is None:
+            return
+        with self._shared_lock:
+            wait_time = self._shared_last_request.value + self._shared_min_interval - time.time()
+            if wait_time > 0:
+                time.sleep(wait_time)
+            self._shared_last_request.value = time.time()
+    
     def __init__(self):
+        # Deferred: google.generativeai is slow to import
+        import google.generativeai as genai
+        
         genai.configure(api_key=config.GEMINI_API_KEY)
         self.model = genai.GenerativeModel("gemini-2.5-flash")
         self.system_prompt = config.SYSTEM_PROMPT
         self.last_request_time = 0
         self.min_request_interval = 60  # Minimum 60 seconds between requests
+        self.memory = ConversationMemory() if config.AI_MEMORY else None
+    
+    def seconds_until_ready(self) -> float:
+        """Seconds until generate_response can run without a rate-limit wait"""
+        return max(0.0, self.min_request_interval - (time.time() - self.last_request_time))
+    
+    def has_history(self, conversation_id: str) -> bool:
+        """True if a reply for this conversation would be built on its earlier turns"""
+        return bool(self.memory and self.memory.has_history(conversation_id))
     
-    def generate_response(self, user_message: str, context: str = "", max_retries: int = 5) -> str:
+    @traced()
+    @recorded("ai")
+    def generate_response(self, user_message: str, context: str = "", max_retries: int = 5,
+                          conversation_id: str = "") -> str:
         """
         Generate a response for the user's message with retry logic
         
@@ -21,22 +69,31 @@ class GeminiAI:
             user_message: The message from the user
             context: Optional conversation context
             max_retries: Maximum number of retry attempts
+            conversation_id: Remember the exchange under this id (user pk, thread id)
+                and include the bounded history of earlier ones in the prompt
             
         Returns:
             AI-generated response in Uzbek
         """
         # Rate limiting - wait if needed
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_request_interval:
-            wait_time = self.min_request_interval - elapsed
-            print(f"   ⏳ Rate limit uchun {wait_time:.0f}s kutilmoqda...")
-            time.sleep(wait_time)
+        with tracer.span("gemini.rate_limit_wait"):
+            elapsed = time.time() - self.last_request_time
+            if elapsed < self.min_request_interval:
+                wait_time = self.min_request_interval - elapsed
+                log.info("gemini_wait", "⏳ Rate limit uchun {seconds}s kutilmoqda...", seconds=round(wait_time))
+                time.sleep(wait_time)
+            self._wait_shared_rate_limit()
         
+        # Bounded: recent turns within the token budget plus a capped summary
+        history = self.memory.history(conversation_id) if self.memory else ""
+        history_block = f"Suhbat tarixi:\n{history}" if history else ""
         prompt = f"""
 {self.system_prompt}
 
 {f"Kontekst: {context}" if context else ""}
 
+{history_block}
+
 Foydalanuvchi: {user_message}
 
 Javob (qisqa va do'stona):"""
@@ -44,10 +101,14 @@ Javob (qisqa va do'stona):"""
         for attempt in range(max_retries):
             try:
                 self.last_request_time = time.time()
-                response = self.model.generate_content(prompt)
+                with tracer.span("gemini.generate_content", attempt=attempt + 1):
+                    response = self.model.generate_content(prompt)
                 
                 if response and response.text:
-                    return response.text.strip()
+                    text = response.text.strip()
+                    if self.memory:
+                        self.memory.add_turn(conversation_id, user_message, text)
+                    return text
                 
                 return "Rahmat! Savolingizga tez orada javob beramiz."
             
@@ -57,16 +118,28 @@ Javob (qisqa va do'stona):"""
                 # Check if it's a rate limit error
                 if "quota" in error_msg or "rate" in error_msg or "429" in error_msg:
                     retry_delay = (attempt + 1) * 30  # 30, 60, 90, 120, 150 seconds
-                    print(f"   ⚠️ Rate limit. {retry_delay}s kutish... ({attempt + 1}/{max_retries})")
+                    log.warning("gemini_rate_limited", "⚠️ Rate limit. {seconds}s kutish... ({attempt}/{max_retries})",
+                                seconds=retry_delay, attempt=attempt + 1, max_retries=max_retries)
                     time.sleep(retry_delay)
                     continue
                 else:
-                    print(f"❌ Gemini AI xatosi: {e}")
+                    log.error("gemini_error", "❌ Gemini AI xatosi: {error}", error=str(e))
                     break
         
         # Better fallback message
         return "Rahmat! Savolingiz qabul qilindi. Tez orada javob beramiz! 🙏"
 
 
-# Singleton instance
-gemini_ai = GeminiAI() if config.GEMINI_API_KEY else None
+# Lazy singleton instance
+_gemini_ai: Optional[GeminiAI] = None
+_gemini_ai_lock = threading.Lock()
+
+
+def get_gemini_ai() -> Optional[GeminiAI]:
+    """Get the shared GeminiAI, configuring it on first use (None without API key)"""
+    global _gemini_ai
+    if _gemini_ai is None and config.GEMINI_API_KEY:
+        with _gemini_ai_lock:
+            if _gemini_ai is None:
+                _gemini_ai = GeminiAI()
+    return _gemini_ai
@@ -1,50 +1,117 @@
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, List
-from instagrapi import Client
-from instagrapi.types import DirectThread, DirectMessage, Media, Comment
+from typing import Optional, List, Iterator, Tuple, TYPE_CHECKING
 from config import config
+from accounts import Account, get_current_account
+from circuit_breaker import api_guard, CircuitOpenError, classify_error, THROTTLE
+from records import MediaRecord, CommentRecord, comment_user_pk, comment_created_at
+from processed_index import ProcessedIndex
+from tracing import tracer, traced
+from traffic_recorder import traffic_recorder, endpoint_name
+from logger import log
+import warm_state
 
-# Try to import database module
-try:
-    from database import db
-    HAS_DB = db.enabled
-except:
-    HAS_DB = False
-    db = None
+if TYPE_CHECKING:
+    from instagrapi.types import DirectThread, DirectMessage
+
+
+def _get_db():
+    """Return the shared database if it is enabled, else None"""
+    try:
+        from database import get_db
+        db = get_db()
+        return db if db.enabled else None
+    except Exception:
+        return None
+
+
+def _api_blocked(error: Exception) -> bool:
+    """Breaker/throttle errors: the action must be retried later, not counted as a failed send"""
+    return isinstance(error, CircuitOpenError) or classify_error(error) == THROTTLE
+
+
+def _call_name(func, args) -> str:
+    """Client method name, or the endpoint ("media/comments") for private_request"""
+    name = getattr(func, "__name__", "call")
+    if name == "private_request" and args:
+        return endpoint_name(args[0])
+    return name
+
+
+def _stage_name(func, args) -> str:
+    """Span name of a client call: ig.<method>, or ig.<endpoint> for private_request"""
+    return f"ig.{_call_name(func, args)}"
 
 
 class InstagramHandler:
     """Instagram DM and Comment handler using instagrapi"""
     
-    SESSION_FILE = "session.json"
-    PROCESSED_FILE = "processed_comments.json"
-    
-    def __init__(self):
+    def __init__(self, account: Account = None):
+        # Sessions, files and DB state are namespaced per account
+        self.account = account or get_current_account()
+        self.SESSION_FILE = self.account.session_file
+        self.PROCESSED_FILE = self.account.processed_file
+        
+        # Deferred: instagrapi is heavy and only needed once the bot starts
+        from instagrapi import Client
+        
         self.client = Client()
         self.client.delay_range = [1, 3]  # Random delay between actions
         self.logged_in = False
+        self._session_refresher: Optional[threading.Thread] = None
+        self._session_refresher_stop = threading.Event()
+        self._retention_job: Optional[threading.Thread] = None
         self.processed_messages: set = set()  # Track processed message IDs
-        self.processed_comments: set = set()  # Track processed comment IDs
-        self._load_processed_comments()
+        # Processed comment IDs: the whole retention period in memory without a DB,
+        # only the warm window with one (older ids are looked up on demand)
+        self.processed_comments = ProcessedIndex(config.PROCESSED_RETENTION_DAYS * 86400)
+        # Finished delivery steps of comments not fully processed yet (kept in the DB too)
+        self._comment_steps: "OrderedDict[str, set]" = OrderedDict()
+        self._steps_lock = threading.Lock()
+        self.log = log.bind(account=self.account.name)
     
-    def _load_processed_comments(self):
-        """Load processed comments from database or file"""
+    def load_processed_comments(self):
+        """Load recently processed comments from the warm-restart snapshot, database (warm window) or file"""
+        db = _get_db()
+        if db:
+            self.processed_comments = ProcessedIndex(config.PROCESSED_WARM_DAYS * 86400)
+        
+        # Right after a clean shutdown the snapshot already holds the window
+        state = warm_state.restore(self.account)
+        if state:
+            self.import_state(state)
+            if db:
+                self.log.info("processed_restored", "📥 {count} ta processed comment snapshotdan tiklandi",
+                              count=len(self.processed_comments))
+                return
+        
         # Try database first
-        if HAS_DB and db:
-            self.processed_comments = db.get_processed_comments()
+        if db:
+            self.processed_comments.update(db.get_processed_comments(self.account.name, config.PROCESSED_WARM_DAYS))
             if self.processed_comments:
-                print(f"📥 {len(self.processed_comments)} ta processed comment DBdan yuklandi")
+                self.log.info("processed_loaded", "📥 {count} ta processed comment DBdan yuklandi",
+                              count=len(self.processed_comments))
                 return
         
         # Fallback to file
         if os.path.exists(self.PROCESSED_FILE):
             try:
                 with open(self.PROCESSED_FILE, 'r') as f:
-                    self.processed_comments = set(json.load(f))
+                    self.processed_comments.update(json.load(f))
             except:
-                self.processed_comments = set()
+                pass
+    
+    def export_state(self) -> dict:
+        """Processed comment/message ids for the warm-restart snapshot"""
+        return {"processed": self.processed_comments.snapshot(), "messages": list(self.processed_messages)}
+    
+    def import_state(self, state: dict):
+        self.processed_comments.restore(state.get("processed", []))
+        self.processed_messages.update(state.get("messages", []))
     
     def _save_processed_comments(self):
         """Save processed comments to file"""
@@ -52,98 +119,218 @@ class InstagramHandler:
             with open(self.PROCESSED_FILE, 'w') as f:
                 json.dump(list(self.processed_comments), f)
         except Exception as e:
-            print(f"⚠️ Kommentariyalar saqlanmadi: {e}")
+            self.log.warning("processed_save_failed", "⚠️ Kommentariyalar saqlanmadi: {error}", error=str(e))
     
+    @traced()
     def login(self) -> bool:
         """
         Login to Instagram, using saved session if available
         Priority: SESSION_DATA env > Database > File > Fresh login
+        (SESSION_DATA_<NAME> for non-default accounts)
+        
+        Saved sessions are resumed without a full login when they still work
+        (see SESSION_RESUME); a full login is done only as a fallback.
         
         Returns:
             True if login successful, False otherwise
         """
         try:
             # 1. Try to load session from SESSION_DATA env var (for cloud deployment)
-            session_data_env = os.getenv("SESSION_DATA", "")
+            session_data_env = os.getenv(self.account.session_data_env, "")
             if session_data_env:
-                print("📱 Session ENV dan yuklanmoqda...", flush=True)
+                self.log.info("session_loading", "📱 Session ENV dan yuklanmoqda...", source="env")
                 try:
                     import base64
                     session_json = base64.b64decode(session_data_env).decode('utf-8')
                     session_dict = json.loads(session_json)
-                    self.client.set_settings(session_dict)
-                    self.client.login(config.INSTAGRAM_USERNAME, config.INSTAGRAM_PASSWORD)
-                    self.logged_in = True
-                    print("✅ Session ENV dan muvaffaqiyatli yuklandi!", flush=True)
-                    return True
+                    self._activate_session(session_dict)
+                    self.log.info("session_loaded", "✅ Session ENV dan muvaffaqiyatli yuklandi!", source="env")
+                    return self._on_logged_in()
                 except Exception as e:
-                    print(f"⚠️ SESSION_DATA yaroqsiz: {e}", flush=True)
+                    self.log.warning("session_invalid", "⚠️ SESSION_DATA yaroqsiz: {error}",
+                                     source="env", error=str(e))
             
             # 2. Try to load session from database
-            if HAS_DB and db:
-                db_session = db.load_session()
+            db = _get_db()
+            if db:
+                db_session = db.load_session(self.account.name)
                 if db_session:
-                    print("📱 Session databazadan yuklanmoqda...", flush=True)
+                    self.log.info("session_loading", "📱 Session databazadan yuklanmoqda...", source="db")
                     try:
-                        self.client.set_settings(db_session)
-                        self.client.login(config.INSTAGRAM_USERNAME, config.INSTAGRAM_PASSWORD)
-                        self.logged_in = True
-                        print("✅ Session databazadan muvaffaqiyatli yuklandi!", flush=True)
-                        return True
+                        self._activate_session(db_session)
+                        self.log.info("session_loaded", "✅ Session databazadan muvaffaqiyatli yuklandi!", source="db")
+                        return self._on_logged_in()
                     except Exception as e:
-                        print(f"⚠️ DB sessiya yaroqsiz: {e}")
+                        self.log.warning("session_invalid", "⚠️ DB sessiya yaroqsiz: {error}",
+                                         source="db", error=str(e))
             
             # Try to load existing session from file
             if os.path.exists(self.SESSION_FILE):
-                print("📱 Saqlangan sessiya topildi, yuklanmoqda...")
+                self.log.info("session_loading", "📱 Saqlangan sessiya topildi, yuklanmoqda...", source="file")
                 try:
-                    self.client.load_settings(self.SESSION_FILE)
-                    self.client.login(config.INSTAGRAM_USERNAME, config.INSTAGRAM_PASSWORD)
-                    self.logged_in = True
-                    print("✅ Sessiya muvaffaqiyatli yuklandi!")
+                    with open(self.SESSION_FILE, 'r') as f:
+                        self._activate_session(json.load(f))
+                    self.log.info("session_loaded", "✅ Sessiya muvaffaqiyatli yuklandi!", source="file")
                     # Save to DB for cloud use
                     self._save_session_to_db()
-                    return True
+                    return self._on_logged_in()
                 except Exception as e:
-                    print(f"⚠️ Sessiya yaroqsiz, qaytadan kirish... ({e})")
+                    self.log.warning("session_invalid", "⚠️ Sessiya yaroqsiz, qaytadan kirish... ({error})",
+                                     source="file", error=str(e))
                     os.remove(self.SESSION_FILE)
             
             # Fresh login
-            print("🔐 Instagram ga kirish...")
-            self.client.login(config.INSTAGRAM_USERNAME, config.INSTAGRAM_PASSWORD)
+            self.log.info("login", "🔐 Instagram ga kirish...")
+            self.client.login(self.account.username, self.account.password)
             
             # Save session for future use
             self.client.dump_settings(self.SESSION_FILE)
             self._save_session_to_db()
-            print("✅ Muvaffaqiyatli kirildi va sessiya saqlandi!")
+            self.log.info("login_done", "✅ Muvaffaqiyatli kirildi va sessiya saqlandi!")
             
-            self.logged_in = True
-            return True
+            return self._on_logged_in()
             
         except Exception as e:
-            print(f"❌ Instagram ga kirishda xatolik: {e}")
+            self.log.error("login_failed", "❌ Instagram ga kirishda xatolik: {error}", error=str(e))
             self.logged_in = False
             return False
     
+    def _activate_session(self, settings: dict):
+        """
+        Restore cookies and device settings, then verify them with one
+        lightweight authenticated request. Falls back to a full login
+        (keeping the same device uuids) only if the session no longer works.
+        With SESSION_RESUME off, logs in on top of the restored settings.
+        """
+        self.client.set_settings(settings)
+        
+        if not config.SESSION_RESUME:
+            # Login on top of the saved cookies (a cookie-less login invites challenges)
+            self.client.login(self.account.username, self.account.password)
+            return
+        
+        if self._is_session_valid():
+            self.log.info("session_resumed", "⚡ Sessiya login qilinmasdan tiklandi")
+            return
+        
+        # Resume failed: the cookies are dead, log in fresh with the same device
+        self.log.info("session_expired", "🔐 Sessiya eskirgan, to'liq login...")
+        uuids = self.client.get_settings().get("uuids")
+        self.client.set_settings({})
+        if uuids:
+            self.client.set_uuids(uuids)
+        self.client.login(self.account.username, self.account.password)
+    
+    def _is_session_valid(self) -> bool:
+        """Check restored session with a single cheap authenticated call"""
+        if not self.client.user_id:
+            return False
+        try:
+            self._api("read", self.client.account_info)
+            return True
+        except Exception as e:
+            self.log.warning("session_check_failed", "⚠️ Sessiya tekshiruvi o'tmadi: {error}", error=str(e))
+            return False
+    
+    def _on_logged_in(self) -> bool:
+        """Mark handler as logged in and start background session refresh"""
+        self.logged_in = True
+        self.start_session_refresher()
+        self.start_retention_job()
+        return True
+    
     def _save_session_to_db(self):
         """Save current session to database"""
-        if HAS_DB and db:
+        db = _get_db()
+        if db:
             try:
                 settings = self.client.get_settings()
-                db.save_session(settings)
+                db.save_session(settings, self.account.name)
             except Exception as e:
-                print(f"⚠️ Session DBga saqlanmadi: {e}")
+                self.log.warning("session_save_failed", "⚠️ Session DBga saqlanmadi: {error}", error=str(e))
+    
+    def start_session_refresher(self):
+        """Persist the current session periodically in a background thread"""
+        interval = config.SESSION_REFRESH_INTERVAL
+        if interval <= 0 or (self._session_refresher and self._session_refresher.is_alive()):
+            return
+        
+        self._session_refresher_stop.clear()
+        self._session_refresher = threading.Thread(
+            target=self._session_refresh_loop, args=(interval,), daemon=True
+        )
+        self._session_refresher.start()
+    
+    def stop_session_refresher(self):
+        """Stop the background session refresher"""
+        self._session_refresher_stop.set()
+    
+    def _session_refresh_loop(self, interval: int):
+        """Save cookies/device settings every `interval` seconds while logged in"""
+        while not self._session_refresher_stop.wait(interval):
+            if not self.logged_in:
+                continue
+            self._save_session_to_db()
+            try:
+                self.client.dump_settings(self.SESSION_FILE)
+            except Exception as e:
+                self.log.warning("session_save_failed", "⚠️ Sessiya faylga saqlanmadi: {error}", error=str(e))
+    
+    def start_retention_job(self):
+        """Prune processed ids (DB rows past retention, memory past its window) in the background"""
+        interval = config.PROCESSED_PRUNE_INTERVAL
+        if interval <= 0 or (self._retention_job and self._retention_job.is_alive()):
+            return
+        
+        self._retention_job = threading.Thread(
+            target=self._retention_loop, args=(interval,), daemon=True, name=f"retention-{self.account.name}"
+        )
+        self._retention_job.start()
+    
+    def _retention_loop(self, interval: int):
+        while not self._session_refresher_stop.wait(interval):
+            self.prune_processed_comments()
+    
+    def prune_processed_comments(self) -> dict:
+        """One retention pass; returns how many ids were dropped where"""
+        db = _get_db()
+        deleted = 0
+        if db:
+            deleted = db.prune_processed_comments(config.PROCESSED_RETENTION_DAYS, config.PROCESSED_PRUNE_BATCH)
+        evicted = self.processed_comments.prune()
+        if evicted:
+            self._save_processed_comments()
+        if deleted or evicted:
+            self.log.info("processed_pruned", "🧹 Eski commentlar tozalandi: DB {deleted}, xotira {evicted}",
+                          deleted=deleted, evicted=evicted, remaining=len(self.processed_comments))
+        return {"deleted": deleted, "evicted": evicted, "in_memory": len(self.processed_comments)}
+    
+    def _api(self, family: str, func, *args, **kwargs):
+        """
+        Call an instagrapi client method through the shared circuit breaker
+        and adaptive throttle
+        
+        Args:
+            family: Endpoint family ("read", "friendship", "comment", "dm")
+            func: Bound client method
+        """
+        with tracer.span(_stage_name(func, args), family=family):
+            if traffic_recorder.enabled:
+                func = traffic_recorder.wrap("ig", _call_name(func, args), self.account.name, func,
+                                             owner=self.client.user_id)
+            return api_guard.call(family, func, *args, **kwargs)
     
     # ==================== DM Functions ====================
     
-    def get_unread_threads(self) -> list[DirectThread]:
+    @traced()
+    def get_unread_threads(self) -> list['DirectThread']:
         """Get threads with unread messages"""
         if not self.logged_in:
-            print("❌ Avval login qiling!")
+            self.log.error("not_logged_in", "❌ Avval login qiling!")
             return []
         
         try:
-            threads = self.client.direct_threads(amount=20)
+            threads = self._api("read", self.client.direct_threads, amount=20)
             unread_threads = []
             
             for thread in threads:
@@ -156,10 +343,10 @@ class InstagramHandler:
             return unread_threads
             
         except Exception as e:
-            print(f"❌ Xabarlarni olishda xatolik: {e}")
+            self.log.error("threads_failed", "❌ Xabarlarni olishda xatolik: {error}", error=str(e))
             return []
     
-    def get_latest_message(self, thread: DirectThread) -> Optional[DirectMessage]:
+    def get_latest_message(self, thread: 'DirectThread') -> Optional['DirectMessage']:
         """Get the latest unprocessed message from a thread"""
         if thread.messages:
             message = thread.messages[0]
@@ -167,25 +354,29 @@ class InstagramHandler:
                 return message
         return None
     
+    @traced()
     def send_message(self, thread_id: str, text: str) -> bool:
         """Send a message to a thread"""
         if not self.logged_in:
-            print("❌ Avval login qiling!")
+            self.log.error("not_logged_in", "❌ Avval login qiling!")
             return False
         
         try:
-            self.client.direct_send(text, thread_ids=[thread_id])
-            print(f"📤 Xabar yuborildi: {text[:50]}...")
+            self._api("dm", self.client.direct_send, text, thread_ids=[thread_id])
+            self.log.info("message_sent", "📤 Xabar yuborildi: {text}...", text=text[:50], thread_id=thread_id)
             return True
             
         except Exception as e:
-            print(f"❌ Xabar yuborishda xatolik: {e}")
+            if _api_blocked(e):
+                raise
+            self.log.error("message_failed", "❌ Xabar yuborishda xatolik: {error}", error=str(e), thread_id=thread_id)
             return False
     
     def mark_as_processed(self, message_id: str):
         """Mark a message as processed"""
         self.processed_messages.add(str(message_id))
     
+    @traced()
     def send_dm_to_user(self, user_id: int, text: str) -> bool:
         """
         Send a direct message to a user by their user ID
@@ -198,21 +389,91 @@ class InstagramHandler:
             True if sent successfully, False otherwise
         """
         if not self.logged_in:
-            print("❌ Avval login qiling!")
+            self.log.error("not_logged_in", "❌ Avval login qiling!")
             return False
         
         try:
-            self.client.direct_send(text, user_ids=[user_id])
-            print(f"📩 DM yuborildi (user_id: {user_id}): {text[:50]}...")
+            self._api("dm", self.client.direct_send, text, user_ids=[int(user_id)])
+            self.log.info("dm_sent", "📩 DM yuborildi (user_id: {user_id}): {text}...",
+                          user_id=user_id, text=text[:50])
             return True
             
         except Exception as e:
-            print(f"❌ DM yuborishda xatolik: {e}")
+            if _api_blocked(e):
+                raise  # Caller leaves the comment unprocessed until the API recovers
+            self.log.error("dm_failed", "❌ DM yuborishda xatolik: {error}", error=str(e), user_id=user_id)
             return False
     
     # ==================== Comment Functions ====================
     
-    def get_my_recent_posts(self, amount: int = 10) -> List[Media]:
+    @traced()
+    def get_posts_page(self, max_id: str = "", count: int = 33) -> Tuple[List[MediaRecord], str]:
+        """
+        Fetch one page of my posts (newest first)
+        
+        Returns:
+            (MediaRecord list, next max_id or "" when there are no more pages)
+        """
+        params = {"count": count}
+        if max_id:
+            params["max_id"] = max_id
+        result = self._api("read", self.client.private_request, f"feed/user/{self.client.user_id}/", params=params)
+        medias = [MediaRecord.from_raw(item) for item in result.get("items", [])]
+        next_max_id = result.get("next_max_id") or ""
+        if not result.get("more_available"):
+            next_max_id = ""
+        return medias, next_max_id
+    
+    @traced()
+    def get_comments_page(self, media: MediaRecord, min_id: str = "", max_id: str = "") -> Tuple[List[CommentRecord], int, str, str]:
+        """
+        Fetch one page of comments and keep only new ones
+        
+        Returns:
+            (new CommentRecord list, number of comments scanned, next min_id, next max_id)
+        """
+        params = {"can_support_threading": "true", "permalink_enabled": "false"}
+        if min_id:
+            params["min_id"] = min_id
+        if max_id:
+            params["max_id"] = max_id
+        result = self._api("read", self.client.private_request, f"media/{media.id}/comments/", params=params)
+        items = result.get("comments", [])
+        
+        own_pk = str(self.client.user_id)
+        oldest = time.time() - config.PROCESSED_RETENTION_DAYS * 86400
+        candidates = [
+            item for item in items
+            # Skip own, already processed and past-retention comments before building a record
+            if comment_user_pk(item) != own_pk and str(item["pk"]) not in self.processed_comments
+            and not 0 < comment_created_at(item) < oldest  # 0 = unknown: kept, the DB lookup decides
+        ]
+        candidates = self._drop_processed_in_db(candidates)
+        new_comments = [CommentRecord.from_raw(item, media.id) for item in candidates]
+        return new_comments, len(items), result.get("next_min_id") or "", result.get("next_max_id") or ""
+    
+    def _drop_processed_in_db(self, items: list) -> list:
+        """
+        Comments older than the in-memory window may have been processed before
+        it: ask the DB (one indexed query per page) and remember the hits
+        """
+        db = _get_db()
+        if not db or not items:
+            return items
+        
+        # A comment created inside the window can only have been processed inside it
+        window_start = time.time() - self.processed_comments.window
+        older = [str(item["pk"]) for item in items if comment_created_at(item) < window_start]
+        if not older:
+            return items
+        found = db.find_processed_comments(older)
+        if not found:
+            return items
+        self.processed_comments.update(found)
+        return [item for item in items if str(item["pk"]) not in found]
+    
+    @traced()
+    def get_my_recent_posts(self, amount: int = 10) -> List[MediaRecord]:
         """
         Get my recent posts
         
@@ -220,43 +481,59 @@ class InstagramHandler:
             amount: Number of posts to fetch
             
         Returns:
-            List of Media objects
+            List of MediaRecord objects
         """
         if not self.logged_in:
-            print("❌ Avval login qiling!")
+            self.log.error("not_logged_in", "❌ Avval login qiling!")
             return []
         
         try:
-            user_id = self.client.user_id
-            medias = self.client.user_medias(user_id, amount=amount)
-            return medias
+            medias = []
+            max_id = ""
+            while len(medias) < amount:
+                page, max_id = self.get_posts_page(max_id, count=min(amount - len(medias), 33))
+                medias.extend(page)
+                if not max_id:
+                    break
+            return medias[:amount]
         except Exception as e:
-            print(f"❌ Postlarni olishda xatolik: {e}")
+            self.log.error("posts_failed", "❌ Postlarni olishda xatolik: {error}", error=str(e))
             return []
     
-    def get_new_comments(self, media: Media) -> List[Comment]:
+    def iter_all_posts(self) -> Iterator[MediaRecord]:
+        """Yield every post of the account, newest first (used by backfill)"""
+        max_id = ""
+        while True:
+            page, max_id = self.get_posts_page(max_id)
+            yield from page
+            if not max_id:
+                return
+    
+    @traced()
+    def get_new_comments(self, media: MediaRecord, amount: int = 30) -> List[CommentRecord]:
         """
         Get new (unprocessed) comments for a post, sorted by time (newest first)
         
         Args:
-            media: The Media object
+            media: The MediaRecord object
+            amount: Maximum number of comments to scan
             
         Returns:
-            List of new Comment objects, newest first
+            List of new CommentRecord objects, newest first
         """
         if not self.logged_in:
             return []
         
         try:
-            comments = self.client.media_comments(media.id, amount=30)
             new_comments = []
-            
-            for comment in comments:
-                comment_id = str(comment.pk)
-                # Skip own comments and already processed
-                if (str(comment.user.pk) != str(self.client.user_id) and 
-                    comment_id not in self.processed_comments):
-                    new_comments.append(comment)
+            scanned = 0
+            min_id = ""
+            while scanned < amount:
+                page, page_scanned, min_id, _ = self.get_comments_page(media, min_id)
+                new_comments.extend(page)
+                scanned += page_scanned
+                if not page_scanned or not min_id:
+                    break
             
             # Sort by pk (higher pk = newer comment)
             new_comments.sort(key=lambda c: int(c.pk), reverse=True)
@@ -264,9 +541,11 @@ class InstagramHandler:
             return new_comments
             
         except Exception as e:
-            print(f"❌ Kommentariyalarni olishda xatolik: {e}")
+            self.log.error("comments_failed", "❌ Kommentariyalarni olishda xatolik: {error}", error=str(e),
+                           media_id=media.id)
             return []
     
+    @traced()
     def reply_to_comment(self, media_id: str, comment_id: str, text: str) -> bool:
         """
         Reply to a comment
@@ -280,37 +559,83 @@ class InstagramHandler:
             True if successful, False otherwise
         """
         if not self.logged_in:
-            print("❌ Avval login qiling!")
+            self.log.error("not_logged_in", "❌ Avval login qiling!")
             return False
         
         try:
-            self.client.media_comment(media_id, text, replied_to_comment_id=comment_id)
-            print(f"💬 Kommentariyaga javob yuborildi: {text[:50]}...")
+            self._api("comment", self.client.media_comment, media_id, text, replied_to_comment_id=comment_id)
+            self.log.info("comment_replied", "💬 Kommentariyaga javob yuborildi: {text}...", text=text[:50],
+                          comment_id=comment_id)
             return True
             
         except Exception as e:
-            print(f"❌ Kommentariyaga javob berishda xatolik: {e}")
+            if _api_blocked(e):
+                raise  # Caller leaves the comment unprocessed until the API recovers
+            self.log.error("reply_failed", "❌ Kommentariyaga javob berishda xatolik: {error}", error=str(e),
+                           comment_id=comment_id)
             return False
     
+    MAX_PENDING_STEPS = 10_000  # Comments with unfinished deliveries kept in memory
+    
+    def completed_steps(self, comment_id: str) -> set:
+        """Delivery steps already done for a comment (a retry must not repeat them)"""
+        comment_id = str(comment_id)
+        with self._steps_lock:
+            steps = self._comment_steps.get(comment_id)
+        if steps is None:
+            db = _get_db()
+            steps = db.get_comment_steps(comment_id, self.account.name) if db else set()
+        return set(steps)
+    
+    def mark_step_done(self, comment_id: str, step: str):
+        """Remember that one delivery step (e.g. the public reply) of a comment went out"""
+        comment_id = str(comment_id)
+        steps = self.completed_steps(comment_id) | {step}
+        with self._steps_lock:
+            self._comment_steps[comment_id] = steps
+            self._comment_steps.move_to_end(comment_id)
+            if len(self._comment_steps) > self.MAX_PENDING_STEPS:
+                self._comment_steps.popitem(last=False)
+        db = _get_db()
+        if db:
+            db.add_comment_step(comment_id, step, self.account.name)
+    
     def mark_comment_processed(self, comment_id: str):
         """Mark a comment as processed and save to database/file"""
         self.processed_comments.add(str(comment_id))
+        with self._steps_lock:
+            self._comment_steps.pop(str(comment_id), None)
         
         # Save to database
-        if HAS_DB and db:
-            db.mark_comment_processed(str(comment_id))
+        db = _get_db()
+        if db:
+            db.mark_comment_processed(str(comment_id), self.account.name)
         
         # Also save to file as backup
         self._save_processed_comments()
     
+    def mark_comments_processed(self, comment_ids: list):
+        """Mark many comments as processed with one DB write and one file save"""
+        if not comment_ids:
+            return
+        self.processed_comments.update(str(comment_id) for comment_id in comment_ids)
+        
+        db = _get_db()
+        if db:
+            db.mark_comments_processed(comment_ids, self.account.name)
+        
+        self._save_processed_comments()
+    
+    @traced()
     def get_user_info(self, user_id: int) -> str:
         """Get username by user ID"""
         try:
-            user = self.client.user_info(user_id)
+            user = self._api("read", self.client.user_info, user_id)
             return user.username
         except:
             return f"user_{user_id}"
     
+    @traced()
     def is_user_following(self, user_id: int) -> bool:
         """
         Check if a user is following our account
@@ -326,15 +651,31 @@ class InstagramHandler:
         
         try:
             # Use friendship API to check relationship
-            friendship = self.client.user_friendship_v1(user_id)
+            friendship = self._api("friendship", self.client.user_friendship_v1, user_id)
             is_following = friendship.followed_by
-            print(f"   📊 Obuna holati: {'✅ Obuna' if is_following else '❌ Obuna emas'}")
+            self.log.info("follow_status", "📊 Obuna holati: {status}",
+                          status="✅ Obuna" if is_following else "❌ Obuna emas",
+                          user_id=user_id, following=is_following)
             return is_following
         except Exception as e:
-            print(f"⚠️ Obunani tekshirishda xatolik: {e}")
+            if _api_blocked(e):
+                raise  # Don't assume "following" while the API is blocked
+            self.log.warning("follow_check_failed", "⚠️ Obunani tekshirishda xatolik: {error}", error=str(e),
+                             user_id=user_id)
             # If we can't check, assume they're following to avoid blocking
             return True
 
 
-# Singleton instance
-instagram_handler = InstagramHandler()
+# Lazy singleton instance
+_instagram_handler: Optional[InstagramHandler] = None
+_instagram_handler_lock = threading.Lock()
+
+
+def get_instagram_handler() -> InstagramHandler:
+    """Get the shared InstagramHandler, creating it on first use"""
+    global _instagram_handler
+    if _instagram_handler is None:
+        with _instagram_handler_lock:
+            if _instagram_handler is None:
+                _instagram_handler = InstagramHandler()
+    return _instagram_handler
@@ -0,0 +1,226 @@
+"""
+Leader election via a Postgres advisory lock with a lease and heartbeat
+Exactly one process (the leader) runs the bots; the others only serve HTTP
+and stand by to take over when the leader's DB session goes away
+"""
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+from config import config
+from logger import log
+
+try:
+    import psycopg2
+    HAS_PSYCOPG2 = True
+except ImportError:
+    HAS_PSYCOPG2 = False
+
+
+# Arbitrary 64-bit key identifying the "bots runner" advisory lock
+LEADER_LOCK_KEY = 7_301_955_214_083
+
+
+class LeaderElector:
+    """Postgres advisory-lock leader election with a lease row for visibility"""
+
+    def __init__(self, database_url: str = None, lease_seconds: int = None, heartbeat_interval: int = None):
+        self.database_url = database_url or os.getenv("DATABASE_URL", "")
+        self.lease_seconds = lease_seconds or config.LEADER_LEASE_SECONDS
+        self.heartbeat_interval = heartbeat_interval or config.LEADER_HEARTBEAT_INTERVAL
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.enabled = bool(self.database_url) and HAS_PSYCOPG2
+        self.is_leader = False
+        self.elected_at: Optional[str] = None
+        self.last_heartbeat: Optional[str] = None
+        self.conn = None
+        self._stop = threading.Event()
+
+    # ==================== Connection ====================
+
+    def _connect(self):
+        """Open the dedicated connection that owns the advisory lock"""
+        self.conn = psycopg2.connect(
+            self.database_url,
+            connect_timeout=self.heartbeat_interval,
+            # Client side: notice a dead server quickly
+            keepalives=1,
+            keepalives_idle=self.heartbeat_interval,
+            keepalives_interval=2,
+            keepalives_count=2,
+        )
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            # Server side: drop (and unlock) a dead leader's session quickly
+            cur.execute("SET tcp_keepalives_idle = %s", (self.heartbeat_interval,))
+            cur.execute("SET tcp_keepalives_interval = 2")
+            cur.execute("SET tcp_keepalives_count = 2")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS bot_leader (
+                    id INT PRIMARY KEY DEFAULT 1,
+                    holder_id VARCHAR(255) NOT NULL,
+                    elected_at TIMESTAMP NOT NULL,
+                    lease_expires_at TIMESTAMP NOT NULL,
+                    CHECK (id = 1)
+                )
+            """)
+
+    def _close(self):
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    # ==================== Election ====================
+
+    def try_acquire(self) -> bool:
+        """Try to become leader; returns True if this process holds the lock"""
+        if not self.enabled:
+            self.is_leader = True
+            return True
+
+        try:
+            if self.conn is None or self.conn.closed:
+                self._connect()
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s)", (LEADER_LOCK_KEY,))
+                acquired = cur.fetchone()[0]
+                if acquired:
+                    cur.execute("""
+                        INSERT INTO bot_leader (id, holder_id, elected_at, lease_expires_at)
+                        VALUES (1, %s, NOW(), NOW() + make_interval(secs => %s))
+                        ON CONFLICT (id) DO UPDATE SET
+                            holder_id = EXCLUDED.holder_id,
+                            elected_at = EXCLUDED.elected_at,
+                            lease_expires_at = EXCLUDED.lease_expires_at
+                    """, (self.holder_id, self.lease_seconds))
+        except Exception as e:
+            log.warning("leader_lock_failed", "⚠️ Leader lock olinmadi: {error}", error=str(e))
+            self._close()
+            return False
+
+        if acquired:
+            self.is_leader = True
+            self.elected_at = datetime.now().isoformat()
+            self.last_heartbeat = self.elected_at
+            log.info("leader_elected", "👑 Leader tanlandi: {holder_id}", holder_id=self.holder_id)
+        return acquired
+
+    def heartbeat(self) -> bool:
+        """Renew the lease; returns False if leadership can no longer be trusted"""
+        if not self.enabled:
+            return True
+        if not self.is_leader:
+            return False
+
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE bot_leader
+                    SET lease_expires_at = NOW() + make_interval(secs => %s)
+                    WHERE id = 1 AND holder_id = %s
+                """, (self.lease_seconds, self.holder_id))
+                if cur.rowcount != 1:
+                    raise RuntimeError("lease boshqa jarayonga o'tgan")
+            self.last_heartbeat = datetime.now().isoformat()
+            return True
+        except Exception as e:
+            log.warning("leader_heartbeat_failed", "⚠️ Leader heartbeat xatosi: {error}", error=str(e))
+            self._demote()
+            return False
+
+    def release(self):
+        """Give up leadership (unlocks and expires the lease)"""
+        if self.enabled and self.is_leader and self.conn and not self.conn.closed:
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE bot_leader SET lease_expires_at = NOW() WHERE id = 1 AND holder_id = %s",
+                        (self.holder_id,)
+                    )
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (LEADER_LOCK_KEY,))
+            except Exception:
+                pass
+        self._demote()
+
+    def _demote(self):
+        # Closing the session also drops the advisory lock server-side
+        self.is_leader = False
+        self.elected_at = None
+        self._close()
+
+    def current_leader(self) -> Optional[dict]:
+        """Read the lease row (who leads and until when)"""
+        if not self.enabled or self.conn is None or self.conn.closed:
+            return None
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT holder_id, elected_at, lease_expires_at, lease_expires_at > NOW()
+                    FROM bot_leader WHERE id = 1
+                """)
+                row = cur.fetchone()
+                if row:
+                    return {
+                        "holder_id": row[0],
+                        "elected_at": row[1].isoformat(),
+                        "lease_expires_at": row[2].isoformat(),
+                        "lease_valid": row[3],
+                    }
+        except Exception:
+            pass
+        return None
+
+    # ==================== Loop ====================
+
+    def run(self, on_elected: Callable[[], None], on_demoted: Callable[[], None]):
+        """
+        Campaign for leadership until stop() is called
+
+        Standbys retry every heartbeat interval; the leader renews its lease
+        on the same schedule and calls `on_demoted` as soon as it fails.
+        """
+        while not self._stop.is_set():
+            if not self.is_leader:
+                if self.try_acquire():
+                    on_elected()
+                    if not self.enabled:
+                        return  # Single-process mode: nothing to renew
+            elif not self.heartbeat():
+                on_demoted()
+            self._stop.wait(self.heartbeat_interval)
+
+        if self.is_leader:
+            self.release()
+            on_demoted()
+
+    def keep_alive(self, on_lost: Callable[[], None]):
+        """Renew the lease of an already-elected leader until stop() or loss"""
+        while not self._stop.wait(self.heartbeat_interval):
+            if not self.heartbeat():
+                on_lost()
+                return
+        self.release()
+
+    def start(self, on_elected: Callable[[], None], on_demoted: Callable[[], None]) -> threading.Thread:
+        """Run the election loop in a daemon thread"""
+        thread = threading.Thread(target=self.run, args=(on_elected, on_demoted), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Stop campaigning (releases leadership on the election thread)"""
+        self._stop.set()
+
+    def status(self) -> dict:
+        """Election state for health endpoints"""
+        return {
+            "enabled": self.enabled,
+            "holder_id": self.holder_id,
+            "role": "leader" if self.is_leader else "standby",
+            "elected_at": self.elected_at,
+            "last_heartbeat": self.last_heartbeat,
+        }
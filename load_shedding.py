@@ -0,0 +1,144 @@
+"""
+Backlog-aware load shedding with degradation tiers
+As the pending-comment backlog (depth and age of the oldest comment) grows,
+replies step down from full AI to cached/short AI, templates and finally
+keyword-only; tiers recover one step at a time once the backlog drains
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import List, Optional
+from config import config
+from logger import log
+from spam_filter import normalize_text
+
+FULL_AI = 0
+SHORT_AI = 1
+TEMPLATE = 2
+KEYWORD_ONLY = 3
+
+TIER_NAMES = ["full_ai", "short_ai", "template", "keyword_only"]
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+class DegradationPolicy:
+    """Picks the reply tier from backlog depth/age with hysteresis"""
+
+    def __init__(self, depths: List[int] = None, ages: List[int] = None, batches: List[int] = None):
+        # Entry thresholds for tiers 1..3 (SHORT_AI, TEMPLATE, KEYWORD_ONLY)
+        self.depths = depths or _int_list(config.LOAD_TIER_DEPTHS)
+        self.ages = ages or _int_list(config.LOAD_TIER_AGES)
+        # Comments handled per check cycle in each tier 0..3
+        self.batches = batches or _int_list(config.LOAD_TIER_BATCHES)
+        self.tier = FULL_AI
+        self.changed_at = time.time()
+        self.depth = 0
+        self.oldest_age = 0.0
+        self.transitions: deque = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    def _target_tier(self, depth: int, oldest_age: float) -> int:
+        target = FULL_AI
+        for tier, (max_depth, max_age) in enumerate(zip(self.depths, self.ages), start=1):
+            if depth >= max_depth or oldest_age >= max_age:
+                target = tier
+        return target
+
+    def update(self, depth: int, oldest_age: float) -> int:
+        """
+        Feed the current backlog and return the tier to use
+
+        Degrading is immediate; recovering drops one tier at a time and only
+        after the backlog is below half of the current tier's thresholds for
+        LOAD_TIER_MIN_DWELL seconds.
+        """
+        now = time.time()
+        with self._lock:
+            self.depth = depth
+            self.oldest_age = oldest_age
+            target = self._target_tier(depth, oldest_age)
+
+            if target > self.tier:
+                self._transition(target, now)
+            elif target < self.tier and now - self.changed_at >= config.LOAD_TIER_MIN_DWELL:
+                enter_depth = self.depths[self.tier - 1]
+                enter_age = self.ages[self.tier - 1]
+                if depth < enter_depth / 2 and oldest_age < enter_age / 2:
+                    self._transition(self.tier - 1, now)
+            return self.tier
+
+    def _transition(self, tier: int, now: float):
+        previous = self.tier
+        self.tier = tier
+        self.changed_at = now
+        self.transitions.append({
+            "at": datetime.fromtimestamp(now).isoformat(),
+            "from": TIER_NAMES[previous],
+            "to": TIER_NAMES[tier],
+            "depth": self.depth,
+            "oldest_age": round(self.oldest_age, 1),
+        })
+        arrow = "⬇️" if tier > previous else "⬆️"
+        log.warning("load_tier_changed",
+                    "{arrow} Yuklama darajasi: {previous} → {tier} (navbat: {depth}, eng eski: {oldest_age:.0f}s)",
+                    arrow=arrow, previous=TIER_NAMES[previous], tier=TIER_NAMES[tier], depth=self.depth,
+                    oldest_age=self.oldest_age)
+
+    @property
+    def batch_size(self) -> int:
+        return self.batches[min(self.tier, len(self.batches) - 1)]
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "tier": TIER_NAMES[self.tier],
+                "depth": self.depth,
+                "oldest_age": round(self.oldest_age, 1),
+                "since": datetime.fromtimestamp(self.changed_at).isoformat(),
+                "transitions": list(self.transitions),
+            }
+
+
+class ResponseCache:
+    """Small LRU of AI replies keyed by normalized comment text (SHORT_AI tier)"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return normalize_text(text)
+
+    def get(self, text: str) -> Optional[str]:
+        key = self._key(text)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, text: str, response: str):
+        key = self._key(text)
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self) -> list:
+        """[[normalized text, response], ...] in LRU order (warm-restart snapshot)"""
+        with self._lock:
+            return [[key, value] for key, value in self._entries.items()]
+
+    def restore(self, entries: list):
+        with self._lock:
+            for key, value in entries:
+                self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,195 @@
+"""
+Non-blocking structured logger
+Callers only build a tuple and enqueue it; a daemon thread formats the lines
+(JSON by default, LOG_FORMAT=text for the human-readable emoji output) and
+writes them to stdout in batches with one flush per batch.
+
+    log.info("dm_sent", "📩 DM yuborildi (user_id: {user_id})", user_id=user_id)
+
+Messages are str.format templates filled from the fields in the writer thread.
+Each event name is rate limited (LOG_RATE_LIMIT lines per LOG_RATE_WINDOW);
+the next line that gets through carries the number of suppressed ones. When
+LOG_QUEUE_SIZE lines are waiting, new ones are dropped and counted instead of
+blocking
+"""
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from config import config
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+BATCH_SIZE = 256
+_STOP = object()
+
+
+class Logger:
+    """Queue-backed logger shared by the whole process"""
+
+    def __init__(self, level: str = None, fmt: str = None, rate_limit: int = None, rate_window: float = None,
+                 queue_size: int = None, stream=None):
+        self.level = LEVELS.get((level or config.LOG_LEVEL).lower(), INFO)
+        self.json = (fmt or config.LOG_FORMAT).lower() != "text"
+        self.rate_limit = config.LOG_RATE_LIMIT if rate_limit is None else rate_limit
+        self.rate_window = rate_window or config.LOG_RATE_WINDOW
+        self.stream = stream  # None: sys.stdout at write time
+        self.dropped = 0
+        self.max_queue = queue_size or config.LOG_QUEUE_SIZE
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()  # C implementation: cheapest put
+        self._windows = {}  # event -> [window start, lines, suppressed]
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- hot path ----------
+
+    def _allow(self, event: str, now: float) -> Optional[int]:
+        """None if the line is suppressed, else how many were suppressed before it"""
+        if not self.rate_limit:
+            return 0
+        with self._lock:
+            window = self._windows.get(event)
+            if window is None or now - window[0] >= self.rate_window:
+                suppressed = window[2] if window else 0
+                self._windows[event] = [now, 1, 0]
+                return suppressed
+            if window[1] >= self.rate_limit:
+                window[2] += 1
+                return None
+            window[1] += 1
+            return 0
+
+    def log(self, level: int, event: str, msg: str = "", **fields):
+        if level < self.level:
+            return
+        now = time.time()
+        suppressed = self._allow(event, now)
+        if suppressed is None:
+            return
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1  # Writer can't keep up: drop rather than block the caller
+            return
+        self._queue.put((now, level, event, msg, fields, suppressed))
+        if self._thread is None:
+            self._start_writer()
+
+    def debug(self, event: str, msg: str = "", **fields):
+        self.log(DEBUG, event, msg, **fields)
+
+    def info(self, event: str, msg: str = "", **fields):
+        self.log(INFO, event, msg, **fields)
+
+    def warning(self, event: str, msg: str = "", **fields):
+        self.log(WARNING, event, msg, **fields)
+
+    def error(self, event: str, msg: str = "", **fields):
+        self.log(ERROR, event, msg, **fields)
+
+    def bind(self, **fields) -> "BoundLogger":
+        """Logger that adds `fields` (e.g. account=...) to every line"""
+        return BoundLogger(self, fields)
+
+    # ---------- writer thread ----------
+
+    def _start_writer(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, daemon=True, name="log-writer")
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _format(self, record: tuple) -> str:
+        at, level, event, msg, fields, suppressed = record
+        try:
+            text = msg.format(**fields) if fields and "{" in msg else msg
+        except (KeyError, IndexError, ValueError):
+            text = msg
+        if not self.json:
+            extra = f" (+{suppressed} o'xshash yozuv o'tkazib yuborildi)" if suppressed else ""
+            return f"[{datetime.fromtimestamp(at).strftime('%H:%M:%S')}] {text}{extra}"
+        line = {"ts": datetime.fromtimestamp(at).isoformat(timespec="milliseconds"),
+                "level": LEVEL_NAMES[level], "event": event, "msg": text}
+        line.update(fields)
+        if suppressed:
+            line["suppressed"] = suppressed
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if isinstance(record, tuple)]
+            lines = [self._format(record) for record in records]
+            stream = self.stream or sys.stdout
+            try:
+                if lines:
+                    stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except Exception:
+                self.dropped += len(lines)
+            for marker in batch:
+                if isinstance(marker, threading.Event):
+                    marker.set()  # flush() waiter
+            if _STOP in batch:
+                return
+
+    def flush(self, timeout: float = 2.0):
+        """Wait (bounded) until the lines queued so far are written"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        written = threading.Event()
+        self._queue.put(written)
+        written.wait(timeout)
+
+    def close(self):
+        """Write what is queued and stop the writer (registered atexit)"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=2)
+
+    def status(self) -> dict:
+        return {"queued": self._queue.qsize(), "dropped": self.dropped,
+                "suppressed": sum(window[2] for window in self._windows.values())}
+
+
+class BoundLogger:
+    """Logger view with default fields"""
+
+    def __init__(self, logger: Logger, fields: dict):
+        self._logger = logger
+        self._fields = fields
+
+    def log(self, level: int, event: str, msg: str = "", **fields):
+        self._logger.log(level, event, msg, **{**self._fields, **fields})
+
+    def debug(self, event: str, msg: str = "", **fields):
+        self.log(DEBUG, event, msg, **fields)
+
+    def info(self, event: str, msg: str = "", **fields):
+        self.log(INFO, event, msg, **fields)
+
+    def warning(self, event: str, msg: str = "", **fields):
+        self.log(WARNING, event, msg, **fields)
+
+    def error(self, event: str, msg: str = "", **fields):
+        self.log(ERROR, event, msg, **fields)
+
+    def bind(self, **fields) -> "BoundLogger":
+        return BoundLogger(self._logger, {**self._fields, **fields})
+
+
+# Shared instance (the writer thread starts with the first line)
+log = Logger()
@@ -1,20 +1,60 @@
+import asyncio
 import time
 import signal
 import os
 import threading
 from datetime import datetime
 from config import config
-from gemini_ai import GeminiAI
-from instagram_handler import InstagramHandler
+from circuit_breaker import api_guard, CircuitOpenError
+from accounts import Account, get_current_account
+from load_shedding import DegradationPolicy, ResponseCache, SHORT_AI, TEMPLATE, KEYWORD_ONLY
+from spam_filter import SpamFilter
+from trigger_cooldown import TriggerCooldown, SENT, FOLLOW_ASKED
+from database import get_db
+from gemini_ai import GeminiAI, get_gemini_ai
+from instagram_handler import InstagramHandler, get_instagram_handler
+from startup import warm_up
+from tracing import tracer
+from logger import log
+from stats_rollup import rollups
+from records import MediaRecord, CommentRecord
+import warm_state
 
 
 class InstagramAIBot:
     """Instagram Comment Bot with Keyword Detection (ManyChat-like)"""
     
-    def __init__(self):
+    def __init__(self, account: Account = None):
+        self.account = account or get_current_account()
         self.running = False
-        self.instagram = InstagramHandler()
+        self.instagram: InstagramHandler = None
         self.ai: GeminiAI = None
+        self.cooldown = TriggerCooldown(self.account.name)
+        self.spam_filter = SpamFilter() if config.SPAM_FILTER else None
+        self.load_policy = DegradationPolicy()
+        self.log = log.bind(account=self.account.name)
+        self.response_cache = ResponseCache()
+        self.backlog: list = []  # (post, comment) found by the last check but not handled yet
+        self._resumed: list = []  # Backlog restored from the warm-restart snapshot
+        self._snapshot_lock = threading.Lock()  # Early (on stop) and final (loop exit) saves
+        self._loop: asyncio.AbstractEventLoop = None
+        self._wakeup: asyncio.Event = None
+        
+        # Throughput counters (reported to the supervisor via on_cycle)
+        self.stats = {
+            "checks": 0,
+            "comments_processed": 0,
+            "keywords_triggered": 0,
+            "ai_replies": 0,
+            "repeat_triggers": 0,
+            "spam_skipped": 0,
+            "template_replies": 0,
+            "shed_comments": 0,
+            "actions_saved": 0,
+            "errors": 0,
+            "last_check": None,
+        }
+        self.on_cycle = None  # Optional callback(stats) after each check
         
         # Setup graceful shutdown (only in main thread)
         if threading.current_thread() is threading.main_thread():
@@ -26,41 +66,75 @@ class InstagramAIBot:
     
     def _shutdown(self, signum, frame):
         """Handle shutdown signals"""
-        print("\n🛑 Bot to'xtatilmoqda...")
+        self.log.info("bot_stopping", "🛑 Bot to'xtatilmoqda...")
+        self.save_snapshot()  # Now: the platform may kill us before the loop exits
+        self.stop()
+    
+    def stop(self):
+        """Stop the main loop (safe to call from any thread or signal handler)"""
         self.running = False
+        if self._loop and self._wakeup:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
     
     def start(self):
         """Start the bot"""
-        print("=" * 50)
-        print("🤖 Instagram Keyword Bot")
-        print("   💬 Kommentariya + 📩 DM")
-        print("=" * 50)
-        
-        # Show keywords
-        print(f"\n🔑 Kalit so'zlar: {', '.join(config.get_keywords())}")
+        if self._prepare():
+            self._main_loop()
+    
+    async def run_async(self, executor=None):
+        """
+        asyncio-native variant of start(): blocking instagrapi/Gemini work runs
+        in `executor` (or the loop's default executor) and idle time is awaited
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
         
-        # Validate configuration
-        if not config.validate():
-            print("\n❌ .env faylini to'g'ri to'ldiring!")
+        if not await self._loop.run_in_executor(executor, self._prepare):
             return
+        if self._wakeup.is_set():
+            self.running = False  # Stopped while starting up
+        
+        while self.running:
+            try:
+                await self._loop.run_in_executor(executor, self._check_comments)
+                delay = 60
+            except Exception as e:
+                self.log.error("loop_error", "❌ Xatolik: {error}", error=str(e))
+                delay = 5
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
         
-        # Initialize AI
-        print("\n🧠 Gemini AI ishga tushmoqda...")
-        self.ai = GeminiAI()
-        print("✅ Gemini AI tayyor!")
+        await self._loop.run_in_executor(executor, self.save_snapshot)
+        self.log.info("bot_stopped", "👋 Bot to'xtadi. Xayr!")
+    
+    def _prepare(self) -> bool:
+        """Initialize dependencies; returns True if the main loop can start"""
+        self.log.info("bot_starting", "🤖 Instagram Keyword Bot (💬 Kommentariya + 📩 DM)")
         
-        # Login to Instagram
-        print("\n📱 Instagram ga ulanmoqda...")
-        if not self.instagram.login():
-            print("❌ Instagram ga kirib bo'lmadi!")
-            return
+        # Initialize DB, Gemini AI and Instagram concurrently
+        self.log.info("warm_up", "🧠 Gemini AI + 📱 Instagram ishga tushmoqda...")
+        if not warm_up():
+            self.log.error("warm_up_failed", "❌ Ishga tushirib bo'lmadi! .env va Instagram loginni tekshiring.")
+            return False
+        
+        self.instagram = get_instagram_handler()
+        self.ai = get_gemini_ai()
+        self.log.info("warm_up_done", "✅ Gemini AI + Instagram tayyor!")
+        self._restore_snapshot()
+        
+        # Show keywords (reloaded live from the content config)
+        keywords = self.account.get_keywords()
+        self.log.info("keywords", "🔑 Kalit so'zlar: {keywords}", keywords=", ".join(keywords))
+        self.account.content_store.start_watcher()
         
         # Start main loop
         self.running = True
-        print(f"\n🚀 Bot ishga tushdi! Har 60 sekundda tekshiriladi.")
-        print("   To'xtatish uchun Ctrl+C bosing.\n")
-        
-        self._main_loop()
+        self.log.info("bot_started",
+                      "🚀 Bot ishga tushdi! Har 60 sekundda tekshiriladi. To'xtatish uchun Ctrl+C bosing.")
+        return True
     
     def _main_loop(self):
         """Main comment processing loop - 1 comment per minute"""
@@ -75,116 +149,354 @@ class InstagramAIBot:
                     time.sleep(1)
                     
             except Exception as e:
-                print(f"❌ Xatolik: {e}")
+                self.log.error("loop_error", "❌ Xatolik: {error}", error=str(e))
                 time.sleep(5)
         
-        print("👋 Bot to'xtadi. Xayr!")
+        self.save_snapshot()
+        self.log.info("bot_stopped", "👋 Bot to'xtadi. Xayr!")
     
     def _check_comments(self):
-        """Check and respond to ONE new comment only"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] 💬 Kommentariya tekshirilmoqda...", end=" ")
-        
+        """Check and respond to new comments (1 per check unless backlogged)"""
+        with tracer.span("check_comments", account=self.account.name) as span:
+            self._check_comments_traced(span)
+    
+    def _check_comments_traced(self, span):
         try:
+            if self._resumed and self._resume_backlog():
+                span.set(resumed=True)
+                return
+            
             posts = self.instagram.get_my_recent_posts(amount=10)
             
             if not posts:
-                print("Post topilmadi.")
+                self.log.info("check_no_posts", "💬 Kommentariya tekshiruvi: post topilmadi.")
+                return
+            
+            if config.QUEUE_MODE:
+                self._enqueue_comments(posts)
+                return
+            
+            # Don't consume comments while replying/DMs are blocked
+            blocked = [f for f in ("comment", "dm", "friendship") if api_guard.is_open(f)]
+            if blocked:
+                self.log.warning("check_paused", "⏸️ API bloklangan ({families}), kutilmoqda.",
+                                 families=", ".join(blocked))
                 return
             
+            # Collect the whole backlog (recent posts first, newest comments first)
+            pending = []
             for post in posts:
-                new_comments = self.instagram.get_new_comments(post)
-                
-                if new_comments:
-                    self._process_comment(post, new_comments[0])
-                    return
+                new_comments = self._drop_spam(self.instagram.get_new_comments(post))
+                pending.extend((post, comment) for comment in new_comments)
             
-            print("Yangi kommentariya yo'q.")
+            self._update_load_tier([comment for _, comment in pending])
+            span.set(posts=len(posts), pending=len(pending), tier=self.load_policy.tier)
+            
+            if not pending:
+                self.log.debug("check_empty", "💬 Yangi kommentariya yo'q.", posts=len(posts))
+                return
+            
+            self.log.info("check_pending", "💬 {pending} ta yangi kommentariya (tier {tier})",
+                          pending=len(pending), tier=self.load_policy.tier, posts=len(posts))
+            
+            for post, comment in pending[:self.load_policy.batch_size]:
+                self._process_comment(post, comment)
+            self.backlog = pending[self.load_policy.batch_size:]
                 
+        except CircuitOpenError as e:
+            span.set(outcome="circuit_open")
+            self.log.warning("circuit_open", "⏸️ {error}", error=str(e), family=e.family)
         except Exception as e:
-            print(f"Xatolik: {e}")
+            self.stats["errors"] += 1
+            self._count("errors")
+            span.set(outcome="error", error=str(e)[:200])
+            self.log.error("check_error", "❌ Kommentariya tekshirishda xatolik: {error}", error=str(e))
+        finally:
+            self.stats["checks"] += 1
+            self.stats["last_check"] = datetime.now().isoformat()
+            if self.on_cycle:
+                self.on_cycle(dict(self.stats))
     
-    # Symbol to keyword mappings (for special characters)
-    SYMBOL_MAPPINGS = {
-        '+': 'plus',
-        '➕': 'plus',
-    }
+    # ==================== Warm restart ====================
+    
+    def save_snapshot(self) -> bool:
+        """Write the warm-restart snapshot (see warm_state.py)"""
+        if not config.WARM_RESTART or not self.instagram:
+            return False
+        # State is captured and written under one lock, so the last write is the newest state
+        with self._snapshot_lock:
+            return self._save_snapshot()
+    
+    def _save_snapshot(self) -> bool:
+        try:
+            state = {
+                **self.instagram.export_state(),
+                "cooldown": self.cooldown.snapshot(),
+                "responses": self.response_cache.snapshot(),
+                # Record fields in __slots__ (= constructor) order
+                "backlog": [[[getattr(post, f) for f in MediaRecord.__slots__],
+                             [getattr(comment, f) for f in CommentRecord.__slots__]]
+                            for post, comment in self.backlog],
+            }
+            return warm_state.save(self.account, state)
+        except Exception as e:
+            self.log.error("warm_state_failed", "❌ Holatni saqlashda xatolik: {error}", error=str(e))
+            return False
+    
+    def _restore_snapshot(self):
+        """Restore caches and the unhandled backlog (the handler restored its ids at warm-up)"""
+        state = warm_state.restore(self.account)
+        if not state:
+            return
+        try:
+            self.cooldown.restore(state.get("cooldown", []))
+            self.response_cache.restore(state.get("responses", []))
+            self._resumed = [(MediaRecord(*post), CommentRecord(*comment))
+                             for post, comment in state.get("backlog", [])]
+        except (TypeError, ValueError) as e:
+            self.log.warning("warm_state_invalid", "⚠️ Snapshot qisman tiklandi: {error}", error=str(e))
+    
+    def _resume_backlog(self) -> bool:
+        """First check after a warm restart: handle the restored backlog before a full comment scan"""
+        resumed = [(post, comment) for post, comment in self._resumed
+                   if comment.pk not in self.instagram.processed_comments]
+        self._resumed = []
+        if not resumed or config.QUEUE_MODE or any(api_guard.is_open(f) for f in ("comment", "dm", "friendship")):
+            return False
+        
+        self.log.info("backlog_resumed", "♻️ Oldingi navbatdagi {pending} ta kommentariya davom ettirilmoqda",
+                      pending=len(resumed))
+        for post, comment in resumed[:self.load_policy.batch_size]:
+            self._process_comment(post, comment)
+        self.backlog = resumed[self.load_policy.batch_size:]
+        return True
+    
+    def _update_load_tier(self, comments: list):
+        """Feed backlog depth and oldest comment age to the degradation policy"""
+        now = time.time()
+        ages = [now - c.created_at for c in comments if c.created_at]
+        self.load_policy.update(len(comments), max(ages) if ages else 0.0)
+    
+    def _drop_spam(self, comments: list) -> list:
+        """Bulk-mark near-duplicate spam clusters processed; return the rest"""
+        if not self.spam_filter or not comments:
+            return comments
+        
+        # Keyword comments are identical by design - only screen AI-bound ones
+        candidates = [c for c in comments if c.text and not self._find_keyword(c.text)]
+        _, spam = self.spam_filter.split(candidates)
+        if not spam:
+            return comments
+        
+        spam_ids = {c.pk for c in spam}
+        self.instagram.mark_comments_processed(list(spam_ids))
+        self.stats["spam_skipped"] += len(spam_ids)
+        self.log.info("spam_skipped", "🧹 {count} ta spam (o'xshash) kommentariya o'tkazib yuborildi",
+                      count=len(spam_ids))
+        return [c for c in comments if c.pk not in spam_ids]
+    
+    def _enqueue_comments(self, posts):
+        """Queue mode: insert all new comments as jobs for comment_queue workers"""
+        db = get_db()
+        queued = 0
+        for post in posts:
+            new_comments = self._drop_spam(self.instagram.get_new_comments(post))
+            queued += db.enqueue_comment_jobs(post, new_comments, self.account.name)
+        self.log.info("jobs_enqueued", "📥 {count} ta yangi job navbatga qo'shildi.", count=queued)
     
     def _find_keyword(self, text: str) -> str:
         """Find which keyword is in the text, return keyword or empty string"""
-        text_lower = text.lower()
-        
-        # First check for symbol mappings
-        for symbol, keyword in self.SYMBOL_MAPPINGS.items():
-            if symbol in text:
-                if keyword in config.get_keywords():
-                    return keyword
+        return self.account.content.find_keyword(text)
+    
+    def _process_comment(self, post, comment) -> bool:
+        """
+        Process a single comment - keyword or AI response
         
-        # Then check regular keywords
-        for keyword in config.get_keywords():
-            if keyword.strip() in text_lower:
-                return keyword
-        return ""
+        Returns:
+            False if a reply or DM could not be sent (the comment is still marked
+            processed; queue workers fail the job so it is retried)
+        """
+        with tracer.span("process_comment", comment_id=comment.pk, media_id=post.id):
+            try:
+                return self._process_comment_traced(post, comment)
+            except Exception:
+                self._count("errors", post)
+                raise
+    
+    def _count(self, metric: str, post=None, keyword: str = ""):
+        """Hourly rollup counter per keyword and post (see stats_rollup.py)"""
+        rollups.record(self.account.name, metric, keyword=keyword, post=post.pk if post else "")
     
-    def _process_comment(self, post, comment):
-        """Process a single comment - keyword or AI response"""
-        username = comment.user.username
-        user_id = comment.user.pk
-        comment_text = comment.text or ""
+    def _process_comment_traced(self, post, comment) -> bool:
+        username = comment.username
+        user_id = comment.user_pk
+        comment_text = comment.text
         
-        print(f"\n   💬 @{username}: {comment_text[:50]}...")
+        self.log.info("comment", "💬 @{username}: {text}...", username=username, text=comment_text[:50],
+                      comment_id=comment.pk)
         
         if not comment_text:
+            self._count("comments_seen", post)
+            tracer.annotate(outcome="empty")
             self.instagram.mark_comment_processed(comment.pk)
-            return
+            return True
         
         # Check for keywords
         matched_keyword = self._find_keyword(comment_text)
+        self._count("comments_seen", post, matched_keyword)
+        tier = self.load_policy.tier
+        tracer.annotate(keyword=matched_keyword or None, tier=tier)
+        sent = True
         if matched_keyword:
-            self._process_keyword_comment(post, comment, username, user_id, matched_keyword)
+            sent = self._process_keyword_comment(post, comment, username, user_id, matched_keyword)
+        elif tier == KEYWORD_ONLY:
+            tracer.annotate(outcome="shed")
+            self.log.info("comment_shed", "⏭️ Yuklama yuqori - faqat kalit so'zlar, o'tkazib yuborildi",
+                          comment_id=comment.pk)
+            self.stats["shed_comments"] += 1
+        elif tier == TEMPLATE:
+            sent = self._reply_template(post, comment, username)
         else:
-            self._process_regular_comment(post, comment, username)
+            sent = self._process_regular_comment(post, comment, username, short=tier == SHORT_AI)
         
         self.instagram.mark_comment_processed(comment.pk)
+        self.stats["comments_processed"] += 1
+        return sent
     
-    def _process_keyword_comment(self, post, comment, username, user_id, keyword: str):
-        """Process keyword-triggered comment - check follow status first"""
-        content_link = config.get_content_link(keyword)
-        print(f"   🔑 Kalit so'z: '{keyword}' → {content_link}")
-        
-        # Check if user is following
-        print(f"   👀 Obuna tekshirilmoqda...")
-        is_following = self.instagram.is_user_following(user_id)
-        
-        if not is_following:
-            # User is NOT following - ask them to follow first
-            print(f"   ❌ Obuna emas - obuna bo'lishni so'rash")
-            reply_text = f"@{username} {config.FOLLOW_FIRST_REPLY}"
-            self.instagram.reply_to_comment(str(post.pk), str(comment.pk), reply_text)
-            print(f"   ✅ Obuna bo'lish so'raldi!")
-        else:
-            # User IS following - send DM with content link
-            print(f"   ✅ Obuna! DM yuborilmoqda...")
+    # API actions of a full keyword trigger: follow check + comment reply + DM
+    KEYWORD_TRIGGER_ACTIONS = 3
+    DM_DELAY = 2  # Seconds between the comment reply and the DM
+    
+    # Delivery steps of a keyword trigger to a follower, recorded as they go out
+    STEP_REPLY = "reply"
+    STEP_DM = "dm"
+    
+    def _process_keyword_comment(self, post, comment, username, user_id, keyword: str) -> bool:
+        """
+        Process keyword-triggered comment - check follow status first; False if a send failed
+        
+        A retry (failed queue job, or a comment left unprocessed by a blocked API)
+        only redoes the delivery steps that didn't go out the first time.
+        """
+        content = self.account.content
+        content_link = content.get_dm_link(keyword)
+        done = self.instagram.completed_steps(comment.pk)
+        
+        if not done:
+            self.stats["keywords_triggered"] += 1
+            self._count("keyword_hits", post, keyword)
+            self.log.info("keyword", "🔑 Kalit so'z: '{keyword}' → {link}", keyword=keyword, link=content_link,
+                          comment_id=comment.pk)
             
-            # 1. Reply to comment
-            reply_text = f"@{username} {config.KEYWORD_REPLY}"
-            self.instagram.reply_to_comment(str(post.pk), str(comment.pk), reply_text)
+            # Repeat trigger inside the cooldown window: acknowledge cheaply or skip
+            previous = self.cooldown.check(user_id, keyword)
+            if previous:
+                self._process_repeat_trigger(post, comment, username, previous)
+                return True
             
-            # 2. Send DM with keyword-specific content link
-            dm_text = f"{config.DM_MESSAGE}\n\n👉 {content_link}"
+            # Check if user is following
+            is_following = self.instagram.is_user_following(user_id)
+            self._count("follow_checks", post, keyword)
+            if is_following:
+                self._count("follow_passed", post, keyword)
             
-            time.sleep(2)  # Small delay before DM
-            self.instagram.send_dm_to_user(user_id, dm_text)
-            print(f"   ✅ Kommentga javob + DM yuborildi!")
+            if not is_following:
+                # User is NOT following - ask them to follow first
+                reply_text = f"@{username} {content.follow_first_reply}"
+                if not self.instagram.reply_to_comment(str(post.pk), str(comment.pk), reply_text):
+                    return False  # No cooldown: the retry must ask again
+                self.cooldown.record(user_id, keyword, FOLLOW_ASKED)
+                tracer.annotate(outcome="follow_asked")
+                self.log.info("follow_asked", "✅ Obuna emas - obuna bo'lish so'raldi!", keyword=keyword,
+                              comment_id=comment.pk)
+                return True
+        else:
+            self.log.info("keyword_resumed", "🔁 Kalit so'z yetkazilishi davom ettirilmoqda ({steps} bajarilgan)",
+                          steps=", ".join(sorted(done)), keyword=keyword, comment_id=comment.pk)
+        
+        # User IS following - reply to the comment, then DM the content link
+        replied = self.STEP_REPLY in done
+        if not replied:
+            reply_text = f"@{username} {content.keyword_reply}"
+            replied = self.instagram.reply_to_comment(str(post.pk), str(comment.pk), reply_text)
+            if replied:
+                # Before the DM: a DM blocked by the API must not resend the reply on retry
+                self.instagram.mark_step_done(comment.pk, self.STEP_REPLY)
+            time.sleep(self.DM_DELAY)  # Small delay before DM
+        
+        if self.STEP_DM not in done:
+            dm_text = f"{content.dm_message}\n\n👉 {content_link}"
+            if not self.instagram.send_dm_to_user(user_id, dm_text):
+                tracer.annotate(outcome="dm_failed")
+                return False
+            self.instagram.mark_step_done(comment.pk, self.STEP_DM)
+            self._count("dms_sent", post, keyword)
+            self.cooldown.record(user_id, keyword, SENT)
+        
+        if not replied:
+            return False
+        tracer.annotate(outcome="dm_sent")
+        self.log.info("keyword_delivered", "✅ Kommentga javob + DM yuborildi!", keyword=keyword,
+                      comment_id=comment.pk)
+        return True
     
-    def _process_regular_comment(self, post, comment, username):
-        """Process regular comment with AI response"""
-        print("   🤔 AI javob tayyorlanmoqda...")
+    def _process_repeat_trigger(self, post, comment, username, previous: str):
+        """Collapse a repeated (user, keyword) trigger into one reply or nothing"""
+        saved = self.KEYWORD_TRIGGER_ACTIONS
+        if previous == SENT and config.TRIGGER_COOLDOWN_MODE == "ack":
+            reply_text = f"@{username} {config.REPEAT_KEYWORD_REPLY}"
+            if self.instagram.reply_to_comment(str(post.pk), str(comment.pk), reply_text):
+                saved -= 1
+            self.log.info("repeat_trigger", "🔁 Takroriy so'rov - qisqa javob berildi", comment_id=comment.pk)
+        else:
+            self.log.info("repeat_trigger", "🔁 Takroriy so'rov - o'tkazib yuborildi", comment_id=comment.pk)
+        
+        self.cooldown.add_saved(saved)
+        tracer.annotate(outcome="repeat")
+        self.stats["repeat_triggers"] += 1
+        self.stats["actions_saved"] += saved
+    
+    def _reply_template(self, post, comment, username) -> bool:
+        """Reply with the fixed template (no AI call)"""
+        self.stats["template_replies"] += 1
+        tracer.annotate(outcome="template")
+        reply_text = f"@{username} {config.TEMPLATE_REPLY}"
+        if self.instagram.reply_to_comment(str(post.pk), str(comment.pk), reply_text):
+            self.log.info("template_reply", "✅ Shablon javob yuborildi!", comment_id=comment.pk)
+            return True
+        return False
+    
+    def _process_regular_comment(self, post, comment, username, short: bool = False) -> bool:
+        """
+        Process regular comment with AI response
         
-        ai_response = self.ai.generate_response(
-            comment.text,
-            context="Instagram postidagi kommentariya. Qisqa javob bering."
-        )
+        With `short` (backlog tier short_ai) a cached reply for the same text is
+        reused, and if Gemini would make us wait the template is sent instead.
+        Only replies generated without conversation history are cached: one built
+        on a user's earlier turns must never be reused for someone else.
+        """
+        personal = self.ai.has_history(comment.user_pk)
+        if short:
+            ai_response = self.response_cache.get(comment.text)
+            if ai_response is None and self.ai.seconds_until_ready() > 0:
+                return self._reply_template(post, comment, username)
+        else:
+            ai_response = None
+        
+        if ai_response is None:
+            self.stats["ai_replies"] += 1
+            self._count("ai_calls", post)
+            ai_response = self.ai.generate_response(
+                comment.text,
+                context="Instagram postidagi kommentariya. "
+                        + ("Juda qisqa, bir gapda javob bering." if short else "Qisqa javob bering."),
+                max_retries=1 if short else 5,
+                conversation_id=comment.user_pk
+            )
+            if not personal:
+                self.response_cache.put(comment.text, ai_response)
+        else:
+            self.log.debug("ai_cache_hit", "♻️ Keshdagi AI javob ishlatildi", comment_id=comment.pk)
         
         response = f"@{username} {ai_response}"
         
@@ -192,7 +504,11 @@ class InstagramAIBot:
             response = response[:1997] + "..."
         
         if self.instagram.reply_to_comment(str(post.pk), str(comment.pk), response):
-            print(f"   ✅ AI javob yuborildi!")
+            tracer.annotate(outcome="ai_reply")
+            self.log.info("ai_reply", "✅ AI javob yuborildi!", comment_id=comment.pk)
+            return True
+        tracer.annotate(outcome="reply_failed")
+        return False
 
 
 def main():
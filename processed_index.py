@@ -0,0 +1,62 @@
+"""
+Time-bounded in-memory index of processed comment ids
+Replaces an ever-growing set: ids are kept in insertion order with the time
+they were added, and prune() drops the ones older than the window in O(dropped).
+Anything older is answered by the DB (Database.find_processed_comments)
+"""
+import threading
+import time
+from typing import Iterable, Iterator
+
+
+class ProcessedIndex:
+    """Set-like (`in`, add, update, len, iter) with time-based eviction"""
+
+    def __init__(self, window_seconds: float):
+        self.window = window_seconds
+        self._ids = {}  # comment id -> added at (insertion ordered)
+        self._lock = threading.Lock()  # Writers vs. the background pruner
+
+    def __contains__(self, comment_id) -> bool:
+        return str(comment_id) in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._ids))
+
+    def add(self, comment_id, at: float = None):
+        with self._lock:
+            self._ids.setdefault(str(comment_id), at or time.time())
+
+    def update(self, comment_ids: Iterable, at: float = None):
+        at = at or time.time()
+        with self._lock:
+            for comment_id in comment_ids:
+                self._ids.setdefault(str(comment_id), at)
+
+    def snapshot(self) -> list:
+        """[[id, added_at], ...] oldest first (warm-restart snapshot)"""
+        with self._lock:
+            return [[comment_id, added_at] for comment_id, added_at in self._ids.items()]
+
+    def restore(self, entries: list):
+        """Load snapshot() entries, keeping their times and order"""
+        with self._lock:
+            for comment_id, added_at in sorted(entries, key=lambda entry: entry[1]):
+                self._ids.setdefault(str(comment_id), float(added_at))
+
+    def prune(self, now: float = None) -> int:
+        """Drop ids added before the window; returns how many were dropped"""
+        cutoff = (now or time.time()) - self.window
+        with self._lock:
+            stale = []
+            for comment_id, added_at in self._ids.items():
+                if added_at >= cutoff:
+                    break  # Insertion order = time order
+                stale.append(comment_id)
+            for comment_id in stale:
+                del self._ids[comment_id]
+        return len(stale)
@@ -0,0 +1,71 @@
+"""
+Compact comment/media records used by the comment pipeline
+Built straight from raw Instagram private API JSON instead of instagrapi models
+"""
+from typing import Optional
+
+
+class MediaRecord:
+    """Minimal media (post) record: only the fields the pipeline uses"""
+
+    __slots__ = ("pk", "id", "comment_count")
+
+    def __init__(self, pk: str, id: str, comment_count: int = 0):
+        self.pk = pk
+        self.id = id
+        self.comment_count = comment_count
+
+    @classmethod
+    def from_raw(cls, data: dict) -> "MediaRecord":
+        """Build a record from a raw `feed/user/` item"""
+        pk = str(data["pk"])
+        return cls(
+            pk=pk,
+            id=str(data.get("id") or pk),
+            comment_count=int(data.get("comment_count") or 0),
+        )
+
+    def __repr__(self):
+        return f"MediaRecord(pk={self.pk!r}, id={self.id!r})"
+
+
+class CommentRecord:
+    """Minimal comment record: pk, text, author and the media it belongs to"""
+
+    __slots__ = ("pk", "text", "user_pk", "username", "media_id", "created_at")
+
+    def __init__(self, pk: str, text: str, user_pk: str, username: str, media_id: str, created_at: int = 0):
+        self.pk = pk
+        self.text = text
+        self.user_pk = user_pk
+        self.username = username
+        self.media_id = media_id
+        self.created_at = created_at  # Unix seconds (0 if unknown)
+
+    @classmethod
+    def from_raw(cls, data: dict, media_id: str) -> "CommentRecord":
+        """Build a record from a raw `media/{id}/comments/` item"""
+        user = data.get("user") or {}
+        return cls(
+            pk=str(data["pk"]),
+            text=data.get("text") or "",
+            user_pk=str(user.get("pk") or data.get("user_id") or ""),
+            username=user.get("username") or "",
+            media_id=str(media_id),
+            created_at=comment_created_at(data),
+        )
+
+    def __repr__(self):
+        return f"CommentRecord(pk={self.pk!r}, username={self.username!r})"
+
+
+def comment_user_pk(data: dict) -> Optional[str]:
+    """Read the author pk from a raw comment without building a record"""
+    user = data.get("user") or {}
+    pk = user.get("pk") or data.get("user_id")
+    return str(pk) if pk is not None else None
+
+
+def comment_created_at(data: dict) -> int:
+    """Unix seconds of a raw comment (0 if unknown)"""
+    return int(data.get("created_at_utc") or data.get("created_at") or 0)
@@ -1,28 +1,10 @@
 """
 Combined runner for both Instagram and Telegram bots
 Use this for Render.com deployment
+Both bots share one asyncio event loop (see async_runtime.py); with
+DATABASE_URL set, extra copies of this runner wait as hot standbys
 """
 import threading
-import time
-import sys
-
-
-def run_instagram_bot():
-    """Run the Instagram comment bot"""
-    try:
-        from main import main as instagram_main
-        instagram_main()
-    except Exception as e:
-        print(f"❌ Instagram bot xatosi: {e}")
-
-
-def run_telegram_bot():
-    """Run the Telegram subscription bot"""
-    try:
-        from telegram_bot import main as telegram_main
-        telegram_main()
-    except Exception as e:
-        print(f"❌ Telegram bot xatosi: {e}")
 
 
 def main():
@@ -30,17 +12,32 @@ def main():
     print("🤖 Instagram + Telegram Bot Runner")
     print("=" * 50)
     
-    # Start Instagram bot in a thread
-    instagram_thread = threading.Thread(target=run_instagram_bot, daemon=True)
-    instagram_thread.start()
-    print("✅ Instagram bot ishga tushdi")
+    from async_runtime import main as runtime_main, request_stop, clear_stop_request
+    from leader import LeaderElector
+    
+    elector = LeaderElector()
+    lost = threading.Event()
     
-    # Small delay before starting Telegram bot
-    time.sleep(2)
+    def on_demoted():
+        lost.set()
+        request_stop()
     
-    # Start Telegram bot in main thread (it has its own event loop)
-    print("✅ Telegram bot ishga tushdi")
-    run_telegram_bot()
+    while True:
+        # Wait (as a standby) until this process holds the leader lock
+        while not elector.try_acquire():
+            threading.Event().wait(elector.heartbeat_interval)
+        
+        lost.clear()
+        clear_stop_request()
+        heartbeat = threading.Thread(target=elector.keep_alive, args=(on_demoted,), daemon=True)
+        heartbeat.start()
+        runtime_main()
+        
+        if not lost.is_set():
+            # Normal shutdown (SIGINT/SIGTERM): hand leadership over
+            elector.stop()
+            heartbeat.join(timeout=elector.heartbeat_interval + 1)
+            break
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+"""
+Streaming near-duplicate comment detector (SimHash + banded LSH)
+Bot rings post thousands of near-identical comments; each comment gets a 64-bit
+SimHash, candidates are found through a banded LSH index over a sliding time
+window, and comments whose cluster grows past a threshold are treated as spam
+"""
+import hashlib
+import re
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from config import config
+
+SIMHASH_BITS = 64
+
+_DIGITS = re.compile(r"\d+")
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, fold numbers and punctuation, collapse whitespace"""
+    text = _DIGITS.sub("0", text.lower())
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class SimHasher:
+    """64-bit SimHash over character trigrams with a bounded feature cache"""
+
+    def __init__(self, max_cache: int = 200_000):
+        self.max_cache = max_cache
+        self._vectors: Dict[str, Tuple[int, ...]] = {}
+
+    def _vector(self, feature: str) -> Tuple[int, ...]:
+        vector = self._vectors.get(feature)
+        if vector is None:
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+            vector = tuple(1 if (h >> bit) & 1 else -1 for bit in range(SIMHASH_BITS))
+            if len(self._vectors) >= self.max_cache:
+                self._vectors.clear()
+            self._vectors[feature] = vector
+        return vector
+
+    def signature(self, text: str) -> int:
+        text = f" {text} "
+        features = {text[i:i + 3] for i in range(len(text) - 2)}
+        # Per-bit sums across all feature vectors, computed column-wise in C
+        totals = map(sum, zip(*(self._vector(f) for f in features)))
+        signature = 0
+        for bit, total in enumerate(totals):
+            if total > 0:
+                signature |= 1 << bit
+        return signature
+
+
+class NearDuplicateIndex:
+    """
+    Sliding-window SimHash index with banded LSH candidate lookup
+
+    With `bands` bands over 64 bits, any two signatures within Hamming distance
+    `bands - 1` share at least one identical band (pigeonhole), so band buckets
+    find every near-duplicate without comparing against the whole window.
+    """
+
+    def __init__(self, window: int = None, max_distance: int = None, max_entries: int = None):
+        self.window = window or config.SPAM_WINDOW
+        self.max_distance = max_distance if max_distance is not None else config.SPAM_MAX_DISTANCE
+        self.max_entries = max_entries or config.SPAM_MAX_ENTRIES
+        self.bands = self.max_distance + 1
+        self.band_bits = SIMHASH_BITS // self.bands
+        self.band_mask = (1 << self.band_bits) - 1
+        self.hasher = SimHasher()
+
+        # entry = (timestamp, comment_id, signature, cluster_id)
+        self._entries: deque = deque()
+        self._buckets: List[Dict[int, deque]] = [{} for _ in range(self.bands)]
+        self._clusters: Dict[int, int] = {}  # cluster_id -> live size
+        self._by_comment: Dict[str, tuple] = {}
+        self._next_cluster = 0
+
+    def _band_keys(self, signature: int):
+        for band in range(self.bands):
+            yield band, (signature >> (band * self.band_bits)) & self.band_mask
+
+    def _evict(self, now: float):
+        while self._entries and (now - self._entries[0][0] > self.window or len(self._entries) > self.max_entries):
+            entry = self._entries.popleft()
+            for band, key in self._band_keys(entry[2]):
+                # Buckets are filled and evicted in arrival order: the oldest is first
+                bucket = self._buckets[band].get(key)
+                if bucket:
+                    bucket.popleft()
+                    if not bucket:
+                        del self._buckets[band][key]
+            self._clusters[entry[3]] -= 1
+            if not self._clusters[entry[3]]:
+                del self._clusters[entry[3]]
+            self._by_comment.pop(entry[1], None)
+
+    def add(self, comment_id: str, text: str, timestamp: float = None) -> int:
+        """
+        Index a comment (idempotent per comment id)
+
+        Returns:
+            Cluster id of the comment
+        """
+        known = self._by_comment.get(comment_id)
+        if known is not None:
+            return known[3]
+
+        now = timestamp if timestamp is not None else time.time()
+        self._evict(now)
+        signature = self.hasher.signature(normalize_text(text))
+
+        cluster_id = None
+        for band, key in self._band_keys(signature):
+            for entry in self._buckets[band].get(key, ()):
+                if bin(entry[2] ^ signature).count("1") <= self.max_distance:
+                    cluster_id = entry[3]
+                    break
+            if cluster_id is not None:
+                break
+        if cluster_id is None:
+            cluster_id = self._next_cluster
+            self._next_cluster += 1
+
+        entry = (now, comment_id, signature, cluster_id)
+        self._entries.append(entry)
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, deque()).append(entry)
+        self._clusters[cluster_id] = self._clusters.get(cluster_id, 0) + 1
+        self._by_comment[comment_id] = entry
+        return cluster_id
+
+    def cluster_size(self, cluster_id: int) -> int:
+        return self._clusters.get(cluster_id, 0)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SpamFilter:
+    """Flags comments that belong to large near-duplicate clusters"""
+
+    def __init__(self, threshold: int = None, min_chars: int = None, index: NearDuplicateIndex = None):
+        self.threshold = threshold or config.SPAM_CLUSTER_THRESHOLD
+        self.min_chars = min_chars if min_chars is not None else config.SPAM_MIN_CHARS
+        self.index = index or NearDuplicateIndex()
+        self.flagged = 0
+
+    def split(self, comments: list, timestamp: Optional[float] = None) -> Tuple[list, list]:
+        """
+        Index a batch and split it into (clean, spam)
+
+        Short comments (e.g. bare keywords like "pdf") are never indexed:
+        legitimate users post those identically all the time.
+        """
+        clusters = []
+        for comment in comments:
+            if len(comment.text) < self.min_chars:
+                clusters.append(None)
+            else:
+                clusters.append(self.index.add(comment.pk, comment.text, timestamp))
+
+        clean, spam = [], []
+        for comment, cluster_id in zip(comments, clusters):
+            if cluster_id is not None and self.index.cluster_size(cluster_id) >= self.threshold:
+                spam.append(comment)
+            else:
+                clean.append(comment)
+        self.flagged += len(spam)
+        return clean, spam
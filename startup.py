@@ -0,0 +1,112 @@
+"""
+Lazy, parallel startup of the bot dependencies
+Independent init steps (DB connect, Gemini setup, Instagram session restore)
+run concurrently; per-step timings are kept for the web health endpoints
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import config
+from accounts import get_current_account
+from logger import log
+
+
+# Global startup status (read by web_server.py)
+startup_status = {
+    "state": "pending",  # pending -> warming -> ready / failed
+    "started_at": None,
+    "ready_at": None,
+    "total_seconds": None,
+    "timings": {},  # step name -> seconds
+    "errors": {},  # step name -> error message
+}
+
+_warm_up_lock = threading.Lock()
+
+
+def _timed(name: str, func, *args):
+    """Run a startup step and record how long it took"""
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    except Exception as e:
+        startup_status["errors"][name] = str(e)
+        raise
+    finally:
+        startup_status["timings"][name] = round(time.perf_counter() - started, 3)
+
+
+def _connect_db():
+    from database import get_db
+    return get_db()
+
+
+def _setup_gemini():
+    from gemini_ai import get_gemini_ai
+    return get_gemini_ai()
+
+
+def _create_instagram_handler():
+    from instagram_handler import get_instagram_handler
+    return get_instagram_handler()
+
+
+def warm_up() -> bool:
+    """
+    Initialize DB, Gemini and Instagram concurrently (idempotent)
+
+    Returns:
+        True if Instagram is logged in and the bot can start
+    """
+    with _warm_up_lock:
+        if startup_status["state"] == "ready":
+            return True
+
+        startup_status["state"] = "warming"
+        startup_status["started_at"] = datetime.now().isoformat()
+        startup_status["errors"] = {}
+        started = time.perf_counter()
+
+        account = get_current_account()
+        has_credentials = bool(account.username and account.password)
+        if not has_credentials:
+            log.error("missing_credentials", "❌ '{account}' account uchun login/parol kiritilmagan", account=account.name)
+        if not config.validate(require_instagram=False) or not has_credentials:
+            startup_status["state"] = "failed"
+            startup_status["errors"]["config"] = "invalid configuration"
+            return False
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as pool:
+            db_future = pool.submit(_timed, "database", _connect_db)
+            ai_future = pool.submit(_timed, "gemini", _setup_gemini)
+            handler_future = pool.submit(_timed, "instagram_import", _create_instagram_handler)
+
+            logged_in = False
+            try:
+                handler = handler_future.result()
+                # Session restore and processed-id load both need the DB
+                try:
+                    db_future.result()
+                except Exception:
+                    pass  # Handler falls back to env/file sessions
+                state_future = pool.submit(_timed, "processed_comments", handler.load_processed_comments)
+                if not handler.logged_in:
+                    logged_in = _timed("instagram_login", handler.login)
+                else:
+                    logged_in = True
+                state_future.result()
+                ai_future.result()
+            except Exception as e:
+                log.error("startup_failed", "❌ Ishga tushirishda xatolik: {error}", error=str(e))
+                logged_in = False
+
+        startup_status["total_seconds"] = round(time.perf_counter() - started, 3)
+        startup_status["state"] = "ready" if logged_in else "failed"
+        if logged_in:
+            startup_status["ready_at"] = datetime.now().isoformat()
+
+        timings = ", ".join(f"{k}={v}s" for k, v in startup_status["timings"].items())
+        log.info("startup_done", "⏱️ Ishga tushish: {seconds}s ({timings})",
+                 seconds=startup_status['total_seconds'], timings=timings)
+        return logged_in
@@ -0,0 +1,146 @@
+"""
+Hourly rollups of comment pipeline events per keyword and per post
+The bot calls rollups.record(...) on the hot path (one dict update under a
+lock); a background thread adds the per-hour deltas to stats_hourly every
+STATS_FLUSH_INTERVAL seconds. Range queries (GET /stats/hourly) read those
+precomputed rows - a month of hourly rows per keyword is a few hundred rows,
+never a scan of processed_comments. The last STATS_MEMORY_HOURS are also kept
+in memory, so the endpoint still answers without a DB
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from config import config
+from database import get_db
+
+# Counters per (hour, account, dimension, key)
+METRICS = ("comments_seen", "keyword_hits", "follow_checks", "follow_passed", "dms_sent", "ai_calls", "errors")
+_INDEX = {metric: i for i, metric in enumerate(METRICS)}
+
+# Dimensions: every event counts in "total", plus its keyword and post when known
+TOTAL = "total"
+KEYWORD = "keyword"
+POST = "post"
+DIMENSIONS = (TOTAL, KEYWORD, POST)
+
+HOUR = 3600
+DAY = 86400
+
+
+def hour_start(at: float) -> int:
+    return int(at // HOUR * HOUR)
+
+
+def iso_utc(at: float) -> str:
+    return datetime.fromtimestamp(at, timezone.utc).isoformat()
+
+
+def with_rates(row: dict) -> dict:
+    """Add follow_pass_rate (passed / checked) to a counters row"""
+    checks = row.get("follow_checks", 0)
+    row["follow_pass_rate"] = round(row.get("follow_passed", 0) / checks, 3) if checks else None
+    return row
+
+
+class HourlyRollups:
+    """In-memory hourly counters; deltas are flushed to the DB in the background"""
+
+    def __init__(self, flush_interval: float = None, memory_hours: int = None):
+        self.flush_interval = flush_interval or config.STATS_FLUSH_INTERVAL
+        self.memory_hours = memory_hours or config.STATS_MEMORY_HOURS
+        self._buckets = {}  # (hour, account, dimension, key) -> [count per metric], recent hours
+        self._pending = {}  # Same shape: not yet written to the DB
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time; queries never see a half-done one
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, account: str, metric: str, keyword: str = "", post: str = "", amount: int = 1,
+               at: float = None):
+        """Count one event of `metric` (see METRICS)"""
+        index = _INDEX[metric]
+        hour = hour_start(at or time.time())
+        with self._lock:
+            for dimension, key in ((TOTAL, ""), (KEYWORD, keyword), (POST, post)):
+                if dimension != TOTAL and not key:
+                    continue
+                bucket = (hour, account, dimension, key)
+                for counters in (self._buckets, self._pending):
+                    row = counters.get(bucket)
+                    if row is None:
+                        row = counters[bucket] = [0] * len(METRICS)
+                    row[index] += amount
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="stats-rollup")
+                self._thread.start()
+
+    def flush(self):
+        """Write pending deltas; they are kept for the next try if the DB fails"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            db = get_db()
+            if not db.enabled or db.add_hourly_stats(pending):
+                return
+            with self._lock:
+                for bucket, row in pending.items():
+                    merged = self._pending.setdefault(bucket, [0] * len(METRICS))
+                    for i, count in enumerate(row):
+                        merged[i] += count
+
+    def _trim(self):
+        oldest = hour_start(time.time()) - self.memory_hours * HOUR
+        with self._lock:
+            for bucket in [b for b in self._buckets if b[0] < oldest]:
+                del self._buckets[bucket]
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            self._trim()
+
+    def query(self, start: float, end: float, dimension: str = TOTAL, key: str = None, account: str = None,
+              bucket: str = "hour") -> list:
+        """
+        Counter rows of the hours overlapping [start, end) from the precomputed rollups
+
+        Args:
+            dimension: total | keyword | post
+            key: only this keyword / post pk
+            account: only this account (default: all accounts summed)
+            bucket: hour | day (UTC)
+        """
+        step = DAY if bucket == "day" else HOUR
+        db = get_db()
+        # Waits for a running flush: its deltas are then either in the DB rows or back in _pending
+        with self._flush_lock:
+            with self._lock:
+                # With a DB only the unflushed deltas are added on top of its rows
+                source = self._pending if db.enabled else self._buckets
+                rows = [(hour, acct, k, list(counts)) for (hour, acct, dim, k), counts in source.items()
+                        if dim == dimension]
+            if db.enabled:
+                rows += db.get_hourly_stats(start, end, dimension, key, account)
+
+        result = {}
+        for hour, acct, k, counts in rows:
+            if not start - HOUR < hour < end or (key is not None and k != key) or (account and acct != account):
+                continue
+            period = hour // step * step
+            row = result.get((period, k))
+            if row is None:
+                row = result[(period, k)] = [0] * len(METRICS)
+            for i, count in enumerate(counts):
+                row[i] += count
+        return [with_rates({"time": iso_utc(period), "key": k, **dict(zip(METRICS, counts))})
+                for (period, k), counts in sorted(result.items())]
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"buckets": len(self._buckets), "pending": len(self._pending)}
+
+
+rollups = HourlyRollups()
@@ -0,0 +1,99 @@
+"""
+TTL cache of Telegram channel subscription status
+Positive results live long; negative ones expire quickly, and a user pressing
+"✅ Obuna bo'ldim" may bypass a stale negative entry (rate-limited per user).
+Concurrent checks for the same user share one get_chat_member call
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict
+from config import config
+
+
+class SubscriptionCache:
+    """user_id -> (subscribed, expires_at, checked_at) with LRU bound and single-flight"""
+
+    def __init__(self, ttl: float = None, negative_ttl: float = None,
+                 recheck_interval: float = None, max_entries: int = None):
+        self.ttl = config.TELEGRAM_SUB_CACHE_TTL if ttl is None else ttl
+        self.negative_ttl = config.TELEGRAM_SUB_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.recheck_interval = config.TELEGRAM_SUB_RECHECK_INTERVAL if recheck_interval is None else recheck_interval
+        self.max_entries = max_entries or config.TELEGRAM_SUB_CACHE_MAX
+        self._entries = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def set(self, user_id: int, subscribed: bool):
+        """Store a known status (also used by chat_member updates)"""
+        now = time.time()
+        ttl = self.ttl if subscribed else self.negative_ttl
+        self._entries[user_id] = (subscribed, now + ttl, now)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def _cached(self, user_id: int, fresh: bool):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        subscribed, expires_at, checked_at = entry
+        now = time.time()
+        if now >= expires_at:
+            return None
+        # "Just subscribed": a negative entry is re-checked on request, but not
+        # more often than recheck_interval so button mashing stays cheap
+        if fresh and not subscribed and now - checked_at >= self.recheck_interval:
+            return None
+        return subscribed
+
+    async def is_subscribed(self, user_id: int, fetch: Callable[[], Awaitable[bool]], fresh: bool = False) -> bool:
+        """
+        Cached subscription status, calling `fetch` on a miss
+
+        Args:
+            user_id: Telegram user id
+            fetch: Coroutine factory doing the real get_chat_member check;
+                exceptions propagate and are not cached
+            fresh: The user says they just subscribed (bypass negative entry)
+        """
+        cached = self._cached(user_id, fresh)
+        if cached is not None:
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return cached
+
+        pending = self._inflight.get(user_id)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            subscribed = await fetch()
+            self.set(user_id, subscribed)
+            future.set_result(subscribed)
+            return subscribed
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[user_id]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / total, 3) if total else 0.0,
+        }
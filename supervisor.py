@@ -0,0 +1,156 @@
+"""
+Multi-account supervisor: one isolated worker process per Instagram account
+Run: python supervisor.py  (accounts from ACCOUNTS_FILE / ACCOUNTS, see accounts.py)
+All workers share the same Postgres DB (state namespaced per account) and a
+cross-process Gemini rate limit; per-account health and throughput are reported
+"""
+import multiprocessing as mp
+import queue
+import signal
+import time
+from datetime import datetime
+from typing import Dict, List
+from config import config
+from accounts import Account, load_accounts
+from logger import log
+
+
+def _account_worker(account: Account, reports, ai_lock, ai_last_request):
+    """Worker process entry: run InstagramAIBot for a single account"""
+    from accounts import set_current_account
+    from gemini_ai import GeminiAI
+    from main import InstagramAIBot
+
+    set_current_account(account)
+    GeminiAI.set_shared_rate_limit(ai_lock, ai_last_request, config.AI_GLOBAL_MIN_INTERVAL)
+
+    bot = InstagramAIBot(account)
+    bot.on_cycle = lambda stats: reports.put((account.name, stats))
+    bot.start()
+
+
+class AccountSupervisor:
+    """Starts, monitors and restarts one worker process per account"""
+
+    MAX_RESTART_DELAY = 300
+
+    def __init__(self, accounts: List[Account]):
+        # spawn: every worker gets a clean interpreter (no inherited sockets/clients)
+        self.ctx = mp.get_context("spawn")
+        self.accounts = {a.name: a for a in accounts}
+        self.reports = self.ctx.Queue()
+        self.ai_lock = self.ctx.Lock()
+        self.ai_last_request = self.ctx.Value('d', 0.0)
+        self.processes: Dict[str, mp.Process] = {}
+        self.health: Dict[str, dict] = {
+            name: {"state": "starting", "restarts": 0, "stats": {}, "comments_per_min": 0.0}
+            for name in self.accounts
+        }
+        self._next_start: Dict[str, float] = {name: 0.0 for name in self.accounts}
+        self._rate_base: Dict[str, tuple] = {}
+        self.running = False
+
+    def _spawn(self, name: str):
+        process = self.ctx.Process(
+            target=_account_worker,
+            args=(self.accounts[name], self.reports, self.ai_lock, self.ai_last_request),
+            name=f"account-{name}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[name] = process
+        self.health[name]["state"] = "running"
+        self.health[name]["pid"] = process.pid
+        self.health[name]["started_at"] = datetime.now().isoformat()
+        log.info("worker_started", "🚀 [{account}] worker ishga tushdi (pid {pid})", account=name, pid=process.pid)
+
+    def _drain_reports(self):
+        """Apply stats reported by the workers and update throughput"""
+        while True:
+            try:
+                name, stats = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            now = time.time()
+            health = self.health[name]
+            health["stats"] = stats
+            base = self._rate_base.get(name)
+            if base is None or stats["comments_processed"] < base[1]:
+                self._rate_base[name] = (now, stats["comments_processed"])
+            elif now - base[0] >= 60:
+                elapsed_min = (now - base[0]) / 60
+                health["comments_per_min"] = round((stats["comments_processed"] - base[1]) / elapsed_min, 2)
+                self._rate_base[name] = (now, stats["comments_processed"])
+
+    def _check_processes(self):
+        """Restart dead workers with exponential backoff"""
+        now = time.time()
+        for name in self.accounts:
+            process = self.processes.get(name)
+            if process is not None and process.is_alive():
+                continue
+            health = self.health[name]
+            if process is not None and health["state"] == "running":
+                health["restarts"] += 1
+                delay = min(2 ** health["restarts"], self.MAX_RESTART_DELAY)
+                self._next_start[name] = now + delay
+                health["state"] = f"restarting in {delay}s (exit {process.exitcode})"
+                self._rate_base.pop(name, None)
+                log.warning("worker_exited", "⚠️ [{account}] worker to'xtadi (exit {exitcode}), {delay}s dan keyin qayta",
+                            account=name, exitcode=process.exitcode, delay=delay)
+            if now >= self._next_start[name]:
+                self._spawn(name)
+
+    def status(self) -> dict:
+        """Per-account health and throughput"""
+        return {name: dict(health) for name, health in self.health.items()}
+
+    def print_status(self):
+        for name, health in self.health.items():
+            stats = health["stats"]
+            log.info("account_status",
+                     "📊 {account:<16} {state:<12} {processed:>6} ta comment  {per_min:>6}/min  "
+                     "xato: {errors}  qayta: {restarts}",
+                     account=name, state=health['state'], processed=stats.get('comments_processed', 0),
+                     per_min=health['comments_per_min'], errors=stats.get('errors', 0),
+                     restarts=health['restarts'])
+
+    def run(self):
+        """Supervise workers until stop() is called"""
+        self.running = True
+        last_status = time.time()
+        while self.running:
+            self._drain_reports()
+            self._check_processes()
+            if time.time() - last_status >= config.SUPERVISOR_STATUS_INTERVAL:
+                self.print_status()
+                last_status = time.time()
+            time.sleep(1)
+        self._shutdown_workers()
+
+    def stop(self):
+        self.running = False
+
+    def _shutdown_workers(self):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM -> graceful bot shutdown
+        for process in self.processes.values():
+            process.join(timeout=10)
+        log.info("supervisor_stopped", "👋 Supervisor to'xtadi")
+
+
+def main():
+    accounts = load_accounts()
+    print("=" * 50)
+    print(f"🤖 Multi-account supervisor: {len(accounts)} ta account")
+    print("=" * 50)
+
+    supervisor = AccountSupervisor(accounts)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: supervisor.stop())
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,69 +3,134 @@ Telegram Bot for subscription verification
 Run separately: python telegram_bot.py
 """
 import asyncio
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+from typing import Optional
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ChatMember
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ChatMemberHandler, ContextTypes
+from accounts import get_current_account
+from broadcast import subscriber_recorder
 from config import config
+from deep_links import decode_payload, conversion_counters, OPENED, DELIVERED, ASKED, CONVERTED
+from logger import log
+from subscription_cache import SubscriptionCache
+
+SUBSCRIBED_STATUSES = (ChatMember.MEMBER, ChatMember.ADMINISTRATOR, ChatMember.OWNER)
+CHECK_SUBSCRIPTION = "check_subscription"
 
 
 class TelegramSubscriptionBot:
     """Telegram bot for checking channel subscription and providing content"""
     
-    def __init__(self):
+    # Prebuilt keyboards per keyword / content link (bounded: reset when huge)
+    MAX_CACHED_MARKUPS = 1000
+    
+    def __init__(self, subscription_cache: SubscriptionCache = None):
         self.token = config.TELEGRAM_BOT_TOKEN
         self.channel = config.TELEGRAM_CHANNEL
         self.content_link = config.TELEGRAM_CONTENT_LINK
+        self.subscriptions = subscription_cache or SubscriptionCache()
+        
+        # Keyboards are immutable: built once per keyword / link and reused
+        self._subscribe_markups = {}
+        self._content_markups = {}
+    
+    def _subscribe_markup(self, keyword: Optional[str]) -> InlineKeyboardMarkup:
+        markup = self._subscribe_markups.get(keyword)
+        if markup is None:
+            # callback_data is limited to 64 bytes; long keywords fall back to the generic button
+            callback_data = f"{CHECK_SUBSCRIPTION}:{keyword}" if keyword else CHECK_SUBSCRIPTION
+            if len(callback_data.encode()) > 64:
+                callback_data = CHECK_SUBSCRIPTION
+            markup = InlineKeyboardMarkup([
+                [InlineKeyboardButton("📢 Kanalga qo'shilish", url=f"https://t.me/{self.channel.replace('@', '')}")],
+                [InlineKeyboardButton("✅ Obuna bo'ldim", callback_data=callback_data)]
+            ])
+            if len(self._subscribe_markups) >= self.MAX_CACHED_MARKUPS:
+                self._subscribe_markups.clear()
+            self._subscribe_markups[keyword] = markup
+        return markup
+    
+    def _content_markup(self, link: str) -> InlineKeyboardMarkup:
+        markup = self._content_markups.get(link)
+        if markup is None:
+            markup = InlineKeyboardMarkup([
+                [InlineKeyboardButton("🎁 Kontentni olish", url=link)]
+            ])
+            if len(self._content_markups) >= self.MAX_CACHED_MARKUPS:
+                self._content_markups.clear()
+            self._content_markups[link] = markup
+        return markup
+    
+    def _resolve_keyword(self, keyword: Optional[str]) -> Optional[str]:
+        """Keep a deep-link keyword only if it still has a Telegram asset"""
+        if keyword and keyword in get_current_account().content.telegram_content:
+            return keyword
+        return None
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /start command"""
+        """Handle /start command (optionally /start <signed keyword payload>)"""
         user = update.effective_user
+        keyword = self._resolve_keyword(decode_payload(context.args[0]) if context.args else None)
+        if keyword:
+            conversion_counters.record(keyword, OPENED)
+        subscriber_recorder.record(user.id, keyword)
         
-        # Check subscription
+        # Check subscription (cached) and answer with one message either way
         is_subscribed = await self._check_subscription(update, context, user.id)
         
         if is_subscribed:
-            await self._send_content(update)
+            await self._send_content(update, keyword)
+            if keyword:
+                conversion_counters.record(keyword, DELIVERED)
         else:
-            await self._ask_subscription(update)
+            await self._ask_subscription(update, keyword)
+            if keyword:
+                conversion_counters.record(keyword, ASKED)
     
-    async def _check_subscription(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int) -> bool:
-        """Check if user is subscribed to the channel"""
-        try:
+    async def _check_subscription(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int,
+                                  fresh: bool = False) -> bool:
+        """Check if user is subscribed to the channel (cached, see SubscriptionCache)"""
+        async def fetch() -> bool:
             member = await context.bot.get_chat_member(chat_id=self.channel, user_id=user_id)
-            return member.status in ['member', 'administrator', 'creator']
+            return member.status in SUBSCRIBED_STATUSES
+        
+        try:
+            return await self.subscriptions.is_subscribed(user_id, fetch, fresh=fresh)
         except Exception as e:
-            print(f"Obunani tekshirishda xatolik: {e}")
+            log.warning("subscription_check_failed", "⚠️ Obunani tekshirishda xatolik: {error}", error=str(e),
+                        user_id=user_id)
             return False
     
-    async def _ask_subscription(self, update: Update):
-        """Ask user to subscribe first"""
-        keyboard = [
-            [InlineKeyboardButton("📢 Kanalga qo'shilish", url=f"https://t.me/{self.channel.replace('@', '')}")],
-            [InlineKeyboardButton("✅ Obuna bo'ldim", callback_data="check_subscription")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
+    def _is_channel(self, chat) -> bool:
+        channel = self.channel.lstrip('@').lower()
+        return channel in (str(chat.id), (chat.username or "").lower())
+    
+    async def channel_member_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Keep the cache current from channel join/leave events (bot must be admin)"""
+        change = update.chat_member
+        if change and self._is_channel(change.chat):
+            self.subscriptions.set(change.new_chat_member.user.id,
+                                   change.new_chat_member.status in SUBSCRIBED_STATUSES)
+    
+    async def _ask_subscription(self, update: Update, keyword: Optional[str] = None):
+        """Ask user to subscribe first (the button remembers the keyword)"""
         await update.message.reply_text(
             f"Salom! 👋\n\n"
             f"Ma'lumotlarni olish uchun avval kanalimizga obuna bo'ling:\n"
             f"👉 {self.channel}\n\n"
             f"Obuna bo'lgandan keyin \"✅ Obuna bo'ldim\" tugmasini bosing.",
-            reply_markup=reply_markup
+            reply_markup=self._subscribe_markup(keyword)
         )
     
-    async def _send_content(self, update: Update):
-        """Send content link to subscribed user"""
+    async def _send_content(self, update: Update, keyword: Optional[str] = None):
+        """Send the keyword's content (or the default content) to a subscribed user"""
         message = update.message or update.callback_query.message
-        
-        keyboard = [
-            [InlineKeyboardButton("🎁 Kontentni olish", url=self.content_link)]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        content_link = get_current_account().content.get_telegram_content(keyword)
+        reply_markup = self._content_markup(content_link) if content_link else None
         
         text = (
             "✅ Rahmat, siz kanalimizga obuna bo'lgansiz!\n\n"
             "🎁 Mana sizning kontentingiz:\n"
-            f"👉 {self.content_link}\n\n"
+            f"👉 {content_link}\n\n"
             "Qo'shimcha savollar bo'lsa, yozing!"
         )
         
@@ -77,39 +142,143 @@ class TelegramSubscriptionBot:
     async def check_subscription_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle subscription check button"""
         query = update.callback_query
-        await query.answer()
+        _, _, keyword = query.data.partition(":")
+        keyword = self._resolve_keyword(keyword)
         
+        # The user says they just subscribed: don't trust a cached "no"
         user_id = query.from_user.id
-        is_subscribed = await self._check_subscription(update, context, user_id)
+        is_subscribed = await self._check_subscription(update, context, user_id, fresh=True)
         
+        # A callback query can only be answered once
         if is_subscribed:
-            await self._send_content(update)
+            await query.answer()
+            await self._send_content(update, keyword)
+            if keyword:
+                conversion_counters.record(keyword, CONVERTED)
         else:
             await query.answer("❌ Siz hali kanalga obuna bo'lmagansiz!", show_alert=True)
     
-    def run(self, use_signals=True):
-        """Run the bot"""
+    def prepare_content(self):
+        """
+        Load the account's content (telegram_content) and start its reload
+        watcher - blocking (DB/file read), so run it off the event loop
+        """
+        get_current_account().content_store.start_watcher()
+    
+    def is_configured(self) -> bool:
+        """Check that a real bot token is set"""
         if not self.token or self.token == "your_telegram_bot_token":
-            print("❌ TELEGRAM_BOT_TOKEN .env faylida kiritilmagan!")
-            return
+            log.error("telegram_token_missing", "❌ TELEGRAM_BOT_TOKEN .env faylida kiritilmagan!")
+            return False
+        return True
+    
+    def build_application(self, base_url: str = None, concurrent_updates: int = None,
+                          updater: bool = True) -> Application:
+        """
+        Build the Application with all handlers registered
+        
+        Updates are handled concurrently (users don't queue behind each other's
+        get_chat_member calls); the HTTP pool is sized to match.
+        
+        Args:
+            base_url: Bot API URL override (e.g. a local fake for load tests)
+            concurrent_updates: Override TELEGRAM_CONCURRENT_UPDATES
+            updater: False for webhook mode (updates are pushed, not polled)
+        """
+        concurrency = concurrent_updates or config.TELEGRAM_CONCURRENT_UPDATES
+        builder = (
+            Application.builder()
+            .token(self.token)
+            .concurrent_updates(concurrency)
+            .connection_pool_size(max(config.TELEGRAM_POOL_SIZE, concurrency))
+            .pool_timeout(config.TELEGRAM_POOL_TIMEOUT)
+        )
+        if base_url:
+            builder = builder.base_url(base_url)
+        if not updater:
+            builder = builder.updater(None)
+        app = builder.build()
         
+        # Handlers
+        app.add_handler(CommandHandler("start", self.start))
+        app.add_handler(CallbackQueryHandler(self.check_subscription_callback, pattern=f"^{CHECK_SUBSCRIPTION}"))
+        app.add_handler(ChatMemberHandler(self.channel_member_update, ChatMemberHandler.CHAT_MEMBER))
+        return app
+    
+    def _print_banner(self, mode: str = "polling"):
         print("=" * 50)
         print("🤖 Telegram Subscription Bot")
         print(f"   📢 Kanal: {self.channel}")
+        print(f"   🔌 Rejim: {mode}")
         print("=" * 50)
         print("\n🚀 Bot ishga tushdi. To'xtatish uchun Ctrl+C")
+    
+    def run(self, use_signals=True):
+        """Run the bot"""
+        if not self.is_configured():
+            return
         
-        app = Application.builder().token(self.token).build()
-        
-        # Handlers
-        app.add_handler(CommandHandler("start", self.start))
-        app.add_handler(CallbackQueryHandler(self.check_subscription_callback, pattern="check_subscription"))
+        self._print_banner()
+        self.prepare_content()
+        app = self.build_application()
         
         # Run - disable signals if in threaded mode
         if use_signals:
             app.run_polling(allowed_updates=Update.ALL_TYPES)
         else:
             app.run_polling(allowed_updates=Update.ALL_TYPES, stop_signals=None)
+    
+    async def _register_webhook(self, app: Application) -> bool:
+        """Point Telegram at the web app's webhook route; False if it failed"""
+        from telegram_webhook import webhook_url, webhook_secret
+        
+        try:
+            async with app:
+                await app.bot.set_webhook(
+                    url=webhook_url(),
+                    secret_token=webhook_secret(),
+                    allowed_updates=Update.ALL_TYPES,
+                    max_connections=min(100, config.TELEGRAM_CONCURRENT_UPDATES),
+                )
+            return True
+        except Exception as e:
+            log.warning("webhook_register_failed", "⚠️ Webhook o'rnatilmadi - polling rejimiga o'tildi: {error}",
+                        error=str(e))
+            return False
+    
+    async def run_async(self, stop_event: asyncio.Event, webhook: bool = False):
+        """
+        Run the bot on the current event loop until `stop_event` is set
+        (lets the Instagram pipeline share the same loop)
+        
+        Args:
+            stop_event: Set to stop the bot
+            webhook: Register the webhook instead of polling; updates are then
+                handled by the web app (telegram_webhook.py) and polling is
+                only the fallback if registration fails
+        """
+        if not self.is_configured():
+            return
+        
+        await asyncio.get_running_loop().run_in_executor(None, self.prepare_content)
+        # Registration only needs the Bot: no updater, the polling app is built only as the fallback
+        if webhook and await self._register_webhook(self.build_application(updater=False)):
+            self._print_banner("webhook")
+            await stop_event.wait()
+            return
+        
+        # start_polling removes any previously set webhook
+        self._print_banner()
+        app = self.build_application()
+        
+        async with app:
+            await app.start()
+            await app.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            try:
+                await stop_event.wait()
+            finally:
+                await app.updater.stop()
+                await app.stop()
 
 
 def main():
@@ -0,0 +1,118 @@
+"""
+Telegram webhook mode served from the Flask/gunicorn web app
+Telegram POSTs updates to WEBHOOK_PATH; the route checks the secret token and
+hands the update to an Application running on this process's own event loop
+thread. Every web worker can take updates (no getUpdates conflict), while the
+leader process only registers the webhook; polling stays as the fallback
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+from typing import Optional
+from config import config
+from logger import log
+
+WEBHOOK_PATH = "/telegram/webhook"
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def webhook_url() -> str:
+    """Public webhook URL, or empty string when none is known"""
+    if config.TELEGRAM_WEBHOOK_URL:
+        return config.TELEGRAM_WEBHOOK_URL
+    base = os.getenv("RENDER_EXTERNAL_URL", "")
+    return f"{base.rstrip('/')}{WEBHOOK_PATH}" if base else ""
+
+
+def webhook_secret() -> str:
+    """Secret token Telegram echoes in SECRET_HEADER (same in every worker)"""
+    if config.TELEGRAM_WEBHOOK_SECRET:
+        return config.TELEGRAM_WEBHOOK_SECRET
+    # Derived from the bot token: stable across workers/restarts, [A-Za-z0-9] only
+    return hmac.new(config.TELEGRAM_BOT_TOKEN.encode(), b"webhook", hashlib.sha256).hexdigest()
+
+
+def webhook_enabled() -> bool:
+    """Whether web_server.py should receive updates via webhook"""
+    if config.TELEGRAM_MODE == "polling" or not config.TELEGRAM_BOT_TOKEN:
+        return False
+    return bool(webhook_url())
+
+
+def is_valid_secret(header_value: Optional[str]) -> bool:
+    return bool(header_value) and hmac.compare_digest(header_value, webhook_secret())
+
+
+class WebhookDispatcher:
+    """Application + event loop thread that processes webhook updates of this process"""
+
+    def __init__(self):
+        self.app = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.received = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="telegram-webhook")
+        self._thread.start()
+
+    def _run(self):
+        from telegram_bot import TelegramSubscriptionBot
+
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            bot = TelegramSubscriptionBot()
+            bot.prepare_content()  # Before the loop runs: handlers never block on the first load
+            self.app = bot.build_application(updater=False)
+            self._loop.run_until_complete(self.app.initialize())
+            self._loop.run_until_complete(self.app.start())
+        except BaseException as e:
+            self._error = e
+            log.error("webhook_failed", "❌ Telegram webhook ishga tushmadi: {error}", error=str(e))
+            return
+        finally:
+            self._ready.set()
+        self._loop.run_forever()
+
+    def submit(self, data: dict) -> bool:
+        """
+        Queue one update for processing; returns immediately
+
+        Args:
+            data: Update JSON as posted by Telegram
+
+        Returns:
+            False if the Application is not available (Telegram will retry)
+        """
+        from telegram import Update
+
+        if not self._ready.wait(timeout=10) or self._error is not None:
+            return False
+        update = Update.de_json(data, self.app.bot)
+        self._loop.call_soon_threadsafe(self.app.update_queue.put_nowait, update)
+        self.received += 1
+        return True
+
+    def status(self) -> dict:
+        return {
+            "ready": self._ready.is_set() and self._error is None,
+            "error": str(self._error) if self._error else None,
+            "received": self.received,
+            "queued": self.app.update_queue.qsize() if self.app else 0,
+        }
+
+
+_dispatcher: Optional[WebhookDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    """Lazy per-process dispatcher (thread-safe)"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = WebhookDispatcher()
+    return _dispatcher
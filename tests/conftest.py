@@ -0,0 +1,7 @@
+"""Tests run offline: no DB, repo root importable like the flat top-level modules"""
+import os
+import sys
+
+os.environ.pop("DATABASE_URL", None)
+os.environ.setdefault("LOG_FORMAT", "text")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
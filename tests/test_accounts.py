@@ -0,0 +1,22 @@
+import pickle
+
+from accounts import Account, default_account
+from supervisor import AccountSupervisor
+
+
+def test_account_pickles_after_content_store_is_built():
+    account = Account("brand2", "brand2", "secret", content_mappings={"pdf": "https://example.com/pdf"})
+    account.content_store  # Builds the store and holds its lock
+    clone = pickle.loads(pickle.dumps(account))
+    assert clone.name == "brand2" and clone.password == "secret"
+    assert clone._content_store is None
+    assert clone.get_content_link("pdf") == "https://example.com/pdf"
+
+
+def test_supervisor_spawns_a_worker():
+    supervisor = AccountSupervisor([default_account()])
+    supervisor._spawn("default")  # "spawn" pickles the Account here
+    process = supervisor.processes["default"]
+    process.join(60)
+    # No credentials in tests: the worker starts, fails warm-up and exits cleanly
+    assert process.exitcode == 0
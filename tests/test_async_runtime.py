@@ -0,0 +1,8 @@
+import async_runtime
+
+
+def test_stop_requested_before_start_is_kept_until_cleared():
+    assert async_runtime.request_stop() is False
+    assert async_runtime._stop_requested
+    async_runtime.clear_stop_request()
+    assert not async_runtime._stop_requested
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from backfill import Backfill
+from circuit_breaker import CircuitOpenError
+from processed_index import ProcessedIndex
+from records import CommentRecord, MediaRecord
+
+
+class FakeBot:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.processed = []
+        self.account = SimpleNamespace(name="default")
+        self.instagram = SimpleNamespace(processed_comments=ProcessedIndex(3600))
+
+    def _find_keyword(self, text):
+        return "pdf" if "pdf" in text else ""
+
+    def _process_comment(self, media, comment):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.processed.append(comment.pk)
+        return True
+
+
+MEDIA = MediaRecord(pk="1", id="1_2")
+
+
+def _comment(pk):
+    return CommentRecord(pk=pk, text="pdf", user_pk="9", username="u", media_id=MEDIA.id)
+
+
+def _backfill(bot):
+    return Backfill(bot, rate_per_min=60_000)
+
+
+def test_blocked_comment_is_retried_after_the_cooldown():
+    bot = FakeBot(errors=[CircuitOpenError("comment", 0)])
+
+    assert _backfill(bot)._handle(MEDIA, _comment("c1")) is True
+    assert bot.processed == ["c1"]
+
+
+def test_other_errors_skip_only_that_comment():
+    bot = FakeBot(errors=[ValueError("bad media")])
+    backfill = _backfill(bot)
+
+    assert backfill._handle(MEDIA, _comment("c1")) is False
+    assert backfill._handle(MEDIA, _comment("c2")) is True
+    assert bot.processed == ["c2"]
+
+
+def test_comment_handled_by_the_live_bot_is_skipped():
+    bot = FakeBot()
+    bot.instagram.processed_comments.add("c1")
+
+    assert _backfill(bot)._handle(MEDIA, _comment("c1")) is False
+    assert bot.processed == []
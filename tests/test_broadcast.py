@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from broadcast import TokenBucket
+
+
+def _timed_acquires(bucket: TokenBucket, count: int) -> float:
+    async def run():
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+    return asyncio.run(run())
+
+
+def test_burst_up_to_capacity_then_paced_by_rate():
+    bucket = TokenBucket(rate=20, capacity=3)
+
+    assert _timed_acquires(bucket, 3) < 0.04
+    assert _timed_acquires(bucket, 2) >= 0.09  # 2 tokens at 20/s
+
+
+def test_pause_holds_tokens_back():
+    bucket = TokenBucket(rate=1000, capacity=5)
+    bucket.pause(0.1)
+
+    assert _timed_acquires(bucket, 1) >= 0.09
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+from circuit_breaker import EndpointCircuit, CircuitOpenError, THROTTLE, OTHER, classify_error
+from config import config
+
+
+class FeedbackRequired(Exception):
+    pass
+
+
+class ClientError(Exception):
+    def __init__(self, message, **fields):
+        super().__init__(message)
+        self.__dict__.update(fields)
+
+
+def test_throttle_error_is_classified():
+    assert classify_error(FeedbackRequired("feedback_required")) == THROTTLE
+    assert classify_error(ClientError("Too many", response=SimpleNamespace(status_code=429))) == THROTTLE
+    assert classify_error(ClientError("blocked", error_type="feedback_required")) == THROTTLE
+    assert classify_error(ValueError("bad")) == OTHER
+
+
+@pytest.mark.parametrize("error", [
+    ClientError("404 for media/3142942901_17/comments/", response=SimpleNamespace(status_code=404)),
+    ClientError("comment rejected: 'spam bot emas man'", code=400),
+    ValueError("rate limit mentioned in a comment text"),
+])
+def test_ids_and_texts_in_messages_are_not_throttles(error):
+    assert classify_error(error) == OTHER
+
+
+def test_throttle_opens_then_half_open_probe_closes():
+    circuit = EndpointCircuit("read")
+    circuit.before_call(0)
+    circuit.on_error(FeedbackRequired(), THROTTLE, now=0)
+    assert circuit.state == EndpointCircuit.OPEN
+    assert circuit.rate == circuit.max_rate / 2
+
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call(config.CIRCUIT_BASE_COOLDOWN - 1)
+
+    # After the cooldown exactly one probe is let through
+    circuit.before_call(config.CIRCUIT_BASE_COOLDOWN)
+    assert circuit.state == EndpointCircuit.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call(config.CIRCUIT_BASE_COOLDOWN)
+
+    circuit.on_success()
+    assert circuit.state == EndpointCircuit.CLOSED
+    assert circuit.open_count == 0
+
+
+def test_repeated_throttles_back_off_exponentially():
+    circuit = EndpointCircuit("write")
+    circuit.on_error(FeedbackRequired(), THROTTLE, now=0)
+    first = circuit.opened_until
+    circuit.before_call(first)  # Probe
+    circuit.on_error(FeedbackRequired(), THROTTLE, now=first)
+
+    assert circuit.opened_until - first == min(2 * config.CIRCUIT_BASE_COOLDOWN, config.CIRCUIT_MAX_COOLDOWN)
+
+
+def test_other_error_on_probe_closes_the_circuit():
+    circuit = EndpointCircuit("read")
+    circuit.on_error(FeedbackRequired(), THROTTLE, now=0)
+    circuit.before_call(circuit.opened_until)
+    circuit.on_error(ValueError("not found"), OTHER, now=circuit.opened_until)
+
+    assert circuit.state == EndpointCircuit.CLOSED
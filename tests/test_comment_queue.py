@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import comment_queue
+from comment_queue import CommentQueueWorker
+
+
+class FakeQueueDB:
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.completed = []
+        self.failed = []
+
+    def get_comment_job_stats(self, account="default"):
+        return {}
+
+    def claim_comment_jobs(self, worker_id, limit, visibility_timeout, max_attempts, account):
+        jobs, self.jobs = self.jobs, []
+        return jobs
+
+    def complete_comment_job(self, job_id):
+        self.completed.append(job_id)
+
+    def fail_comment_job(self, job_id, error, max_attempts, retry_delay):
+        self.failed.append(job_id)
+
+
+class FakeBot:
+    def __init__(self, results):
+        self.results = results
+        self.account = SimpleNamespace(name="default")
+        self.load_policy = SimpleNamespace(update=lambda depth, age: None)
+
+    def _process_comment(self, media, comment):
+        return self.results[comment.pk]
+
+
+def _job(job_id, comment_id):
+    return {"id": job_id, "media_pk": "1", "media_id": "1_2", "comment_id": comment_id, "text": "pdf",
+            "user_pk": "9", "username": "u", "attempts": 1}
+
+
+def test_failed_send_fails_the_job(monkeypatch):
+    db = FakeQueueDB([_job(1, "c1"), _job(2, "c2")])
+    monkeypatch.setattr(comment_queue, "get_db", lambda: db)
+    worker = CommentQueueWorker(bot=FakeBot({"c1": True, "c2": False}))
+    worker.running = True
+    assert worker.run_once() == 2
+    assert db.completed == [1] and db.failed == [2]
+    assert worker.processed == 1 and worker.failed == 1
+
+
+def test_worker_exits_without_queue_mode(monkeypatch):
+    monkeypatch.setattr(comment_queue.config, "QUEUE_MODE", False)
+    bot = FakeBot({})
+    bot._prepare = lambda: (_ for _ in ()).throw(AssertionError("must not log in"))
+    CommentQueueWorker(bot=bot).run()
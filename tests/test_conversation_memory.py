@@ -0,0 +1,38 @@
+from conversation_memory import ConversationMemory, estimate_tokens
+
+
+def _memory(**overrides):
+    settings = dict(max_turns=4, token_budget=120, summary_tokens=60, max_conversations=3, idle_ttl=100)
+    settings.update(overrides)
+    return ConversationMemory(**settings)
+
+
+def test_history_stays_within_budget():
+    memory = _memory()
+    for i in range(50):
+        memory.add_turn("u1", f"Savol {i}: kurs narxi qancha? Batafsil aytib bering.",
+                        f"Javob {i}. Narxi 100 ming so'm. Batafsil direktda.")
+    history = memory.history("u1")
+    assert "Savol 49" in history  # Newest turn verbatim
+    assert "Savol 0:" not in history  # Oldest folded out of the rolling summary
+    # Verbatim turns within the budget + summary within its cap (+ headings)
+    assert estimate_tokens(history) <= 120 + 60 + 40
+    assert memory.status()["summarized_turns"] > 0
+
+
+def test_lru_and_idle_eviction():
+    memory = _memory()
+    for conversation_id in "abcd":
+        memory.add_turn(conversation_id, "salom", "salom!")
+    assert len(memory) == 3 and not memory.has_history("a")  # Least recently used dropped
+
+    memory._conversations["d"].last_used -= 1000
+    assert memory.history("d") == ""
+    assert not memory.has_history("d")
+    assert memory.has_history("c")
+
+
+def test_no_conversation_id_is_stateless():
+    memory = _memory()
+    memory.add_turn("", "salom", "salom!")
+    assert len(memory) == 0 and memory.history("") == "" and not memory.has_history("")
@@ -0,0 +1,35 @@
+import pytest
+
+import deep_links
+from config import config
+from deep_links import decode_payload, encode_payload
+
+
+@pytest.fixture(autouse=True)
+def link_secret(monkeypatch):
+    monkeypatch.setattr(config, "TELEGRAM_LINK_SECRET", "test-secret")
+
+
+def test_payload_round_trip_normalizes_keyword():
+    payload = encode_payload(" PDF ")
+
+    assert decode_payload(payload) == "pdf"
+    assert len(payload) <= deep_links.MAX_PAYLOAD
+
+
+@pytest.mark.parametrize("payload", ["", "short", "a" * 65, "!!!not-base64!!!abcdefghij"])
+def test_malformed_payloads_are_rejected(payload):
+    assert decode_payload(payload) is None
+
+
+def test_tampered_or_foreign_payloads_are_rejected(monkeypatch):
+    payload = encode_payload("kurs")
+    forged = encode_payload("pdf")[:-deep_links.SIGNATURE_CHARS] + payload[-deep_links.SIGNATURE_CHARS:]
+    assert decode_payload(forged) is None
+
+    monkeypatch.setattr(config, "TELEGRAM_LINK_SECRET", "other-secret")
+    assert decode_payload(payload) is None
+
+
+def test_too_long_keyword_has_no_payload():
+    assert encode_payload("k" * 60) is None
@@ -0,0 +1,86 @@
+import pytest
+
+import main
+from circuit_breaker import CircuitOpenError
+from records import CommentRecord, MediaRecord
+from trigger_cooldown import FOLLOW_ASKED, SENT
+
+
+class FakeInstagram:
+    """Records sends; each send returns the next queued result (True when none left)"""
+
+    def __init__(self, following=True, replies=(), dms=()):
+        self.following = following
+        self.reply_results = list(replies)
+        self.dm_results = list(dms)
+        self.replies = 0
+        self.dms = 0
+        self.steps = {}
+
+    def _next(self, results):
+        result = results.pop(0) if results else True
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def is_user_following(self, user_id):
+        return self.following
+
+    def reply_to_comment(self, media_id, comment_id, text):
+        self.replies += 1
+        return self._next(self.reply_results)
+
+    def send_dm_to_user(self, user_id, text):
+        self.dms += 1
+        return self._next(self.dm_results)
+
+    def completed_steps(self, comment_id):
+        return set(self.steps.get(comment_id, ()))
+
+    def mark_step_done(self, comment_id, step):
+        self.steps.setdefault(comment_id, set()).add(step)
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.setattr(main.signal, "signal", lambda *args: None)
+    bot = main.InstagramAIBot()
+    bot.DM_DELAY = 0
+    return bot
+
+
+POST = MediaRecord(pk="1", id="1_2")
+COMMENT = CommentRecord(pk="c1", text="pdf", user_pk="9", username="ali", media_id="1_2")
+
+
+def _trigger(bot):
+    return bot._process_keyword_comment(POST, COMMENT, COMMENT.username, COMMENT.user_pk, "pdf")
+
+
+def test_retry_after_failed_dm_only_resends_the_dm(bot):
+    bot.instagram = FakeInstagram(dms=[False])
+
+    assert _trigger(bot) is False
+    assert _trigger(bot) is True
+    assert (bot.instagram.replies, bot.instagram.dms) == (1, 2)
+    assert bot.cooldown.check(COMMENT.user_pk, "pdf") == SENT
+
+
+def test_failed_follow_ask_reply_records_no_cooldown(bot):
+    bot.instagram = FakeInstagram(following=False, replies=[False])
+
+    assert _trigger(bot) is False
+    assert bot.cooldown.check(COMMENT.user_pk, "pdf") is None
+    assert _trigger(bot) is True
+    assert bot.instagram.replies == 2
+    assert bot.cooldown.check(COMMENT.user_pk, "pdf") == FOLLOW_ASKED
+
+
+def test_dm_blocked_after_reply_is_retried_without_a_second_reply(bot):
+    bot.instagram = FakeInstagram(dms=[CircuitOpenError("dm", 60)])
+
+    with pytest.raises(CircuitOpenError):
+        _trigger(bot)
+    assert bot.instagram.steps[COMMENT.pk] == {bot.STEP_REPLY}
+    assert _trigger(bot) is True
+    assert (bot.instagram.replies, bot.instagram.dms) == (1, 2)
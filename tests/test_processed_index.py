@@ -0,0 +1,49 @@
+import time
+from types import SimpleNamespace
+
+from instagram_handler import InstagramHandler
+from processed_index import ProcessedIndex
+from records import MediaRecord
+
+
+def test_prune_drops_only_ids_older_than_the_window():
+    index = ProcessedIndex(window_seconds=100)
+    index.update(["1", "2"], at=1000)
+    index.add(3, at=1050)
+    index.add("4", at=1200)
+
+    assert index.prune(now=1140) == 2
+    assert list(index) == ["3", "4"]
+    assert 3 in index and "1" not in index
+    assert index.prune(now=1140) == 0
+
+
+def test_snapshot_restore_keeps_times_and_order():
+    index = ProcessedIndex(window_seconds=100)
+    index.add("b", at=20)
+    index.add("a", at=10)
+    restored = ProcessedIndex(window_seconds=100)
+    restored.restore(index.snapshot())
+
+    assert list(restored) == ["a", "b"]
+    assert restored.prune(now=115) == 1
+
+
+def test_comments_page_keeps_unknown_creation_time():
+    handler = InstagramHandler.__new__(InstagramHandler)
+    handler.processed_comments = ProcessedIndex(window_seconds=3600)
+    handler.processed_comments.add("seen")
+    old = time.time() - 10 * 365 * 86400
+    items = [
+        {"pk": "new", "text": "a", "user_id": "7", "created_at_utc": int(time.time())},
+        {"pk": "unknown", "text": "b", "user_id": "7"},
+        {"pk": "expired", "text": "c", "user_id": "7", "created_at_utc": int(old)},
+        {"pk": "seen", "text": "d", "user_id": "7", "created_at_utc": int(time.time())},
+        {"pk": "own", "text": "e", "user_id": "1", "created_at_utc": int(time.time())},
+    ]
+    handler.client = SimpleNamespace(user_id=1, private_request=lambda path, params: {"comments": items})
+    handler._api = lambda family, call, *args, **kwargs: call(*args, **kwargs)
+
+    comments, scanned, _, _ = handler.get_comments_page(MediaRecord(pk="m", id="m"))
+    assert [comment.pk for comment in comments] == ["new", "unknown"]
+    assert scanned == 5
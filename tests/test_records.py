@@ -0,0 +1,24 @@
+from records import CommentRecord, MediaRecord, comment_created_at, comment_user_pk
+
+
+def test_comment_from_raw_reads_nested_user():
+    raw = {"pk": 17, "text": "pdf", "user": {"pk": 42, "username": "ali"}, "created_at_utc": 1700000000}
+    comment = CommentRecord.from_raw(raw, media_id=5)
+
+    assert (comment.pk, comment.text, comment.user_pk, comment.username) == ("17", "pdf", "42", "ali")
+    assert (comment.media_id, comment.created_at) == ("5", 1700000000)
+
+
+def test_comment_from_raw_falls_back_to_flat_fields():
+    comment = CommentRecord.from_raw({"pk": "9", "text": None, "user_id": 3, "created_at": 12}, "m")
+
+    assert (comment.text, comment.user_pk, comment.username, comment.created_at) == ("", "3", "", 12)
+    assert comment_created_at({"pk": "1"}) == 0
+    assert comment_user_pk({"user": {"pk": 8}}) == "8"
+
+
+def test_media_from_raw_defaults_id_to_pk():
+    media = MediaRecord.from_raw({"pk": 100, "comment_count": None})
+
+    assert (media.pk, media.id, media.comment_count) == ("100", "100", 0)
+    assert not hasattr(media, "__dict__")
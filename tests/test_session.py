@@ -0,0 +1,61 @@
+from instagram_handler import InstagramHandler
+from accounts import default_account
+from config import config
+from logger import log
+
+SAVED = {"cookies": {"sessionid": "abc"}, "uuids": {"uuid": "device-1"}}
+
+
+class FakeClient:
+    def __init__(self, valid=True):
+        self.calls = []
+        self.settings = {}
+        self.user_id = 1 if valid else None
+
+    def set_settings(self, settings):
+        self.calls.append(("set_settings", settings))
+        self.settings = settings
+
+    def get_settings(self):
+        return self.settings
+
+    def set_uuids(self, uuids):
+        self.calls.append(("set_uuids", uuids))
+
+    def login(self, username, password):
+        self.calls.append(("login", self.settings))
+
+
+def _handler(client):
+    handler = InstagramHandler.__new__(InstagramHandler)
+    handler.account = default_account()
+    handler.client = client
+    handler.log = log
+    handler._api = lambda family, call, *args, **kwargs: call(*args, **kwargs)
+    client.account_info = lambda: None
+    return handler
+
+
+def test_resume_disabled_logs_in_on_the_saved_cookies(monkeypatch):
+    monkeypatch.setattr(config, "SESSION_RESUME", False)
+    client = FakeClient()
+    _handler(client)._activate_session(SAVED)
+
+    assert client.calls == [("set_settings", SAVED), ("login", SAVED)]
+
+
+def test_failed_resume_logs_in_fresh_with_the_same_device(monkeypatch):
+    monkeypatch.setattr(config, "SESSION_RESUME", True)
+    client = FakeClient(valid=False)
+    _handler(client)._activate_session(SAVED)
+
+    assert client.calls == [("set_settings", SAVED), ("set_settings", {}), ("set_uuids", SAVED["uuids"]),
+                            ("login", {})]
+
+
+def test_valid_session_is_resumed_without_login(monkeypatch):
+    monkeypatch.setattr(config, "SESSION_RESUME", True)
+    client = FakeClient()
+    _handler(client)._activate_session(SAVED)
+
+    assert client.calls == [("set_settings", SAVED)]
@@ -0,0 +1,31 @@
+from spam_filter import NearDuplicateIndex, SimHasher, normalize_text
+
+
+def test_normalize_folds_case_numbers_and_punctuation():
+    assert normalize_text("  Kurs 2024!!  narxi?? ") == "kurs 0 narxi"
+
+
+def test_simhash_is_close_for_near_duplicates():
+    hasher = SimHasher()
+    a = hasher.signature(normalize_text("Eng zo'r kurs, hoziroq yoziling: link bioda"))
+    b = hasher.signature(normalize_text("Eng zo'r kurs, hoziroq yoziling: link bioda!!"))
+    c = hasher.signature(normalize_text("pdf"))
+
+    assert a == b
+    assert bin(a ^ c).count("1") > 3
+
+
+def test_index_clusters_near_duplicates_within_the_window():
+    index = NearDuplicateIndex(window=60, max_distance=3, max_entries=100)
+    spam = "Bepul kripto signal kanalimizga qo'shiling, link profilda 100% foyda"
+    first = index.add("1", spam, timestamp=0)
+
+    assert index.add("2", spam.replace("100", "200"), timestamp=1) == first
+    assert index.add("3", "Kitob qachon chiqadi?", timestamp=2) != first
+    assert index.add("1", spam, timestamp=3) == first  # Idempotent per comment id
+    assert index.cluster_size(first) == 2
+
+    # Past the window the old entries are evicted before the new one is indexed
+    assert index.add("4", spam, timestamp=100) != first
+    assert index.cluster_size(first) == 0
+    assert len(index) == 1
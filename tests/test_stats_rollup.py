@@ -0,0 +1,64 @@
+import threading
+
+import stats_rollup
+from stats_rollup import HourlyRollups, HOUR, hour_start
+
+
+class FakeStatsDB:
+    """Stores flushed deltas; add_hourly_stats blocks until `release` is set"""
+    enabled = True
+
+    def __init__(self):
+        self.rows = {}
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def add_hourly_stats(self, deltas):
+        self.writing.set()
+        self.release.wait(5)
+        for bucket, counts in deltas.items():
+            row = self.rows.setdefault(bucket, [0] * len(counts))
+            for i, count in enumerate(counts):
+                row[i] += count
+        return True
+
+    def get_hourly_stats(self, start, end, dimension, key=None, account=None):
+        return [(hour, acct, k, list(counts)) for (hour, acct, dim, k), counts in self.rows.items()
+                if dim == dimension]
+
+
+def test_query_sums_hours_into_days_per_key():
+    rollups = HourlyRollups(flush_interval=3600)
+    day = 1_700_006_400  # 00:00 UTC
+    rollups.record("default", "comments_seen", keyword="kurs", at=day + 60)
+    rollups.record("default", "comments_seen", keyword="kurs", at=day + 5 * HOUR)
+    rollups.record("default", "follow_checks", keyword="kurs", at=day + 5 * HOUR)
+    rollups.record("other", "comments_seen", keyword="narx", at=day + 2 * HOUR)
+
+    rows = rollups.query(day, day + 86400, dimension="keyword", bucket="day")
+    assert [(row["key"], row["comments_seen"]) for row in rows] == [("kurs", 2), ("narx", 1)]
+    assert rows[0]["follow_pass_rate"] == 0.0
+
+    hourly = rollups.query(day, day + 86400, dimension="total", account="default")
+    assert [row["comments_seen"] for row in hourly] == [1, 1]
+
+
+def test_query_counts_deltas_being_flushed_once(monkeypatch):
+    db = FakeStatsDB()
+    monkeypatch.setattr(stats_rollup, "get_db", lambda: db)
+    rollups = HourlyRollups(flush_interval=3600)
+    now = hour_start(1_700_000_000) + 60
+    rollups.record("default", "dms_sent", at=now)
+
+    flusher = threading.Thread(target=rollups.flush)
+    flusher.start()
+    assert db.writing.wait(5)
+    result = []
+    reader = threading.Thread(target=lambda: result.extend(rollups.query(now - HOUR, now + HOUR)))
+    reader.start()
+    db.release.set()
+    flusher.join(5)
+    reader.join(5)
+
+    assert [row["dms_sent"] for row in result] == [1]
+    assert rollups.status()["pending"] == 0
@@ -0,0 +1,28 @@
+from config import config
+from trigger_cooldown import TriggerCooldown, SENT, FOLLOW_ASKED
+
+
+class FakeTriggerDB:
+    def __init__(self, rows):
+        self.rows = rows  # (user_pk, keyword) -> (outcome, age in seconds)
+
+    def get_keyword_trigger(self, user_pk, keyword, account="default"):
+        return self.rows.get((user_pk, keyword))
+
+
+def test_db_trigger_age_decides_the_cooldown(monkeypatch):
+    db = FakeTriggerDB({
+        ("1", "pdf"): (SENT, config.TRIGGER_COOLDOWN - 60),
+        ("2", "pdf"): (SENT, config.TRIGGER_COOLDOWN + 60),
+        ("3", "pdf"): (FOLLOW_ASKED, config.TRIGGER_FOLLOW_RECHECK + 60),
+    })
+    cooldown = TriggerCooldown()
+    monkeypatch.setattr(cooldown, "_db", lambda: db)
+
+    assert cooldown.check("1", "pdf") == SENT
+    assert cooldown.check("2", "pdf") is None
+    assert cooldown.check("3", "pdf") is None
+    assert cooldown.check("4", "pdf") is None
+
+    db.rows.clear()  # Hits are cached in memory
+    assert cooldown.check("1", "pdf") == SENT
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+import warm_state
+from warm_state import SnapshotError, decode, encode
+
+
+def test_round_trip():
+    state = {"processed": [["1", 100.0]], "messages": ["m1"], "backlog": []}
+    restored = decode(encode("default", state), "default", max_age=60)
+    assert restored["processed"] == [["1", 100.0]] and restored["messages"] == ["m1"]
+    assert restored["account"] == "default" and restored["saved_at"] <= time.time()
+
+
+@pytest.mark.parametrize("blob, account, error", [
+    (encode("default", {})[:10], "default", "truncated"),
+    (b"XXXX" + encode("default", {})[4:], "default", "not a warm-state"),
+    (encode("default", {"x": 1})[:-1] + b"\0", "default", "checksum"),
+    (encode("default", {}), "brand2", "account"),
+    (encode("default", {}, saved_at=time.time() - 3600), "default", "old"),
+])
+def test_rejects_unusable_snapshots(blob, account, error):
+    with pytest.raises(SnapshotError, match=error):
+        decode(blob, account, max_age=60)
+
+
+def test_snapshot_is_taken_once(tmp_path, monkeypatch):
+    from accounts import default_account
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(warm_state, "_restored", {})
+    account = default_account()
+    assert warm_state.save(account, {"messages": ["m1"]})
+    assert warm_state.restore(account)["messages"] == ["m1"]
+    assert not (tmp_path / account.warm_state_file).exists()  # Only valid right after the shutdown
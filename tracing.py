@@ -0,0 +1,245 @@
+"""
+Lightweight tracing spans, per-stage latency histograms and a sampling profiler
+Spans nest through a contextvar: the outermost span of a thread is a trace.
+Every finished span feeds the histogram of its name; traces slower than
+TRACE_SLOW_MS are kept (ring buffer) for the /debug/traces endpoint
+"""
+import bisect
+import contextvars
+import functools
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+from config import config
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +inf)
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+
+class Span:
+    """One timed stage; attributes carry ids and the outcome"""
+
+    __slots__ = ("name", "attrs", "children", "started_at", "_start", "duration_ms", "error")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.error = None
+
+    def set(self, **attrs):
+        """Attach attributes (e.g. outcome="sent") to the span"""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "at": datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"),
+            "ms": round(self.duration_ms, 1),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (ms)"""
+
+    __slots__ = ("counts", "count", "total", "max", "errors")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, ms: float, error: bool = False):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.errors += error
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (capped at max)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(float(BUCKETS_MS[i]), self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 1),
+            "p95_ms": round(self.percentile(0.95), 1),
+            "p99_ms": round(self.percentile(0.99), 1),
+            "max_ms": round(self.max, 1),
+        }
+
+
+class Tracer:
+    """Collects spans, histograms and slow traces"""
+
+    def __init__(self, enabled: bool = None, slow_ms: float = None, keep: int = None):
+        self.enabled = config.TRACING if enabled is None else enabled
+        self.slow_ms = config.TRACE_SLOW_MS if slow_ms is None else slow_ms
+        self.histograms = {}
+        self.slow_traces = deque(maxlen=keep or config.TRACE_KEEP)
+        self.recent_traces = deque(maxlen=keep or config.TRACE_KEEP)
+        self._current = contextvars.ContextVar("current_span", default=None)
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a stage: `with tracer.span("ig.direct_send", user_id=...) as s: ...`"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = self._current.get()
+        span = Span(name, attrs)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - span._start) * 1000
+            self._current.reset(token)
+            if parent is not None:
+                parent.children.append(span)
+            self._finish(span, is_root=parent is None)
+
+    def _finish(self, span: Span, is_root: bool):
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = Histogram()
+            histogram.observe(span.duration_ms, span.error is not None)
+            if is_root:
+                self.recent_traces.append(span)
+                if span.duration_ms >= self.slow_ms:
+                    self.slow_traces.append(span)
+
+    def annotate(self, **attrs):
+        """Attach attributes to the innermost open span (no-op outside spans)"""
+        span = self._current.get()
+        if span is not None:
+            span.set(**attrs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def traces(self, slow: bool = True, limit: int = 20) -> list:
+        with self._lock:
+            traces = list(self.slow_traces if slow else self.recent_traces)[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+tracer = Tracer()
+
+
+def traced(name: str = None):
+    """Decorator: run the function inside a span (default name: Class.method)"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Opt-in statistical profiler: samples all thread stacks every interval"""
+
+    def __init__(self, interval_ms: float = None, max_depth: int = 30):
+        self.interval = (interval_ms or config.PROFILER_INTERVAL_MS) / 1000
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.total = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.samples.clear()
+        self.total = 0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sampling-profiler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                # Walk frames directly: cheaper than traceback (no source lookup)
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(names))
+                self.samples[key] += 1
+                self.total += 1
+
+    def report(self, top: int = 25) -> dict:
+        return {
+            "running": self.running,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            "interval_ms": self.interval * 1000,
+            "samples": self.total,
+            "top_stacks": [
+                {"share": round(count / self.total, 3), "samples": count, "stack": stack.split(";")[-8:]}
+                for stack, count in self.samples.most_common(top)
+            ] if self.total else [],
+        }
+
+
+profiler = SamplingProfiler()
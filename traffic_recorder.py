@@ -0,0 +1,263 @@
+"""
+Opt-in recorder of real Instagram/Gemini traffic for offline load tests
+With TRAFFIC_RECORD_FILE set, every InstagramHandler client call and every
+GeminiAI.generate_response is appended as one JSON line to a gzip file:
+
+    {"t": 1700000000.123, "acct": "default", "kind": "ig", "call": "media/comments",
+     "req": {...}, "res": {...}, "ms": 182.4, "error": "PleaseWaitFewMinutes"}
+
+Payloads are sanitized before they are queued: only the fields the pipeline
+reads are kept, user ids/usernames are replaced by salted pseudonyms (stable
+within one file) and e-mails, phone numbers, links and @mentions in texts are
+masked. A background thread writes and sync-flushes the gzip stream, so the
+file can be read (or replayed with bench_replay.py) while it is still growing
+"""
+import atexit
+import functools
+import gzip
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from typing import Iterator, Optional
+from config import config
+from logger import log
+
+FORMAT_VERSION = 1
+_STOP = object()  # Queue sentinel: close the file
+OWNER_PK = 0  # Pseudonym of the recording account itself
+FLUSH_INTERVAL = 2.0  # Seconds between gzip sync flushes
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_PHONE = re.compile(r"\+?\d[\d\s()-]{6,}\d")
+_MENTION = re.compile(r"@[\w.]+")
+
+# Raw private API fields kept per object (everything else is dropped)
+_MEDIA_FIELDS = ("pk", "id", "comment_count", "taken_at")
+_COMMENT_FIELDS = ("pk", "text", "created_at_utc", "created_at")
+
+
+def scrub_text(text: str) -> str:
+    """Mask personal data in a text but keep its shape (length, emoji, keywords)"""
+    if not text:
+        return text or ""
+    text = _EMAIL.sub("<email>", text)
+    text = _URL.sub("<url>", text)
+    text = _PHONE.sub("<phone>", text)
+    return _MENTION.sub("@user", text)
+
+
+def endpoint_name(endpoint: str) -> str:
+    """"media/123_456/comments/" -> "media/comments" (same as the tracing span names)"""
+    return "/".join(p for p in str(endpoint).strip("/").split("/") if not re.match(r"^\d", p))
+
+
+class Sanitizer:
+    """Salted pseudonyms: the same user maps to the same id within one recording"""
+
+    def __init__(self, salt: bytes = None):
+        self.salt = salt or os.urandom(16)
+
+    def user_pk(self, value) -> Optional[int]:
+        if value in (None, ""):
+            return None
+        digest = hashlib.blake2b(str(value).encode(), key=self.salt, digest_size=6).digest()
+        return int.from_bytes(digest, "big")
+
+    def username(self, value) -> str:
+        return f"u{self.user_pk(value) % 10 ** 8}" if value else ""
+
+    def comment(self, data: dict, owner: str = None) -> dict:
+        item = {k: data[k] for k in _COMMENT_FIELDS if k in data}
+        item["text"] = scrub_text(data.get("text") or "")
+        user = data.get("user") or {}
+        raw_pk = user.get("pk") or data.get("user_id")
+        if owner and str(raw_pk) == str(owner):
+            item["user"] = {"pk": OWNER_PK, "username": "owner"}  # Our own replies
+        else:
+            item["user"] = {"pk": self.user_pk(raw_pk), "username": self.username(user.get("username"))}
+        return item
+
+    def request(self, call: str, args: tuple, kwargs: dict) -> dict:
+        """Keep only the ids/params needed to replay the call"""
+        if call.startswith("feed/") or call.startswith("media/"):
+            endpoint = str(args[0]) if args else ""
+            media = re.search(r"media/([^/]+)/", endpoint)
+            req = {k: v for k, v in (kwargs.get("params") or {}).items() if k in ("min_id", "max_id", "count")}
+            if media:
+                req["media_id"] = media.group(1)
+            return req
+        if call == "user_friendship_v1" or call == "user_info":
+            return {"user_pk": self.user_pk(args[0] if args else kwargs.get("user_id"))}
+        if call == "media_comment":
+            return {"media_id": str(args[0]) if args else "", "text_len": len(args[1]) if len(args) > 1 else 0,
+                    "replied_to": str(kwargs.get("replied_to_comment_id") or "")}
+        if call == "direct_send":
+            user_ids = kwargs.get("user_ids") or []
+            return {"user_pks": [self.user_pk(u) for u in user_ids], "text_len": len(args[0]) if args else 0}
+        if call == "generate_response":
+            return {"text": scrub_text(args[0] if args else kwargs.get("user_message", "")),
+                    "max_retries": kwargs.get("max_retries", args[2] if len(args) > 2 else 5),
+                    "conversation": self.user_pk(kwargs.get("conversation_id"))}
+        return {}
+
+    def response(self, call: str, result, owner: str = None) -> Optional[dict]:
+        """Trim a result to what the pipeline reads"""
+        if result is None:
+            return None
+        if call.startswith("feed/"):
+            return {"items": [{k: item[k] for k in _MEDIA_FIELDS if k in item} for item in result.get("items", [])],
+                    "more_available": bool(result.get("more_available")),
+                    "next_max_id": result.get("next_max_id")}
+        if call.startswith("media/") and call.endswith("comments"):
+            return {"comments": [self.comment(item, owner) for item in result.get("comments", [])],
+                    "next_min_id": result.get("next_min_id"), "next_max_id": result.get("next_max_id")}
+        if call == "user_friendship_v1":
+            return {"followed_by": bool(getattr(result, "followed_by", False))}
+        if call == "generate_response":
+            return {"text": scrub_text(result)}
+        if call == "direct_threads":
+            return {"threads": len(result)}
+        return {}
+
+
+class TrafficRecorder:
+    """Queues sanitized call records; a daemon thread appends them to a gzip JSONL file"""
+
+    def __init__(self, path: str = None, max_mb: int = None):
+        self.path = path if path is not None else config.TRAFFIC_RECORD_FILE
+        self.enabled = bool(self.path)
+        self.max_bytes = (max_mb or config.TRAFFIC_RECORD_MAX_MB) * 1024 * 1024
+        self.sanitizer = Sanitizer()
+        self.recorded = 0
+        self.dropped = 0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_writer(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._write_loop, daemon=True, name="traffic-recorder")
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def record(self, kind: str, call: str, account: str, req: dict, res, started: float, ms: float,
+               error: Exception = None):
+        """Queue one sanitized request/response pair (never raises)"""
+        if not self.enabled:
+            return
+        try:
+            event = {"t": round(started, 3), "acct": account, "kind": kind, "call": call,
+                     "req": req, "res": res, "ms": round(ms, 1)}
+            if error is not None:
+                event["error"] = type(error).__name__
+                event["message"] = scrub_text(str(error))[:200]
+            self._queue.put(event)
+            self._ensure_writer()
+        except Exception:
+            self.dropped += 1
+
+    def wrap(self, kind: str, call: str, account: str, func, owner: str = None):
+        """
+        Return `func` timed and recorded (errors are recorded and re-raised)
+
+        Args:
+            owner: Instagram pk of the account itself (its comments get OWNER_PK)
+        """
+        def wrapper(*args, **kwargs):
+            started = time.time()
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._record_call(kind, call, account, args, kwargs, None, started, start, owner, e)
+                raise
+            self._record_call(kind, call, account, args, kwargs, result, started, start, owner)
+            return result
+        return wrapper
+
+    def _record_call(self, kind, call, account, args, kwargs, result, started, start, owner=None, error=None):
+        ms = (time.perf_counter() - start) * 1000
+        try:
+            req = self.sanitizer.request(call, args, kwargs)
+            res = self.sanitizer.response(call, result, owner) if error is None else None
+        except Exception:
+            self.dropped += 1
+            return
+        self.record(kind, call, account, req, res, started, ms, error)
+
+    def _write_loop(self):
+        header = {"kind": "header", "v": FORMAT_VERSION, "started_at": time.time()}
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    event = self._queue.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    event = None
+                if event is _STOP:
+                    return
+                if event is not None:
+                    if f.buffer.fileobj.tell() >= self.max_bytes:
+                        if self.enabled:
+                            log.warning("traffic_recorder_full", "⚠️ Trafik yozuvi to'xtatildi: {path} limitga yetdi",
+                                        path=self.path)
+                        self.enabled = False
+                        self.dropped += 1
+                        continue
+                    f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    self.recorded += 1
+                if time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                    # GzipFile.flush() is a zlib sync flush: readers see complete
+                    # lines without the stream being closed
+                    f.flush()
+                    last_flush = time.monotonic()
+
+    def close(self, timeout: float = 5):
+        """Write what is queued and finish the gzip stream (registered atexit)"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, "file": self.path, "recorded": self.recorded, "dropped": self.dropped}
+
+
+traffic_recorder = TrafficRecorder()
+
+
+def recorded(kind: str, call: str = None):
+    """Decorator for methods: record the call when recording is on"""
+    def decorator(func):
+        name = call or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not traffic_recorder.enabled:
+                return func(self, *args, **kwargs)
+            account = getattr(getattr(self, "account", None), "name", "")
+            return traffic_recorder.wrap(kind, name, account, functools.partial(func, self))(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def read_events(path: str) -> Iterator[dict]:
+    """Yield events of a recording (tolerates a truncated last line of a live file)"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("kind") != "header":
+                    yield event
+        except EOFError:
+            return  # Still being written
@@ -0,0 +1,97 @@
+"""
+Per-(user, keyword) cooldown index for keyword triggers
+Recent triggers are kept in an in-memory LRU and persisted to the DB, so a user
+repeating "pdf" on several posts doesn't cost a follow check, reply and DM each time
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import config
+
+SENT = "sent"  # Link was delivered by DM
+FOLLOW_ASKED = "follow_asked"  # User was asked to follow first
+
+
+class TriggerCooldown:
+    """LRU + DB backed index of the last keyword trigger per (user, keyword)"""
+
+    def __init__(self, account: str = "default", max_entries: int = None):
+        self.account = account
+        self.max_entries = max_entries or config.TRIGGER_COOLDOWN_MAX_ENTRIES
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (outcome, timestamp)
+        self._lock = threading.Lock()
+        self.actions_saved = 0
+
+    @staticmethod
+    def _window(outcome: str) -> int:
+        # Non-followers are re-checked sooner: they may have followed since
+        return config.TRIGGER_COOLDOWN if outcome == SENT else config.TRIGGER_FOLLOW_RECHECK
+
+    def _db(self):
+        try:
+            from database import get_db
+            db = get_db()
+            return db if db.enabled else None
+        except Exception:
+            return None
+
+    def check(self, user_pk: str, keyword: str) -> Optional[str]:
+        """
+        Return the outcome of a trigger still inside its cooldown window, or None
+
+        Memory is checked first; misses fall back to the DB (other workers,
+        previous runs) and are cached on hit.
+        """
+        key = (str(user_pk), keyword)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            db = self._db()
+            row = db.get_keyword_trigger(key[0], keyword, self.account) if db else None
+            if row is None:
+                return None
+            # Age is computed by the DB: triggered_at has no time zone
+            outcome, age = row
+            entry = (outcome, now - age)
+            self._remember(key, entry)
+
+        outcome, triggered_at = entry
+        if now - triggered_at < self._window(outcome):
+            return outcome
+        return None
+
+    def record(self, user_pk: str, keyword: str, outcome: str):
+        """Remember a handled trigger (memory + DB)"""
+        key = (str(user_pk), keyword)
+        self._remember(key, (outcome, time.time()))
+        db = self._db()
+        if db:
+            db.save_keyword_trigger(key[0], keyword, outcome, self.account)
+
+    def add_saved(self, actions: int):
+        with self._lock:
+            self.actions_saved += actions
+
+    def _remember(self, key: tuple, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def snapshot(self) -> list:
+        """[[user_pk, keyword, outcome, timestamp], ...] in LRU order (warm-restart snapshot)"""
+        with self._lock:
+            return [[user_pk, keyword, outcome, at] for (user_pk, keyword), (outcome, at) in self._entries.items()]
+
+    def restore(self, entries: list):
+        for user_pk, keyword, outcome, at in entries:
+            self._remember((str(user_pk), keyword), (outcome, float(at)))
@@ -0,0 +1,133 @@
+"""
+Warm-restart snapshot of the comment bot's runtime state
+On shutdown (SIGTERM on a deploy) the bot packs what it would otherwise
+rebuild on boot - the processed-id window with its timestamps, processed DM
+ids, the trigger cooldown and AI reply caches, and the comments it had queued
+but not handled yet - into one compact blob:
+
+    magic "IGWS" | version u16 | saved_at f64 | crc32 u32 | length u32 | zlib(JSON)
+
+It goes to the DB (the disk is wiped on Render deploys) or to a per-account
+file without one. On boot the snapshot is taken (read and deleted: it is only
+valid right after the shutdown that wrote it), validated (magic, version,
+checksum, account, WARM_STATE_MAX_AGE) and restored instead of reloading the
+processed window from Postgres; the queued comments are handled first, before
+the first full comment scan
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Optional
+from config import config
+from logger import log
+
+MAGIC = b"IGWS"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("!4sHdII")
+
+
+class SnapshotError(ValueError):
+    """Snapshot blob is corrupt, from another version/account or too old"""
+
+
+def encode(account: str, state: dict, saved_at: float = None) -> bytes:
+    payload = zlib.compress(json.dumps({"account": account, **state}, separators=(",", ":")).encode(), 6)
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, saved_at or time.time(), zlib.crc32(payload), len(payload)) + payload
+
+
+def decode(blob: bytes, account: str, max_age: float = None) -> dict:
+    """State dict of a snapshot blob (raises SnapshotError if it can't be used)"""
+    if len(blob) < _HEADER.size:
+        raise SnapshotError("truncated header")
+    magic, version, saved_at, crc, length = _HEADER.unpack_from(blob)
+    payload = blob[_HEADER.size:]
+    if magic != MAGIC:
+        raise SnapshotError("not a warm-state snapshot")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"format version {version} != {FORMAT_VERSION}")
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise SnapshotError("checksum mismatch")
+    age = time.time() - saved_at
+    if max_age is not None and not 0 <= age <= max_age:
+        raise SnapshotError(f"{age:.0f}s old")
+    state = json.loads(zlib.decompress(payload))
+    if state.get("account") != account:
+        raise SnapshotError(f"snapshot of account {state.get('account')!r}")
+    state["saved_at"] = saved_at
+    return state
+
+
+def _get_db():
+    try:
+        from database import get_db
+        db = get_db()
+        return db if db.enabled else None
+    except Exception:
+        return None
+
+
+def save(account, state: dict) -> bool:
+    """Write the snapshot of `account` (Account) to the DB, or to its file without one"""
+    blob = encode(account.name, state)
+    db = _get_db()
+    if db:
+        saved = db.save_warm_state(blob, account.name)
+    else:
+        try:
+            tmp = f"{account.warm_state_file}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, account.warm_state_file)  # Never leave a half-written snapshot
+            saved = True
+        except OSError as e:
+            log.warning("warm_state_failed", "⚠️ Warm state saqlanmadi: {error}", error=str(e),
+                        account=account.name)
+            saved = False
+    if saved:
+        log.info("warm_state_saved", "💾 Holat saqlandi ({size} bayt)", size=len(blob), account=account.name)
+    return saved
+
+
+def _take_blob(account) -> Optional[bytes]:
+    db = _get_db()
+    if db:
+        return db.take_warm_state(account.name)
+    try:
+        with open(account.warm_state_file, "rb") as f:
+            blob = f.read()
+        os.remove(account.warm_state_file)
+        return blob
+    except OSError:
+        return None
+
+
+# Restored state per account: taken once, shared by the handler and the bot
+_restored = {}
+_restored_lock = threading.Lock()
+
+
+def restore(account) -> Optional[dict]:
+    """Validated snapshot of `account` from the previous shutdown, or None"""
+    if not config.WARM_RESTART:
+        return None
+    with _restored_lock:
+        if account.name not in _restored:
+            _restored[account.name] = _load(account)
+        return _restored[account.name]
+
+
+def _load(account) -> Optional[dict]:
+    blob = _take_blob(account)
+    if not blob:
+        return None
+    try:
+        state = decode(blob, account.name, config.WARM_STATE_MAX_AGE)
+    except (SnapshotError, ValueError, zlib.error) as e:
+        log.warning("warm_state_invalid", "⚠️ Warm state ishlatilmadi: {error}", error=str(e), account=account.name)
+        return None
+    log.info("warm_state_restored", "♻️ Oldingi holat tiklandi ({age:.0f}s oldin saqlangan)",
+             age=time.time() - state["saved_at"], account=account.name)
+    return state
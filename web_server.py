@@ -1,11 +1,20 @@
 """
 Web Service runner for Render.com (Free Tier)
 Runs Flask server with health check + bots in background threads
+Heavy bot modules are imported lazily in the bot threads, so /health
+answers immediately while startup continues in the background
+
+Safe with several gunicorn workers (WEB_CONCURRENCY): a Postgres advisory
+lock elects one leader process to run the bots, the rest only serve HTTP.
+In Telegram webhook mode every worker handles the updates it receives
 """
 import threading
-import time
 import os
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
+from leader import LeaderElector
+from startup import startup_status
+from logger import log
+from telegram_webhook import WEBHOOK_PATH, SECRET_HEADER, webhook_enabled, is_valid_secret, get_webhook_dispatcher
 
 app = Flask(__name__)
 
@@ -16,6 +25,14 @@ bot_status = {
     "started_at": None
 }
 
+elector = LeaderElector()
+
+# Bots runtime thread of this process: a re-election waits for the previous one
+# to exit, and a demotion cancels a runtime that hasn't started yet
+_bots_thread = None
+_bots_wanted = False
+_bots_lock = threading.Lock()
+
 
 @app.route("/")
 def home():
@@ -39,88 +56,229 @@ def health():
         "status": "ok",
         "instagram_bot": bot_status["instagram"],
         "telegram_bot": bot_status["telegram"],
-        "started_at": bot_status["started_at"]
+        "started_at": bot_status["started_at"],
+        "ready": startup_status["state"] == "ready",
+        "role": "leader" if elector.is_leader else "standby"
     })
 
 
-def run_instagram_bot():
-    """Run the Instagram comment bot"""
-    global bot_status
-    import sys
-    
-    # Force unbuffered output
-    sys.stdout.reconfigure(line_buffering=True)
+@app.route("/leader")
+def leader():
+    """Leader election state of this process and the current lease holder"""
+    return jsonify({
+        **elector.status(),
+        "current_leader": elector.current_leader()
+    })
+
+
+@app.route("/startup")
+def startup():
+    """Startup timing breakdown (per init step, seconds)"""
+    return jsonify(startup_status)
+
+
+@app.route("/api-guard")
+def api_guard_status():
+    """Instagram API circuit breaker and throttle state per endpoint family"""
+    from circuit_breaker import api_guard
+    return jsonify(api_guard.status())
+
+
+@app.route("/load")
+def load_status():
+    """Current load-shedding tier and recent tier transitions"""
+    from async_runtime import get_instagram_bot
+    bot = get_instagram_bot()
+    return jsonify(bot.load_policy.status() if bot else {})
+
+
+@app.route(WEBHOOK_PATH, methods=["POST"])
+def telegram_webhook():
+    """Telegram updates (webhook mode); any worker can take them"""
+    if not webhook_enabled():
+        return "", 404
+    if not is_valid_secret(request.headers.get(SECRET_HEADER)):
+        return "", 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return "", 400
+    # Non-2xx makes Telegram redeliver the update later
+    return ("", 200) if get_webhook_dispatcher().submit(data) else ("", 503)
+
+
+@app.route("/telegram")
+def telegram_status():
+    """Telegram update delivery mode, webhook counters and deep-link conversions"""
+    from database import get_db
+    from deep_links import conversion_counters
+    enabled = webhook_enabled()
+    return jsonify({
+        "mode": "webhook" if enabled else "polling",
+        "webhook": get_webhook_dispatcher().status() if enabled else None,
+        "conversions": conversion_counters.status(),
+        "conversions_7d": get_db().get_keyword_conversions(7),
+    })
+
+
+def _parse_time(value: str, default: float) -> float:
+    """Unix seconds or an ISO date/time (UTC if no offset)"""
+    from datetime import datetime, timezone
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"  # fromisoformat only accepts "Z" from Python 3.11
+    at = datetime.fromisoformat(value)
+    return (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).timestamp()
+
+
+@app.route("/stats/hourly")
+def stats_hourly():
+    """
+    Hourly rollups over a range: ?from=&to= (unix or ISO, default last 24h),
+    by=total|keyword|post, key=, account=, bucket=hour|day
+    """
+    import time
+    from config import config
+    from stats_rollup import rollups, DIMENSIONS, TOTAL, METRICS, with_rates
+    dimension = request.args.get("by", TOTAL)
+    bucket = request.args.get("bucket", "hour")
+    if dimension not in DIMENSIONS or bucket not in ("hour", "day"):
+        return jsonify({"error": f"by: {'|'.join(DIMENSIONS)}, bucket: hour|day"}), 400
+    try:
+        end = _parse_time(request.args.get("to"), time.time())
+        start = _parse_time(request.args.get("from"), end - 86400)
+    except ValueError:
+        return jsonify({"error": "from/to: unix seconds or ISO 8601"}), 400
+    start = max(start, end - config.STATS_MAX_RANGE_DAYS * 86400)
     
+    rows = rollups.query(start, end, dimension, request.args.get("key"), request.args.get("account"), bucket)
+    totals = with_rates({metric: sum(row[metric] for row in rows) for metric in METRICS})
+    return jsonify({"from": start, "to": end, "by": dimension, "bucket": bucket, "rows": rows, "totals": totals})
+
+
+def _debug_allowed() -> bool:
+    """Debug endpoints are off unless DEBUG_TOKEN is set and sent (?token= or header)"""
+    import hmac
+    from config import config
+    token = request.args.get("token") or request.headers.get("X-Debug-Token") or ""
+    return bool(config.DEBUG_TOKEN) and hmac.compare_digest(token, config.DEBUG_TOKEN)
+
+
+def _count_arg(name: str, default: int, maximum: int) -> int:
+    """Positive integer query parameter clamped to [1, maximum] (ValueError if not a number)"""
+    return max(1, min(int(request.args.get(name, default)), maximum))
+
+
+@app.route("/debug/traces")
+def debug_traces():
+    """Recent slow traces (?all=1 for recent ones) and per-stage latency histograms"""
+    if not _debug_allowed():
+        return "", 404
+    from tracing import tracer
     try:
-        print("🔄 Instagram bot yuklanmoqda...", flush=True)
-        bot_status["instagram"] = "loading"
-        
-        from main import main as instagram_main
-        print("✅ Instagram bot moduli yuklandi", flush=True)
-        
-        bot_status["instagram"] = "running"
-        instagram_main()
-    except Exception as e:
-        import traceback
-        error_msg = f"error: {str(e)}"
-        bot_status["instagram"] = error_msg
-        print(f"❌ Instagram bot xatosi: {e}", flush=True)
-        print(traceback.format_exc(), flush=True)
+        limit = _count_arg("limit", 20, 200)
+    except ValueError:
+        return jsonify({"error": "limit: integer"}), 400
+    return jsonify({
+        "slow_ms": tracer.slow_ms,
+        "stages": tracer.stats(),
+        "traces": tracer.traces(slow=not request.args.get("all"), limit=limit),
+    })
 
 
-def run_telegram_bot():
-    """Run the Telegram subscription bot with its own event loop"""
+@app.route("/debug/profiler", methods=["GET", "POST"])
+def debug_profiler():
+    """Sampling profiler: POST ?action=start|stop, GET for the top stacks"""
+    if not _debug_allowed():
+        return "", 404
+    from tracing import profiler
+    try:
+        top = _count_arg("top", 25, 100)
+    except ValueError:
+        return jsonify({"error": "top: integer"}), 400
+    action = request.args.get("action")
+    if request.method == "POST" and action == "start":
+        profiler.start()
+    elif request.method == "POST" and action == "stop":
+        profiler.stop()
+    return jsonify(profiler.report(top=top))
+
+
+def run_bots(previous: threading.Thread = None):
+    """Run both bots on one asyncio event loop (blocking calls use a bounded pool)"""
     global bot_status
-    import asyncio
-    import sys
+    from async_runtime import clear_stop_request
     
-    sys.stdout.reconfigure(line_buffering=True)
+    if previous is not None:
+        log.info("bots_waiting", "⏳ Oldingi botlar to'xtashi kutilmoqda...")
+        previous.join()  # Never two pipelines in one process
+    with _bots_lock:
+        if not _bots_wanted:
+            return  # Demoted again while waiting
+        clear_stop_request()
     
+    # No forced line buffering: the log writer thread flushes stdout once per batch
     try:
-        print("🔄 Telegram bot yuklanmoqda...", flush=True)
+        log.info("bots_loading", "🔄 Botlar yuklanmoqda...")
+        bot_status["instagram"] = "loading"
+        bot_status["telegram"] = "loading"
         
-        # Create new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        from async_runtime import main as runtime_main
+        log.info("bots_loaded", "✅ Bot modullari yuklandi")
         
-        bot_status["telegram"] = "running"
-        from telegram_bot import TelegramSubscriptionBot
-        bot = TelegramSubscriptionBot()
-        print("✅ Telegram bot moduli yuklandi", flush=True)
-        bot.run(use_signals=False)  # Disable signals for threaded mode
+        runtime_main(status=bot_status, telegram_webhook=webhook_enabled())
     except Exception as e:
         import traceback
-        bot_status["telegram"] = f"error: {str(e)}"
-        print(f"❌ Telegram bot xatosi: {e}", flush=True)
-        print(traceback.format_exc(), flush=True)
+        error_msg = f"error: {str(e)}"
+        bot_status["instagram"] = error_msg
+        bot_status["telegram"] = error_msg
+        log.error("bots_crashed", "❌ Bot xatosi: {error}", error=str(e), traceback=traceback.format_exc())
 
 
 def start_bots():
-    """Start both bots in background threads"""
-    global bot_status
+    """Start both bots in one background thread running the asyncio runtime"""
+    global bot_status, _bots_thread, _bots_wanted
     from datetime import datetime
     bot_status["started_at"] = datetime.now().isoformat()
     
-    print("=" * 50)
-    print("🤖 Instagram + Telegram Bot (Web Service)")
-    print("=" * 50)
-    
-    # Start Instagram bot in a thread
-    instagram_thread = threading.Thread(target=run_instagram_bot, daemon=True)
-    instagram_thread.start()
-    print("✅ Instagram bot ishga tushdi (background thread)")
+    log.info("web_service", "🤖 Instagram + Telegram Bot (Web Service)")
     
-    # Small delay before starting Telegram bot
-    time.sleep(2)
+    with _bots_lock:
+        _bots_wanted = True
+        previous = _bots_thread if _bots_thread is not None and _bots_thread.is_alive() else None
+        _bots_thread = threading.Thread(target=run_bots, args=(previous,), daemon=True, name="bots")
+        _bots_thread.start()
+    log.info("bots_started", "✅ Instagram + Telegram bot ishga tushdi (background thread)")
+
+
+def stop_bots():
+    """Stop the bots after losing leadership (this process keeps serving HTTP)"""
+    global _bots_wanted
+    from async_runtime import request_stop
     
-    # Start Telegram bot in a thread
-    telegram_thread = threading.Thread(target=run_telegram_bot, daemon=True)
-    telegram_thread.start()
-    print("✅ Telegram bot ishga tushdi (background thread)")
+    log.warning("leadership_lost", "🛑 Leadership yo'qotildi - botlar to'xtatilmoqda")
+    with _bots_lock:
+        _bots_wanted = False
+        request_stop()  # Also cancels a runtime that is still starting
+    bot_status["instagram"] = "standby"
+    bot_status["telegram"] = "standby"
+
 
+# Opt-in: profile from boot (PROFILER=true)
+from config import config as _config
+if _config.PROFILER:
+    from tracing import profiler
+    profiler.start()
 
-# Start bots when module loads
-start_bots()
+# Campaign for leadership when module loads (non-blocking: only spawns a
+# background thread); the elected process starts the bots
+bot_status["instagram"] = "standby"
+bot_status["telegram"] = "standby"
+elector.start(on_elected=start_bots, on_demoted=stop_bots)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))